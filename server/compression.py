@@ -0,0 +1,157 @@
+"""
+FrigoScan — Compression des réponses (brotli / gzip).
+L'encodage est négocié sur Accept-Encoding parmi ceux configurés (brotli
+seulement si le module est installé). Les réponses sous le seuil, déjà
+encodées, non textuelles ou en flux SSE passent telles quelles ; les réponses
+en plusieurs morceaux (exports, fichiers statiques) sont compressées au fil
+de l'eau.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+class _Encoder:
+    """Compresseur incrémental d'un encodage donné."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Morceau intermédiaire, vidé pour que le client le reçoive tout de suite."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def negotiate(accept_encoding: str, encodings: tuple[str, ...]) -> Optional[str]:
+    """Premier encodage configuré accepté par le client (q=0 = refusé)."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compression.
+    encodings : ordre de préférence ("br", "gzip") ; minimum_size en octets.
+    """
+
+    def __init__(self, app: ASGIApp, encodings: tuple[str, ...] = ("br", "gzip"),
+                 minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.encodings = tuple(e for e in encodings if e == "gzip" or (e == "br" and brotli is not None))
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = None
+        if scope["type"] == "http" and scope["method"] != "HEAD" and self.encodings:
+            encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.on_message)
+
+    def _compressible(self, body: bytes, more_body: bool) -> bool:
+        headers = Headers(raw=self.start["headers"])
+        content_type = headers.get("content-type", "").lower()
+        if "content-encoding" in headers or self.start["status"] in (204, 206, 304):
+            return False
+        if content_type.startswith(EXCLUDED_TYPES) or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if more_body:
+            length = headers.get("content-length")
+            return length is None or int(length) >= self.middleware.minimum_size
+        return len(body) >= self.middleware.minimum_size
+
+    def _encoded_headers(self) -> Message:
+        headers = MutableHeaders(scope=self.start)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # Représentation différente : l'ETag fort devient faible (If-None-Match reste valide)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        del headers["Content-Length"]
+        return self.start
+
+    async def on_message(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            if not self._compressible(body, more_body):
+                self.passthrough = True
+                if self._is_text():
+                    MutableHeaders(scope=self.start).add_vary_header("Accept-Encoding")
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            start = self._encoded_headers()
+            if not more_body:
+                compressed = self.encoder.finish(body)
+                MutableHeaders(scope=start)["Content-Length"] = str(len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(start)
+
+        data = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _is_text(self) -> bool:
+        content_type = Headers(raw=self.start["headers"]).get("content-type", "").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(EXCLUDED_TYPES)
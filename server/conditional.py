@@ -0,0 +1,113 @@
+"""
+FrigoScan — GET conditionnels (ETag / If-None-Match).
+L'ETag d'une liste est calculé à partir des versions des tables qu'elle lit
+(table_versions, tenue à jour par triggers) et de la requête, pas à partir
+du corps : si If-None-Match correspond, la réponse 304 part avant la requête
+de liste et la sérialisation JSON.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Callable, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.database import get_db
+from server.services import seasonal_service
+from server.services.change_feed import table_versions
+from server.services.recipe_service import RECIPE_CATEGORIES_FR
+
+REVALIDATE = "no-cache"  # réponse gardée par le navigateur, revalidée à chaque affichage
+
+
+class ConditionalRoute(NamedTuple):
+    tables: tuple[str, ...]                # entités de table_versions lues par la route
+    extra: Optional[Callable[[], str]]     # autre dépendance (jour, fichier de données)
+    cache_control: str
+
+
+def _today() -> str:
+    # dlc_status / dlc_days_left dépendent du jour (vue fridge_items_dlc)
+    return date.today().isoformat()
+
+
+def _seasonal_version() -> str:
+    return f"{seasonal_service.data_version()}|{datetime.now().month}"
+
+
+_CATEGORIES_VERSION = hashlib.sha1(
+    json.dumps(RECIPE_CATEGORIES_FR, sort_keys=True, ensure_ascii=False).encode()
+).hexdigest()
+
+CONDITIONAL_ROUTES = {
+    "/api/fridge/": ConditionalRoute(("fridge",), _today, REVALIDATE),
+    "/api/shopping/": ConditionalRoute(("shopping",), None, REVALIDATE),
+    "/api/settings/": ConditionalRoute(("settings",), None, REVALIDATE),
+    "/api/recipes/": ConditionalRoute(("recipes",), None, REVALIDATE),
+    "/api/recipes/banned": ConditionalRoute(("banned_recipes",), None, REVALIDATE),
+    "/api/seasonal/": ConditionalRoute((), _seasonal_version, "public, max-age=3600"),
+    "/api/recipes/categories": ConditionalRoute((), lambda: _CATEGORIES_VERSION, "public, max-age=86400"),
+}
+
+
+def compute_etag(route: ConditionalRoute, path: str, query: bytes) -> str:
+    """ETag fort : requête + époque de la base + versions des tables + dépendance annexe."""
+    parts = [path, query.decode("latin-1")]
+    if route.tables:
+        db = get_db()
+        try:
+            versions = table_versions(db, ("epoch", *route.tables))
+        finally:
+            db.close()
+        parts.extend(f"{name}={version}" for name, version in versions.items())
+    if route.extra is not None:
+        parts.append(route.extra())
+    return '"' + hashlib.sha1("\n".join(parts).encode()).hexdigest()[:24] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ConditionalGetMiddleware:
+    """
+    Middleware ASGI : ETag et Cache-Control sur les routes de CONDITIONAL_ROUTES,
+    304 Not Modified quand le client a déjà la version courante.
+    Les versions sont lues avant la route : une écriture concurrente donne au
+    pire un ETag plus ancien que le corps, donc un 200 de trop, jamais un 304 faux.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        route = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            route = CONDITIONAL_ROUTES.get(scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag = await run_in_threadpool(compute_etag, route, scope["path"], scope.get("query_string", b""))
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", route.cache_control.encode())],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                headers["ETag"] = etag
+                headers["Cache-Control"] = route.cache_control
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
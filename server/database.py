@@ -6,6 +6,7 @@ Gestion de la connexion, création du schéma et helpers CRUD.
 import sqlite3
 import json
 import os
+import time
 from datetime import datetime, date
 from pathlib import Path
 
@@ -13,15 +14,20 @@ DB_DIR = Path(__file__).parent / "data"
 DB_PATH = DB_DIR / "frigoscan.db"
 
 
-def get_db() -> sqlite3.Connection:
-    """Retourne une connexion SQLite avec row_factory = Row."""
+def get_db(check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Retourne une connexion SQLite avec row_factory = Row.
+    check_same_thread=False pour les générateurs de réponses en flux,
+    dont les itérations successives peuvent tourner sur des threads différents.
+    """
     DB_DIR.mkdir(parents=True, exist_ok=True)
     
     # Connexion avec timeout pour éviter les crashes au lock
     conn = sqlite3.connect(
         str(DB_PATH),
         timeout=5.0,  # 5s timeout before locked error
-        isolation_level='DEFERRED'  # Transactions plus intelligentes
+        isolation_level='DEFERRED',  # Transactions plus intelligentes
+        check_same_thread=check_same_thread,
     )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
@@ -69,6 +75,7 @@ CREATE TABLE IF NOT EXISTS fridge_items (
     added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     nutrition_json TEXT DEFAULT '{}',
     status TEXT DEFAULT 'active',
+    name_tokens TEXT,
     FOREIGN KEY (product_id) REFERENCES products(id)
 );
 
@@ -83,6 +90,30 @@ CREATE TABLE IF NOT EXISTS consumption_history (
     user_name TEXT DEFAULT 'Famille'
 );
 
+-- Frigo avec statut DLC calculé en SQL (date locale du jour)
+CREATE VIEW IF NOT EXISTS fridge_items_dlc AS
+SELECT *,
+    CASE
+        WHEN dlc IS NULL OR dlc = '' THEN 'none'
+        WHEN date(dlc) IS NULL THEN 'unknown'
+        WHEN date(dlc) < date('now', 'localtime') THEN 'expired'
+        WHEN date(dlc) <= date('now', 'localtime', '+3 days') THEN 'soon'
+        ELSE 'ok'
+    END AS dlc_status,
+    CAST(julianday(date(dlc)) - julianday(date('now', 'localtime')) AS INTEGER) AS dlc_days_left
+FROM fridge_items;
+
+-- Agrégats journaliers de consommation (tenus à jour avec consumption_history)
+CREATE TABLE IF NOT EXISTS consumption_daily (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    product_name TEXT NOT NULL,
+    user_name TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    qty REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category, product_name, user_name)
+);
+
 CREATE TABLE IF NOT EXISTS recipes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     title TEXT NOT NULL,
@@ -95,7 +126,9 @@ CREATE TABLE IF NOT EXISTS recipes (
     image_url TEXT,
     tags_json TEXT DEFAULT '[]',
     diet_tags_json TEXT DEFAULT '[]',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ingredient_tokens_json TEXT,
+    recipe_key TEXT
 );
 
 CREATE TABLE IF NOT EXISTS weekly_menu (
@@ -140,8 +173,182 @@ CREATE TABLE IF NOT EXISTS banned_recipes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     title TEXT NOT NULL UNIQUE,
     image_url TEXT DEFAULT '',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    recipe_key TEXT
+);
+
+-- Imports en flux : progression et point de reprise (lignes déjà validées)
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT,
+    file_path TEXT,
+    atomic INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'pending',
+    total_bytes INTEGER DEFAULT 0,
+    bytes_done INTEGER DEFAULT 0,
+    committed_rows INTEGER DEFAULT 0,
+    imported_json TEXT DEFAULT '{}',
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    payload_json TEXT DEFAULT '{}',
+    status TEXT DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    result_json TEXT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS recipe_reservoir (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title_key TEXT NOT NULL,
+    target_servings INTEGER DEFAULT 4,
+    recipe_json TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (title_key, target_servings)
+);
+
+CREATE TABLE IF NOT EXISTS mealdb_mirror (
+    id_meal TEXT PRIMARY KEY,
+    title_en TEXT NOT NULL,
+    title_fr TEXT,
+    category TEXT,
+    area TEXT,
+    meal_json TEXT NOT NULL,
+    recipe_json TEXT NOT NULL,
+    instructions_fr TEXT,
+    diet_tags_json TEXT DEFAULT '[]',
+    search_text TEXT,
+    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Fiches complètes des recettes par clé de contenu (services/recipe_store.py) ;
+-- stored_at (horodatage Unix) prolongé à chaque apparition dans une liste
+CREATE TABLE IF NOT EXISTS recipe_store (
+    key TEXT PRIMARY KEY,
+    recipe_json TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+
+-- Journal des modifications (frigo, courses, réglages, recettes) : versions croissantes
+-- écrites par triggers, donc dans la transaction de chaque modification
+CREATE TABLE IF NOT EXISTS change_log (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_fridge_items_insert_log AFTER INSERT ON fridge_items
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('fridge', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fridge_items_update_log AFTER UPDATE ON fridge_items
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('fridge', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fridge_items_delete_log AFTER DELETE ON fridge_items
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('fridge', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shopping_list_insert_log AFTER INSERT ON shopping_list
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('shopping', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shopping_list_update_log AFTER UPDATE ON shopping_list
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('shopping', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shopping_list_delete_log AFTER DELETE ON shopping_list
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('shopping', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_insert_log AFTER INSERT ON settings
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('settings', NEW.key, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_update_log AFTER UPDATE ON settings
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('settings', NEW.key, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_delete_log AFTER DELETE ON settings
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('settings', OLD.key, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_minimums_insert_log AFTER INSERT ON stock_minimums
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('stock_minimums', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_minimums_update_log AFTER UPDATE ON stock_minimums
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('stock_minimums', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_minimums_delete_log AFTER DELETE ON stock_minimums
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('stock_minimums', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_recipes_insert_log AFTER INSERT ON recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('recipes', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_recipes_update_log AFTER UPDATE ON recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('recipes', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_recipes_delete_log AFTER DELETE ON recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('recipes', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_banned_recipes_insert_log AFTER INSERT ON banned_recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('banned_recipes', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_banned_recipes_update_log AFTER UPDATE ON banned_recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('banned_recipes', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_banned_recipes_delete_log AFTER DELETE ON banned_recipes
+BEGIN
+    INSERT INTO change_log (entity, entity_id, op) VALUES ('banned_recipes', OLD.id, 'delete');
+END;
+
+-- Dernière version par entité (ETag des listes, cf. server/conditional.py) ;
+-- 'epoch' distingue une base recréée dont les versions repartent de zéro
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
 );
+
+CREATE TRIGGER IF NOT EXISTS trg_change_log_table_version AFTER INSERT ON change_log
+BEGIN
+    INSERT INTO table_versions (name, version) VALUES (NEW.entity, NEW.version)
+    ON CONFLICT(name) DO UPDATE SET version = excluded.version;
+END;
 """
 
 # Indices pour améliorer les performances (Action 7)
@@ -161,6 +368,35 @@ ON fridge_items(barcode);
 CREATE INDEX IF NOT EXISTS idx_fridge_category 
 ON fridge_items(category);
 
+-- Frigo : filtres / tris DLC et catégories sur les produits actifs
+CREATE INDEX IF NOT EXISTS idx_fridge_status_dlc 
+ON fridge_items(status, dlc);
+
+CREATE INDEX IF NOT EXISTS idx_fridge_status_category 
+ON fridge_items(status, category, dlc);
+
+CREATE INDEX IF NOT EXISTS idx_fridge_active_dlc_sort 
+ON fridge_items(COALESCE(dlc, '9999-12-31'), id) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_fridge_active_added 
+ON fridge_items(added_at, id) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_fridge_active_name 
+ON fridge_items(name, id) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_fridge_active_category 
+ON fridge_items(COALESCE(category, ''), id) WHERE status = 'active';
+
+-- Noms insensibles à la casse (stocks minimum, liste de courses)
+CREATE INDEX IF NOT EXISTS idx_fridge_active_name_nocase 
+ON fridge_items(name COLLATE NOCASE, quantity) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_shopping_pending_name 
+ON shopping_list(product_name COLLATE NOCASE) WHERE is_purchased = 0;
+
+CREATE INDEX IF NOT EXISTS idx_stock_min_name_nocase 
+ON stock_minimums(product_name COLLATE NOCASE);
+
 CREATE INDEX IF NOT EXISTS idx_consumption_date 
 ON consumption_history(consumed_at);
 
@@ -172,6 +408,18 @@ ON products(barcode);
 
 CREATE INDEX IF NOT EXISTS idx_shopping_category 
 ON shopping_list(category);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status 
+ON background_jobs(status, id);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_type 
+ON background_jobs(job_type, status);
+
+CREATE INDEX IF NOT EXISTS idx_mirror_category 
+ON mealdb_mirror(category);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_entity 
+ON change_log(entity, version);
 """
 
 DEFAULT_SETTINGS = {
@@ -192,6 +440,10 @@ DEFAULT_SETTINGS = {
     "auto_save": "true",
     "notifications_enabled": "false",
     "dashboard_widgets": '["scan","manual","fridge","recipes","menu","seasonal","shopping","stats"]',
+    "scheduler_enabled": "true",
+    "scheduler_concurrency": "2",
+    "scheduler_quiet_hours": "",
+    "backup_keep": "7",
 }
 
 
@@ -212,27 +464,169 @@ def init_db():
             conn.commit()
         except Exception:
             pass  # Colonne déjà existante
+        # Migration : agrégats journaliers calculés depuis l'historique existant
+        has_daily = conn.execute("SELECT 1 FROM consumption_daily LIMIT 1").fetchone()
+        has_history = conn.execute("SELECT 1 FROM consumption_history LIMIT 1").fetchone()
+        if has_history and not has_daily:
+            rebuild_consumption_daily(conn)
         # Migration : ajouter recipe_data_json si absent
         try:
             conn.execute("ALTER TABLE weekly_menu ADD COLUMN recipe_data_json TEXT")
             conn.commit()
         except Exception:
             pass  # Colonne déjà existante
+        # Migration : jetons canoniques d'ingrédients (remplis juste après)
+        for table, column in (("fridge_items", "name_tokens"), ("recipes", "ingredient_tokens_json")):
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+                conn.commit()
+            except Exception:
+                pass  # Colonne déjà existante
+        # Migration : clés de contenu des recettes (magasin de recettes)
+        for table in ("recipes", "banned_recipes"):
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN recipe_key TEXT")
+                conn.commit()
+            except Exception:
+                pass  # Colonne déjà existante
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_key ON recipes(recipe_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recipe_store_stored ON recipe_store(stored_at)")
+        from server.services.recipe_store import ensure_recipe_keys
+        ensure_recipe_keys(conn)
+        # Versions par entité : époque de la base, puis versions déjà journalisées
+        conn.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES ('epoch', abs(random()))")
+        conn.execute(
+            """INSERT OR IGNORE INTO table_versions (name, version)
+               SELECT entity, MAX(version) FROM change_log GROUP BY entity"""
+        )
+        conn.commit()
+        from server.services.ingredient_tokens import ensure_ingredient_tokens
+        ensure_ingredient_tokens(conn)
+        # Statistiques du planificateur (index partiels du frigo) ; analyse bornée
+        conn.execute("PRAGMA analysis_limit=400")
+        conn.execute("ANALYZE")
         conn.commit()
     finally:
         conn.close()
 
 
-def backup_db(dest_path: str | None = None) -> str:
-    """Crée une copie de sauvegarde de la base."""
+def record_consumption_daily(conn, product_name: str, category: str | None,
+                             user_name: str | None, quantity: float | None):
+    """Incrémente l'agrégat du jour (à appeler dans la transaction qui écrit l'historique)."""
+    record_consumption_daily_many(conn, [(product_name, category, user_name, quantity)])
+
+
+def record_consumption_daily_many(conn, entries: list[tuple]):
+    """Version groupée : entries = [(product_name, category, user_name, quantity), ...]."""
+    conn.executemany(
+        """INSERT INTO consumption_daily (day, category, product_name, user_name, count, qty)
+           VALUES (date('now'), ?, ?, ?, 1, ?)
+           ON CONFLICT(day, category, product_name, user_name)
+           DO UPDATE SET count = count + 1, qty = qty + excluded.qty""",
+        [(category or "", name, user or "", quantity or 0) for name, category, user, quantity in entries]
+    )
+
+
+def rebuild_consumption_daily(conn):
+    """Recalcule entièrement les agrégats journaliers depuis consumption_history."""
+    conn.execute("DELETE FROM consumption_daily")
+    conn.execute(
+        """INSERT INTO consumption_daily (day, category, product_name, user_name, count, qty)
+           SELECT date(consumed_at), COALESCE(category, ''), product_name, COALESCE(user_name, ''),
+                  COUNT(*), COALESCE(SUM(quantity), 0)
+           FROM consumption_history
+           GROUP BY date(consumed_at), COALESCE(category, ''), product_name, COALESCE(user_name, '')"""
+    )
+    conn.commit()
+
+
+BACKUP_PAGES_PER_STEP = 256   # pages copiées par étape de l'API backup
+BACKUP_STEP_SLEEP = 0.005     # pause entre deux étapes (les écrivains passent)
+BACKUP_KEEP = 7               # sauvegardes frigoscan_backup_*.db conservées
+
+_last_backup: dict = {}
+
+
+def backup_to(dest_path: str | Path) -> dict:
+    """
+    Copie cohérente de la base via l'API backup de SQLite, par étapes de
+    BACKUP_PAGES_PER_STEP pages : contrairement à une copie du fichier,
+    les pages encore dans le journal WAL sont incluses et les écritures
+    concurrentes ne sont bloquées que le temps d'une étape.
+    Retourne les métriques (pages, étapes, durée, taille).
+    """
+    started = time.perf_counter()
+    steps = 0
+    pages = 0
+
+    def _progress(status, remaining, total):
+        nonlocal steps, pages
+        steps += 1
+        pages = total
+
+    src = get_db()
+    dst = sqlite3.connect(str(dest_path))
+    try:
+        src.backup(dst, pages=BACKUP_PAGES_PER_STEP, progress=_progress, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+    return {
+        "path": str(dest_path),
+        "pages": pages,
+        "steps": steps,
+        "size_bytes": os.path.getsize(dest_path),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def rotate_backups(keep: int = BACKUP_KEEP) -> list[str]:
+    """Supprime les sauvegardes frigoscan_backup_*.db au-delà des `keep` plus récentes."""
+    backups = sorted(DB_DIR.glob("frigoscan_backup_*.db"), key=lambda p: p.name, reverse=True)
+    removed = []
+    for path in backups[max(keep, 0):]:
+        path.unlink(missing_ok=True)
+        removed.append(path.name)
+    return removed
+
+
+def backup_keep() -> int:
+    """Nombre de sauvegardes à conserver (réglage backup_keep)."""
+    conn = get_db()
+    try:
+        row = conn.execute("SELECT value FROM settings WHERE key = 'backup_keep'").fetchone()
+    finally:
+        conn.close()
+    try:
+        return max(1, int(row["value"])) if row else BACKUP_KEEP
+    except ValueError:
+        return BACKUP_KEEP
+
+
+def backup_db(dest_path: str | None = None, rotate: bool = True) -> str:
+    """Crée une sauvegarde de la base (API backup) puis applique la rotation."""
     if dest_path is None:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         dest_path = str(DB_DIR / f"frigoscan_backup_{ts}.db")
-    import shutil
-    shutil.copy2(str(DB_PATH), dest_path)
+    stats = backup_to(dest_path)
+    if rotate:
+        stats["rotated"] = rotate_backups(backup_keep())
+    _last_backup.clear()
+    _last_backup.update(stats, finished_at=datetime.now().isoformat(timespec="seconds"))
     return dest_path
 
 
+def get_backup_stats() -> dict:
+    """Dernière sauvegarde (métriques) et sauvegardes présentes sur disque."""
+    backups = sorted(DB_DIR.glob("frigoscan_backup_*.db"), key=lambda p: p.name, reverse=True)
+    return {
+        "last": dict(_last_backup) or None,
+        "count": len(backups),
+        "total_bytes": sum(p.stat().st_size for p in backups),
+        "keep": backup_keep(),
+    }
+
+
 def reset_db():
     """Supprime et recrée la base (double confirmation côté client)."""
     if DB_PATH.exists():
@@ -17,7 +17,12 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from server.database import init_db
-from server.routers import scan, fridge, recipes, shopping, stats, settings, export_import, seasonal
+from server.conditional import ConditionalGetMiddleware
+from server.compression import CompressionMiddleware
+from server.responses import FastJSONResponse
+from server.routers import scan, fridge, recipes, shopping, stats, settings, export_import, seasonal, changes, scheduler as scheduler_router
+from server.services.scheduler import scheduler
+from server.services.upstream import get_breaker_states, get_latency_stats
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -27,6 +32,14 @@ ALLOWED_ORIGINS = os.getenv(
     "ALLOWED_ORIGINS",
     "http://localhost:8000,http://127.0.0.1:8000,http://localhost:3000"
 ).split(",")
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+# Compression des réponses : encodages par ordre de préférence ("" pour désactiver)
+COMPRESSION_ENCODINGS = tuple(
+    e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",") if e.strip()
+)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -44,8 +57,11 @@ app = FastAPI(
     title="FrigoScan",
     description="Application de gestion de frigo — tactile, locale, intelligent.",
     version="2.0.0",
+    default_response_class=FastJSONResponse,
 )
 
+# ETag / 304 sur les listes (ajouté avant CORS, qui reste la couche externe)
+app.add_middleware(ConditionalGetMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
@@ -53,6 +69,14 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["Content-Type"],
 )
+# Compression en couche externe (API et fichiers statiques) ; ETag rendu faible si compressé
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=COMPRESSION_ENCODINGS,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
 
 # ---------------------------------------------------------------------------
 # Routers
@@ -65,6 +89,8 @@ app.include_router(stats.router)
 app.include_router(settings.router)
 app.include_router(export_import.router)
 app.include_router(seasonal.router)
+app.include_router(changes.router)
+app.include_router(scheduler_router.router)
 
 # ---------------------------------------------------------------------------
 # Fichiers statiques
@@ -86,7 +112,15 @@ async def root():
 # ---------------------------------------------------------------------------
 @app.get("/api/health")
 def health():
-    return {"status": "ok", "app": "FrigoScan", "version": "2.0.0"}
+    upstreams = get_breaker_states()
+    degraded = any(b["state"] != "closed" for b in upstreams.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "app": "FrigoScan",
+        "version": "2.0.0",
+        "upstreams": upstreams,
+        "latency": get_latency_stats(),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -117,13 +151,20 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Startup
 # ---------------------------------------------------------------------------
 @app.on_event("startup")
-def startup():
+async def startup():
     logger.info("🧊 FrigoScan v2.0 — Démarrage...")
     init_db()
     logger.info("✅ Base de données initialisée.")
+    if SCHEDULER_ENABLED:
+        scheduler.start()
     logger.info("🌐 Application disponible sur http://localhost:8000")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await scheduler.stop()
+
+
 # ---------------------------------------------------------------------------
 # Lancement direct
 # ---------------------------------------------------------------------------
@@ -109,6 +109,28 @@ class FridgeItemUpdate(BaseModel):
         return v
 
 
+class BulkConsumeEntry(BaseModel):
+    id: int
+    quantity: Optional[float] = Field(None, gt=0, le=10000)  # None : tout le produit
+
+
+class BulkConsumeRequest(BaseModel):
+    items: list[BulkConsumeEntry] = Field(..., min_length=1, max_length=500)
+    user_name: str = Field("Famille", max_length=100)
+
+
+class BulkUpdateEntry(FridgeItemUpdate):
+    id: int
+
+
+class BulkUpdateRequest(BaseModel):
+    items: list[BulkUpdateEntry] = Field(..., min_length=1, max_length=500)
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=500)
+
+
 class FridgeItemOut(FridgeItemBase):
     id: int
     added_at: Optional[str] = None
@@ -241,6 +263,21 @@ class SettingBulkUpdate(BaseModel):
     settings: list[SettingUpdate]
 
 
+# ---------------------------------------------------------------------------
+# Produits de saison
+# ---------------------------------------------------------------------------
+
+class SeasonalCheckRequest(BaseModel):
+    names: list[str] = Field(..., min_length=1, max_length=500)
+    month: Optional[int] = Field(None, ge=1, le=12)
+
+    @validator('names')
+    def validate_names(cls, v):
+        if any(len(name) > 200 for name in v):
+            raise ValueError('Nom de produit trop long (200 caractères max).')
+        return v
+
+
 # ---------------------------------------------------------------------------
 # Stock minimum
 # ---------------------------------------------------------------------------
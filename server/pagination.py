@@ -0,0 +1,141 @@
+"""
+FrigoScan — Pagination par curseur (keyset).
+Les pages suivantes sont lues à partir de la clé de tri de la dernière ligne
+vue (colonnes de tri + id) au lieu d'un OFFSET : le coût d'une page ne
+dépend plus de sa profondeur. Les curseurs sont opaques pour le client.
+"""
+
+import base64
+import json
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+from server import database
+from server.database import rows_to_list
+
+APPROX_TOTAL_TTL = 30  # secondes : total approximatif mis en cache
+
+
+def encode_cursor(values: list, direction: str = "next") -> str:
+    raw = json.dumps({"k": values, "d": direction}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple[list, str]:
+    """Retourne (valeurs de clé, direction) ; 400 si le curseur est invalide."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values, direction = data["k"], data.get("d", "next")
+        if not isinstance(values, list) or len(values) != size or direction not in ("next", "prev"):
+            raise ValueError
+        return values, direction
+    except Exception:
+        raise HTTPException(400, "Curseur de pagination invalide.")
+
+
+def keyset_sql(
+    table: str,
+    where: list[str],
+    params: list,
+    keys: list[str],
+    descending: bool,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    columns: Optional[list[str]] = None,
+) -> tuple[str, list, bool]:
+    """
+    Construit la requête d'une page (toutes les colonnes, ou `columns`) ;
+    retourne (sql, paramètres, lecture à rebours).
+    """
+    clauses = list(where)
+    query_params = list(params)
+    direction = "next"
+    if cursor:
+        values, direction = decode_cursor(cursor, len(keys))
+        forward = direction == "next"
+        op = "<" if descending == forward else ">"
+        # Borne sur la première clé : permet une recherche par plage dans l'index,
+        # y compris quand la clé est une expression (index sur expression)
+        clauses.append(f"{keys[0]} {op}= ?")
+        clauses.append(f"({', '.join(keys)}) {op} ({', '.join('?' * len(keys))})")
+        query_params.append(values[0])
+        query_params.extend(values)
+
+    # En arrière, on lit dans le sens inverse puis on remet la page à l'endroit
+    reverse = direction == "prev"
+    order = "DESC" if descending != reverse else "ASC"
+    key_columns = ", ".join(f"{k} AS _k{i}" for i, k in enumerate(keys))
+    sql = f"SELECT {', '.join(columns) if columns else '*'}, {key_columns} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY " + ", ".join(f"{k} {order}" for k in keys) + " LIMIT ?"
+    query_params.append(limit + 1)
+    if offset and not cursor:
+        sql += " OFFSET ?"
+        query_params.append(offset)
+    return sql, query_params, reverse
+
+
+def keyset_page(
+    db,
+    table: str,
+    where: list[str],
+    params: list,
+    keys: list[str],
+    descending: bool,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    columns: Optional[list[str]] = None,
+) -> tuple[list[dict], Optional[str], Optional[str]]:
+    """
+    Lit une page de `table` triée par `keys` (expressions SQL, la dernière
+    doit être unique, typiquement id) dans un même sens.
+    Sans curseur, `offset` permet l'ancienne pagination par numéro de page ;
+    les curseurs renvoyés permettent ensuite de continuer sans OFFSET.
+    `columns` : colonnes lues (projection fields=), toutes par défaut.
+    Retourne (lignes, curseur suivant, curseur précédent).
+    """
+    sql, query_params, reverse = keyset_sql(table, where, params, keys, descending, limit, cursor, offset, columns)
+    rows = rows_to_list(db.execute(sql, query_params).fetchall())
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if reverse:
+        rows.reverse()
+
+    def _key(row: dict) -> list:
+        return [row[f"_k{i}"] for i in range(len(keys))]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (has_more and not reverse) or (reverse and cursor):
+            next_cursor = encode_cursor(_key(rows[-1]), "next")
+        if ((cursor or offset) and not reverse) or (reverse and has_more):
+            prev_cursor = encode_cursor(_key(rows[0]), "prev")
+    for row in rows:
+        for i in range(len(keys)):
+            row.pop(f"_k{i}", None)
+    return rows, next_cursor, prev_cursor
+
+
+_approx_totals: dict[tuple, tuple[float, int]] = {}
+
+
+def approximate_total(db, table: str, where: list[str], params: list) -> int:
+    """COUNT(*) mis en cache quelques secondes : peut être légèrement en retard."""
+    sql = f"SELECT COUNT(*) FROM {table}" + (" WHERE " + " AND ".join(where) if where else "")
+    key = (str(database.DB_PATH), sql, tuple(params))
+    hit = _approx_totals.get(key)
+    now = time.monotonic()
+    if hit and now - hit[0] < APPROX_TOTAL_TTL:
+        return hit[1]
+    total = db.execute(sql, params).fetchone()[0]
+    if len(_approx_totals) > 256:
+        _approx_totals.clear()
+    _approx_totals[key] = (now, total)
+    return total
@@ -0,0 +1,69 @@
+"""
+FrigoScan — Projection des listes (paramètre fields=).
+fields=name,dlc ne renvoie que ces champs (plus id) ; fields=-nutrition_json
+renvoie tout sauf ceux-là. Sur les tables, la projection est faite en SQL
+(seules les colonnes demandées sont lues) ; sur les recettes venues des
+API externes, sur les dictionnaires.
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+ALWAYS_INCLUDED = ("id",)
+
+
+class Fields(NamedTuple):
+    names: tuple[str, ...]
+    exclude: bool
+
+    def keep(self, name: str) -> bool:
+        if self.exclude:
+            return name not in self.names
+        return name in self.names or name in ALWAYS_INCLUDED
+
+    def columns(self, available: Iterable[str]) -> list[str]:
+        """Colonnes à lire, dans l'ordre de la table."""
+        return [c for c in available if self.keep(c)]
+
+    def apply(self, rows: list[dict]) -> list[dict]:
+        """Copies projetées (les recettes peuvent venir d'un cache partagé)."""
+        return [{k: v for k, v in row.items() if self.keep(k)} for row in rows]
+
+
+def parse_fields(fields: Optional[str], available: Optional[Iterable[str]] = None) -> Optional[Fields]:
+    """
+    Analyse fields= ; None si absent. 400 si inclusions et exclusions sont
+    mélangées, ou si un champ est inconnu (quand `available` est donné).
+    """
+    names = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    if not names:
+        return None
+    excluded = [n[1:] for n in names if n.startswith("-")]
+    if excluded and len(excluded) != len(names):
+        raise HTTPException(400, "fields= : champs à inclure ou à exclure (-champ), pas les deux.")
+    selected = excluded or names
+    if available is not None:
+        unknown = [n for n in selected if n not in set(available)]
+        if unknown:
+            raise HTTPException(400, f"Champs inconnus : {', '.join(unknown)}")
+    return Fields(tuple(selected), bool(excluded))
+
+
+def project(rows: list[dict], fields: Optional[str]) -> list[dict]:
+    """fields= appliqué à des dictionnaires ; champs absents simplement ignorés."""
+    selection = parse_fields(fields)
+    return selection.apply(rows) if selection else rows
+
+
+def table_columns(db, table: str) -> list[str]:
+    """Colonnes d'une table ou d'une vue."""
+    return [row["name"] for row in db.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def select_columns(db, table: str, fields: Optional[str]) -> Optional[list[str]]:
+    """Colonnes SQL validées pour fields= sur `table` ; None = toutes (SELECT *)."""
+    if not fields:
+        return None
+    available = table_columns(db, table)
+    return parse_fields(fields, available).columns(available)
@@ -0,0 +1,36 @@
+"""
+FrigoScan — Réponse JSON par défaut.
+Sérialisation par orjson s'il est installé (plusieurs fois plus rapide sur
+les listes de recettes), sinon json de la bibliothèque standard ; dans les
+deux cas en UTF-8 sans échappement des accents et sans espaces superflus.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compact en octets (orjson si disponible)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            pass  # entiers hors 64 bits, types exotiques : repli sur json
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Classe de réponse par défaut de l'application."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,46 @@
+"""
+FrigoScan — Router Flux de modifications.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from server.database import get_db
+from server.services.change_feed import changes_since, change_events, parse_entities
+
+router = APIRouter(prefix="/api/changes", tags=["Modifications"])
+
+
+@router.get("/")
+def get_changes(since: int = Query(..., ge=0), entities: Optional[str] = None):
+    """
+    Changements depuis la version `since`, par entité (fridge, shopping,
+    settings, stock_minimums, recipes, banned_recipes) : lignes modifiées
+    et identifiants supprimés.
+    """
+    selected = parse_entities(entities)
+    db = get_db()
+    try:
+        return {"success": True, **changes_since(db, since, selected)}
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_changes(request: Request, since: Optional[int] = Query(None, ge=0),
+                         entities: Optional[str] = None):
+    """
+    Flux SSE des changements ; reprend depuis `since` ou l'en-tête
+    Last-Event-ID après une reconnexion.
+    """
+    selected = parse_entities(entities)
+    last_event_id = request.headers.get("last-event-id", "")
+    if since is None and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        change_events(since, selected, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
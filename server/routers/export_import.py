@@ -2,38 +2,150 @@
 FrigoScan — Router Export / Import.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import StreamingResponse
-from server.database import get_db, rows_to_list, DB_PATH, init_db
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from server import database
+from server.database import get_db, rows_to_list, init_db
+from server.services import import_service
 import json
 import csv
 import io
+import logging
+import os
 import shutil
-from datetime import datetime
+import tempfile
+import zlib
+from datetime import datetime, date, timedelta
 from pathlib import Path
+from typing import Optional
 
 router = APIRouter(prefix="/api/export", tags=["Export/Import"])
 
+# Colonnes dérivées (recalculées à l'import) : exportées seulement sur demande
+DERIVED_COLUMNS = {"name_tokens", "ingredient_tokens_json", "recipe_key"}
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(400, f"{name} : format YYYY-MM-DD requis.")
+
+
+def _export_query(db, table: str, date_column: str, columns: Optional[str],
+                  date_from: Optional[str], date_to: Optional[str],
+                  where: Optional[list[str]] = None, order_by: str = "id") -> tuple[str, list, list[str]]:
+    """
+    Requête d'export : colonnes choisies (liste blanche = colonnes de la table)
+    et plage de dates inclusive sur `date_column`. Retourne (sql, params, colonnes).
+    """
+    available = [r["name"] for r in db.execute(f"PRAGMA table_info({table})").fetchall()]
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in selected if c not in available]
+        if unknown:
+            raise HTTPException(400, f"Colonnes inconnues : {', '.join(unknown)}")
+    else:
+        selected = [c for c in available if c not in DERIVED_COLUMNS]
+
+    clauses = list(where or [])
+    params: list = []
+    start, end = _parse_day(date_from, "date_from"), _parse_day(date_to, "date_to")
+    if start:
+        clauses.append(f"{date_column} >= ?")
+        params.append(start.isoformat())
+    if end:
+        clauses.append(f"{date_column} < ?")
+        params.append((end + timedelta(days=1)).isoformat())
+
+    sql = f"SELECT {', '.join(selected)} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {order_by}"
+    return sql, params, selected
+
+
+def _csv_chunks(sql: str, params: list, header: list[str]):
+    """CSV en flux : BOM + en-tête, puis un morceau par lot fetchmany."""
+    db = get_db(check_same_thread=False)
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        yield "\ufeff" + buffer.getvalue()
+        for rows in _iter_batches(db, sql, tuple(params)):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(tuple(r) for r in rows)
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def _csv_response(sql: str, params: list, header: list[str], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        (chunk.encode("utf-8") for chunk in _csv_chunks(sql, params, header)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+def _xlsx_response(sql: str, params: list, header: list[str], title: str, filename: str) -> FileResponse:
+    """
+    XLSX en mode write-only d'openpyxl (lignes écrites au fil de l'eau,
+    mémoire bornée), dans un fichier temporaire supprimé après l'envoi.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(header)
+    db = get_db()
+    try:
+        for rows in _iter_batches(db, sql, tuple(params)):
+            for row in rows:
+                sheet.append(list(row))
+    finally:
+        db.close()
+    fd, path = tempfile.mkstemp(suffix=".xlsx", prefix="frigoscan_export_")
+    os.close(fd)
+    workbook.save(path)
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=filename,
+        background=BackgroundTask(os.remove, path),
+    )
+
 
 @router.get("/fridge/csv")
-def export_fridge_csv():
-    """Exporte le contenu du frigo en CSV."""
+def export_fridge_csv(columns: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Exporte le contenu du frigo en CSV (en flux ; filtre sur la date d'ajout, colonnes au choix)."""
     db = get_db()
     try:
-        rows = rows_to_list(db.execute("SELECT * FROM fridge_items WHERE status='active'").fetchall())
-        output = io.StringIO()
-        if rows:
-            writer = csv.DictWriter(output, fieldnames=rows[0].keys())
-            writer.writeheader()
-            writer.writerows(rows)
-        content = output.getvalue()
-        return StreamingResponse(
-            io.BytesIO(content.encode("utf-8-sig")),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=frigoscan_frigo_{datetime.now().strftime('%Y%m%d')}.csv"}
+        sql, params, header = _export_query(
+            db, "fridge_items", "added_at", columns, date_from, date_to, where=["status='active'"]
+        )
+    finally:
+        db.close()
+    return _csv_response(sql, params, header, f"frigoscan_frigo_{datetime.now().strftime('%Y%m%d')}.csv")
+
+
+@router.get("/fridge/xlsx")
+def export_fridge_xlsx(columns: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Exporte le contenu du frigo en XLSX."""
+    db = get_db()
+    try:
+        sql, params, header = _export_query(
+            db, "fridge_items", "added_at", columns, date_from, date_to, where=["status='active'"]
         )
     finally:
         db.close()
+    return _xlsx_response(sql, params, header, "Frigo", f"frigoscan_frigo_{datetime.now().strftime('%Y%m%d')}.xlsx")
 
 
 @router.get("/fridge/json")
@@ -53,24 +165,32 @@ def export_fridge_json():
 
 
 @router.get("/stats/csv")
-def export_stats_csv():
-    """Exporte l'historique de consommation en CSV."""
+def export_stats_csv(columns: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Exporte l'historique de consommation en CSV (en flux ; plage de dates et colonnes au choix)."""
     db = get_db()
     try:
-        rows = rows_to_list(db.execute("SELECT * FROM consumption_history ORDER BY consumed_at DESC").fetchall())
-        output = io.StringIO()
-        if rows:
-            writer = csv.DictWriter(output, fieldnames=rows[0].keys())
-            writer.writeheader()
-            writer.writerows(rows)
-        content = output.getvalue()
-        return StreamingResponse(
-            io.BytesIO(content.encode("utf-8-sig")),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=frigoscan_historique_{datetime.now().strftime('%Y%m%d')}.csv"}
+        sql, params, header = _export_query(
+            db, "consumption_history", "consumed_at", columns, date_from, date_to,
+            order_by="consumed_at DESC, id DESC"
+        )
+    finally:
+        db.close()
+    return _csv_response(sql, params, header, f"frigoscan_historique_{datetime.now().strftime('%Y%m%d')}.csv")
+
+
+@router.get("/stats/xlsx")
+def export_stats_xlsx(columns: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Exporte l'historique de consommation en XLSX."""
+    db = get_db()
+    try:
+        sql, params, header = _export_query(
+            db, "consumption_history", "consumed_at", columns, date_from, date_to,
+            order_by="consumed_at DESC, id DESC"
         )
     finally:
         db.close()
+    return _xlsx_response(sql, params, header, "Historique",
+                          f"frigoscan_historique_{datetime.now().strftime('%Y%m%d')}.xlsx")
 
 
 @router.get("/recipes/json")
@@ -89,168 +209,231 @@ def export_recipes_json():
         db.close()
 
 
-@router.get("/all/json")
-def export_all_json():
-    """Exporte toutes les données en JSON."""
-    db = get_db()
+EXPORT_TABLES = [
+    ("fridge", "fridge_items"),
+    ("products", "products"),
+    ("recipes", "recipes"),
+    ("consumption_history", "consumption_history"),
+    ("weekly_menu", "weekly_menu"),
+    ("shopping_list", "shopping_list"),
+    ("settings", "settings"),
+    ("stock_minimums", "stock_minimums"),
+]
+FETCH_BATCH = 500  # lignes lues par fetchmany
+
+
+def _iter_batches(db, sql: str, params: tuple = ()):
+    """Parcourt une requête par lots (fetchmany) : mémoire bornée."""
+    cursor = db.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH)
+        if not rows:
+            break
+        yield rows
+
+
+def _gzip_stream(chunks):
+    """Compression gzip à la volée d'un flux de morceaux str/bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 : en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export_all_chunks(ndjson: bool = False):
+    """
+    Génère l'export complet table par table, lot par lot, dans une seule
+    transaction de lecture (instantané cohérent, sans bloquer les écritures WAL).
+    JSON : même structure que l'export historique ; NDJSON : une ligne par
+    enregistrement {"table": ..., "row": {...}} après une ligne d'en-tête.
+    """
+    db = get_db(check_same_thread=False)
     try:
-        data = {
-            "export_date": datetime.now().isoformat(),
-            "fridge": rows_to_list(db.execute("SELECT * FROM fridge_items").fetchall()),
-            "products": rows_to_list(db.execute("SELECT * FROM products").fetchall()),
-            "recipes": rows_to_list(db.execute("SELECT * FROM recipes").fetchall()),
-            "consumption_history": rows_to_list(db.execute("SELECT * FROM consumption_history").fetchall()),
-            "weekly_menu": rows_to_list(db.execute("SELECT * FROM weekly_menu").fetchall()),
-            "shopping_list": rows_to_list(db.execute("SELECT * FROM shopping_list").fetchall()),
-            "settings": rows_to_list(db.execute("SELECT * FROM settings").fetchall()),
-            "stock_minimums": rows_to_list(db.execute("SELECT * FROM stock_minimums").fetchall()),
-        }
-        content = json.dumps(data, ensure_ascii=False, indent=2)
-        return StreamingResponse(
-            io.BytesIO(content.encode("utf-8")),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=frigoscan_backup_{datetime.now().strftime('%Y%m%d')}.json"}
-        )
+        db.execute("BEGIN")
+        export_date = datetime.now().isoformat()
+        if ndjson:
+            yield json.dumps({"format": "frigoscan-ndjson", "export_date": export_date}) + "\n"
+        else:
+            yield "{\n" + f'  "export_date": {json.dumps(export_date)}'
+        for key, table in EXPORT_TABLES:
+            if not ndjson:
+                yield f',\n  "{key}": ['
+            first = True
+            for rows in _iter_batches(db, f"SELECT * FROM {table}"):
+                if ndjson:
+                    yield "".join(
+                        json.dumps({"table": key, "row": dict(r)}, ensure_ascii=False) + "\n" for r in rows
+                    )
+                else:
+                    parts = []
+                    for r in rows:
+                        parts.append(("\n    " if first else ",\n    ") + json.dumps(dict(r), ensure_ascii=False))
+                        first = False
+                    yield "".join(parts)
+            if not ndjson:
+                yield "]" if first else "\n  ]"
+        if not ndjson:
+            yield "\n}\n"
     finally:
+        db.rollback()
         db.close()
 
 
-@router.post("/import/json")
-async def import_all_json(file: UploadFile = File(...)):
-    """Importe des données depuis un fichier JSON (fusion) avec transactions atomiques."""
-    
-    # 1. Validation taille fichier
-    MAX_SIZE = 10 * 1024 * 1024  # 10MB
+@router.get("/all/json")
+def export_all_json(format: str = Query("json", pattern="^(json|ndjson)$"), gzip: bool = False):
+    """
+    Exporte toutes les données en JSON (ou NDJSON), en flux : mémoire
+    constante quelle que soit la taille de l'historique. gzip=true compresse
+    le flux à la volée.
+    """
+    ndjson = format == "ndjson"
+    chunks = _export_all_chunks(ndjson=ndjson)
+    filename = f"frigoscan_backup_{datetime.now().strftime('%Y%m%d')}.{'ndjson' if ndjson else 'json'}"
+    media_type = "application/x-ndjson" if ndjson else "application/json"
+    if gzip:
+        chunks = _gzip_stream(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+UPLOAD_CHUNK = 1024 * 1024  # octets copiés à chaque lecture de l'upload
+
+
+async def _save_upload(file: UploadFile, path: Path) -> None:
+    """Copie l'upload sur disque par morceaux (aucun plafond de taille)."""
     try:
-        content = await file.read()
+        with open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK):
+                out.write(chunk)
     except Exception as e:
+        path.unlink(missing_ok=True)
         raise HTTPException(400, f"Erreur lecture fichier: {str(e)}")
-    
-    if len(content) > MAX_SIZE:
-        raise HTTPException(
-            400,
-            f"Fichier trop volumineux ({len(content)} > {MAX_SIZE} bytes)"
-        )
-    
-    # 2. Parse et validation JSON
-    try:
-        data = json.loads(content.decode("utf-8"))
-    except json.JSONDecodeError as e:
-        raise HTTPException(400, f"JSON invalide: {str(e)}")
-    except Exception as e:
-        raise HTTPException(400, f"Erreur décodage: {str(e)}")
-    
-    # 3. Valider schéma (clés recommandées)
-    valid_keys = {'products', 'fridge', 'recipes', 'consumption_history', 'weekly_menu', 'shopping_list', 'settings', 'stock_minimums', 'export_date'}
-    if not isinstance(data, dict):
-        raise HTTPException(400, "Le JSON doit être un objet (dictionnaire)")
-    
-    unknown_keys = set(data.keys()) - valid_keys
-    if unknown_keys:
-        raise HTTPException(400, f"Clés inconnues: {', '.join(unknown_keys)}")
-
-    # 4. Import ATOMIQUE (tout ou rien) avec transaction
-    db = get_db()
+
+
+@router.post("/import/json")
+async def import_all_json(file: UploadFile = File(...)):
+    """
+    Importe des données depuis un fichier JSON ou NDJSON (fusion), tout ou rien.
+    Le fichier est lu en flux et inséré par lots dans une seule transaction.
+    """
+    fd, tmp = tempfile.mkstemp(suffix=".upload", prefix="frigoscan_import_")
+    os.close(fd)
+    path = Path(tmp)
+    await _save_upload(file, path)
     try:
-        # Démarrer transaction IMMÉDIATEMENT
-        db.execute("BEGIN IMMEDIATE")
-        imported = {}
-
-        # Import produits
-        if "products" in data:
-            if not isinstance(data["products"], list):
-                raise ValueError("'products' doit être une liste")
-            for idx, p in enumerate(data["products"]):
-                try:
-                    db.execute(
-                        "INSERT OR IGNORE INTO products (barcode, name, brand, image_url, category, nutrition_json) VALUES (?, ?, ?, ?, ?, ?)",
-                        (p.get("barcode"), p.get("name", ""), p.get("brand"), p.get("image_url"), p.get("category"), p.get("nutrition_json", "{}"))
-                    )
-                except Exception as e:
-                    raise ValueError(f"Produit #{idx} invalide: {str(e)}")
-            imported["products"] = len(data["products"])
-
-        # Import frigo
-        if "fridge" in data:
-            if not isinstance(data["fridge"], list):
-                raise ValueError("'fridge' doit être une liste")
-            for idx, item in enumerate(data["fridge"]):
-                try:
-                    db.execute(
-                        "INSERT INTO fridge_items (name, barcode, image_url, category, quantity, unit, dlc, nutrition_json, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                        (item.get("name"), item.get("barcode"), item.get("image_url"), item.get("category"),
-                         item.get("quantity", 1), item.get("unit", "unité"), item.get("dlc"),
-                         item.get("nutrition_json", "{}"), item.get("status", "active"))
-                    )
-                except Exception as e:
-                    raise ValueError(f"Article frigo #{idx} invalide: {str(e)}")
-            imported["fridge"] = len(data["fridge"])
-
-        # Import recettes
-        if "recipes" in data:
-            if not isinstance(data["recipes"], list):
-                raise ValueError("'recipes' doit être une liste")
-            for idx, r in enumerate(data["recipes"]):
-                try:
-                    db.execute(
-                        "INSERT INTO recipes (title, ingredients_json, instructions, prep_time, cook_time, servings, source_url, image_url, tags_json, diet_tags_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                        (r.get("title"), r.get("ingredients_json", "[]"), r.get("instructions"),
-                         r.get("prep_time", 0), r.get("cook_time", 0), r.get("servings", 4),
-                         r.get("source_url"), r.get("image_url"), r.get("tags_json", "[]"), r.get("diet_tags_json", "[]"))
-                    )
-                except Exception as e:
-                    raise ValueError(f"Recette #{idx} invalide: {str(e)}")
-            imported["recipes"] = len(data["recipes"])
-
-        # Import settings
-        if "settings" in data:
-            if not isinstance(data["settings"], list):
-                raise ValueError("'settings' doit être une liste")
-            for idx, s in enumerate(data["settings"]):
-                try:
-                    db.execute(
-                        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                        (s.get("key"), s.get("value", ""))
-                    )
-                except Exception as e:
-                    raise ValueError(f"Setting #{idx} invalide: {str(e)}")
-            imported["settings"] = len(data["settings"])
-
-        # COMMIT si tout réussit
-        db.commit()
-        return {
-            "success": True,
-            "imported": imported,
-            "message": f"Données importées avec succès. {sum(imported.values())} lignes ajoutées."
-        }
-    
+        imported = await run_in_threadpool(import_service.import_file, path, True)
+    except import_service.ImportFormatError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
-        # ROLLBACK si erreur!
-        try:
-            db.rollback()
-        except:
-            pass
-        
-        error_msg = str(e)
-        import logging
         logging.getLogger("frigoscan").error(f"Import échoué, ROLLBACK: {e}")
-        
-        raise HTTPException(
-            500,
-            f"Erreur import: {error_msg}. Aucune donnée n'a été modifiée."
-        )
-    
+        raise HTTPException(500, f"Erreur import: {e}. Aucune donnée n'a été modifiée.")
     finally:
-        db.close()
+        path.unlink(missing_ok=True)
+    return {
+        "success": True,
+        "imported": imported,
+        "message": f"Données importées avec succès. {sum(imported.values())} lignes ajoutées."
+    }
+
+
+@router.post("/import/stream", status_code=202)
+async def import_stream(background_tasks: BackgroundTasks, file: UploadFile = File(...), atomic: bool = False):
+    """
+    Import en tâche de fond, suivi via /import/jobs/{id}.
+    Par défaut chaque lot est validé avec son point de reprise : un import
+    échoué peut être repris (/resume) sans ré-insérer les lignes déjà passées.
+    """
+    job_id, path = import_service.create_import_job(file.filename or "import.json", atomic)
+    await _save_upload(file, path)
+    background_tasks.add_task(import_service.run_import_job, job_id)
+    return {"success": True, "job_id": job_id, "status_url": f"/api/export/import/jobs/{job_id}"}
+
+
+@router.get("/import/jobs/{job_id}")
+def get_import_job(job_id: int):
+    """Progression d'un import : octets lus, lignes validées, lignes par table, erreur."""
+    job = import_service.get_import_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Import introuvable.")
+    job.pop("file_path", None)
+    return job
+
+
+@router.post("/import/jobs/{job_id}/resume", status_code=202)
+def resume_import_job(job_id: int, background_tasks: BackgroundTasks):
+    """Relance un import échoué ou interrompu à partir de son dernier lot validé."""
+    job = import_service.get_import_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Import introuvable.")
+    if job["status"] == "done" or import_service.is_job_active(job_id):
+        raise HTTPException(409, "Cet import n'est pas à reprendre.")
+    if not Path(job["file_path"]).exists():
+        raise HTTPException(410, "Fichier de l'import supprimé : reprise impossible.")
+    background_tasks.add_task(import_service.run_import_job, job_id)
+    return {"success": True, "job_id": job_id, "resume_from": job["committed_rows"]}
+
+
+def _zstd_stream(chunks):
+    """Compresse un flux d'octets en zstd (module zstandard, optionnel)."""
+    import zstandard
+    compressor = zstandard.ZstdCompressor().compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _file_chunks(path: Path, remove: bool = True):
+    """Lit un fichier par blocs, puis le supprime (fichier temporaire)."""
+    try:
+        with open(path, "rb") as fp:
+            while chunk := fp.read(UPLOAD_CHUNK):
+                yield chunk
+    finally:
+        if remove:
+            path.unlink(missing_ok=True)
 
 
 @router.get("/database/backup")
-def download_database():
-    """Télécharge la base de données SQLite complète."""
-    if not DB_PATH.exists():
+def download_database(compression: str = Query("none", pattern="^(none|gzip|zstd)$")):
+    """
+    Télécharge une sauvegarde cohérente de la base SQLite (API backup, y compris
+    les pages du journal WAL), éventuellement compressée en gzip ou zstd.
+    """
+    if not database.DB_PATH.exists():
         raise HTTPException(404, "Base de données non trouvée.")
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise HTTPException(400, "Compression zstd indisponible (module zstandard non installé).")
+
+    fd, tmp = tempfile.mkstemp(suffix=".db", prefix="frigoscan_download_")
+    os.close(fd)
+    path = Path(tmp)
+    try:
+        database.backup_to(path)
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(500, f"Erreur lors de la sauvegarde : {str(e)}")
+
+    filename = f"frigoscan_{datetime.now().strftime('%Y%m%d')}.db"
+    chunks = _file_chunks(path)
+    media_type = "application/octet-stream"
+    if compression == "gzip":
+        chunks, filename, media_type = _gzip_stream(chunks), filename + ".gz", "application/gzip"
+    elif compression == "zstd":
+        chunks, filename, media_type = _zstd_stream(chunks), filename + ".zst", "application/zstd"
     return StreamingResponse(
-        open(str(DB_PATH), "rb"),
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename=frigoscan_{datetime.now().strftime('%Y%m%d')}.db"}
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -3,13 +3,55 @@ FrigoScan — Router Frigo (gestion du contenu du réfrigérateur).
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from server.database import get_db, dict_from_row, rows_to_list
-from server.models import FridgeItemCreate, FridgeItemUpdate, ConsumptionCreate
+from server.database import get_db, dict_from_row, rows_to_list, record_consumption_daily, record_consumption_daily_many
+from server.models import (
+    FridgeItemCreate, FridgeItemUpdate, ConsumptionCreate,
+    BulkConsumeRequest, BulkUpdateRequest, BulkDeleteRequest,
+)
+from server.projection import select_columns
+from server.pagination import keyset_page, approximate_total
+from server.services.change_feed import entity_changes, entity_version
+from server.services.ingredient_tokens import name_tokens_json
+from server.services.scheduler import enqueue_job, scheduler
+from server.services.stock_service import find_low_stock, stock_alert_message
 from datetime import datetime, date, timedelta
+from typing import Optional
 import json
 
 router = APIRouter(prefix="/api/fridge", tags=["Frigo"])
 
+# Clés de tri (colonnes + id pour départager) et sens, pour la pagination par curseur
+FRIDGE_SORT_KEYS = {
+    "added_at": (["added_at", "id"], True),
+    "dlc": (["COALESCE(dlc, '9999-12-31')", "id"], False),  # sans DLC en dernier
+    "name": (["name", "id"], False),
+    "category": (["COALESCE(category, '')", "id"], False),
+}
+
+
+def _fridge_filters(status: str, category: str = None, filter_dlc: str = None) -> tuple[list[str], list]:
+    """Clauses WHERE de la liste du frigo (status littéral pour les index partiels)."""
+    where: list[str] = []
+    params: list = []
+    if status == "active":
+        where.append("status = 'active'")
+    else:
+        where.append("status = ?")
+        params.append(status)
+
+    if category:
+        where.append("category = ?")
+        params.append(category)
+
+    if filter_dlc == "soon":
+        soon = (date.today() + timedelta(days=3)).isoformat()
+        where.append("dlc IS NOT NULL AND dlc <= ? AND dlc >= ?")
+        params.extend([soon, date.today().isoformat()])
+    elif filter_dlc == "expired":
+        where.append("dlc > '' AND dlc < ?")  # DLC vide = pas de DLC
+        params.append(date.today().isoformat())
+    return where, params
+
 
 @router.get("/")
 def list_fridge_items(
@@ -19,125 +61,242 @@ def list_fridge_items(
     filter_dlc: str = None,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    since: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None,
 ):
     """
     Liste le contenu du frigo avec pagination.
     filter_dlc: 'soon' (DLC < 3 jours), 'expired' (DLC dépassée), None (tout)
+    Pagination par numéro de page, ou par curseur (next_cursor / prev_cursor
+    renvoyés) ; avec un curseur, le total est approximatif et optionnel.
+    Avec `since` (version renvoyée par un appel précédent) : seulement les
+    produits modifiés / supprimés depuis (upserts, deletes).
+    `fields` : colonnes renvoyées (name,dlc) ou exclues (-nutrition_json).
     """
     db = get_db()
     try:
-        query = "SELECT * FROM fridge_items WHERE status = ?"
-        count_query = "SELECT COUNT(*) FROM fridge_items WHERE status = ?"
-        params = [status]
-
-        if category:
-            query += " AND category = ?"
-            count_query += " AND category = ?"
-            params.append(category)
-
-        if filter_dlc == "soon":
-            soon = (date.today() + timedelta(days=3)).isoformat()
-            query += " AND dlc IS NOT NULL AND dlc <= ? AND dlc >= ?"
-            count_query += " AND dlc IS NOT NULL AND dlc <= ? AND dlc >= ?"
-            params.extend([soon, date.today().isoformat()])
-        elif filter_dlc == "expired":
-            query += " AND dlc IS NOT NULL AND dlc < ?"
-            count_query += " AND dlc IS NOT NULL AND dlc < ?"
-            params.append(date.today().isoformat())
-
-        sort_map = {
-            "added_at": "added_at DESC",
-            "dlc": "CASE WHEN dlc IS NULL THEN 1 ELSE 0 END, dlc ASC",
-            "name": "name ASC",
-            "category": "category ASC",
-        }
-        query += f" ORDER BY {sort_map.get(sort, 'added_at DESC')}"
-
-        # Total pour pagination
-        total = db.execute(count_query, params).fetchone()[0]
-        
-        # Pagination
-        offset = (page - 1) * limit
-        query += f" LIMIT ? OFFSET ?"
-        query_params = params + [limit, offset]
-
-        rows = db.execute(query, query_params).fetchall()
-        items = rows_to_list(rows)
-
-        # Enrichir avec statut DLC
-        today = date.today()
-        for item in items:
-            raw_dlc = item.get("dlc")
-            if raw_dlc:
-                try:
-                    dlc_date = raw_dlc if isinstance(raw_dlc, date) else date.fromisoformat(str(raw_dlc))
-                    delta = (dlc_date - today).days
-                    if delta < 0:
-                        item["dlc_status"] = "expired"
-                    elif delta <= 3:
-                        item["dlc_status"] = "soon"
-                    else:
-                        item["dlc_status"] = "ok"
-                    item["dlc_days_left"] = delta
-                    item["dlc"] = dlc_date.isoformat()
-                except (ValueError, TypeError):
-                    item["dlc_status"] = "unknown"
-            else:
-                item["dlc_status"] = "none"
-
-        pages = (total + limit - 1) // limit  # Ceiling division
+        if since is not None:
+            return entity_changes(db, "fridge", since)
+        version = entity_version(db, "fridge")
+        where, params = _fridge_filters(status, category, filter_dlc)
+        columns = select_columns(db, "fridge_items_dlc", fields)
+
+        keys, descending = FRIDGE_SORT_KEYS.get(sort, FRIDGE_SORT_KEYS["added_at"])
+        if cursor:
+            total = approximate_total(db, "fridge_items", where, params) if with_total else None
+        else:
+            # Total exact pour la pagination par numéro de page
+            total = db.execute(
+                "SELECT COUNT(*) FROM fridge_items WHERE " + " AND ".join(where), params
+            ).fetchone()[0]
+        # Statut DLC (dlc_status, dlc_days_left) calculé par la vue fridge_items_dlc
+        items, next_cursor, prev_cursor = keyset_page(
+            db, "fridge_items_dlc", where, params, keys, descending, limit,
+            cursor=cursor, offset=(page - 1) * limit, columns=columns,
+        )
+
+        pages = (total + limit - 1) // limit if total is not None else None  # Ceiling division
         return {
             "success": True,
             "items": items,
-            "page": page,
+            "page": None if cursor else page,
             "limit": limit,
             "total": total,
             "pages": pages,
-            "count": len(items)
+            "count": len(items),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "version": version,
         }
     finally:
         db.close()
 
 
+FRIDGE_INSERT_COLUMNS = "product_id, name, barcode, image_url, category, quantity, unit, dlc, nutrition_json, name_tokens"
+
+
 @router.post("/")
 def add_fridge_item(item: FridgeItemCreate):
     """Ajoute un produit au frigo."""
     db = get_db()
     try:
         cursor = db.execute(
-            """INSERT INTO fridge_items (product_id, name, barcode, image_url, category, quantity, unit, dlc, nutrition_json)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            f"INSERT INTO fridge_items ({FRIDGE_INSERT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (item.product_id, item.name, item.barcode, item.image_url,
-             item.category, item.quantity, item.unit, item.dlc, item.nutrition_json)
+             item.category, item.quantity, item.unit, item.dlc, item.nutrition_json, name_tokens_json(item.name))
         )
-        db.commit()
         new_id = cursor.lastrowid
+        # Pré-charger les recettes pour ce produit (tâche de fond)
+        enqueue_job("prefetch_search", {"names": [item.name]}, db=db)
+        db.commit()
+        scheduler.wake()
         row = db.execute("SELECT * FROM fridge_items WHERE id = ?", (new_id,)).fetchone()
         return {"success": True, "item": dict_from_row(row), "message": f"'{item.name}' ajouté au frigo."}
     finally:
         db.close()
 
 
+BATCH_INSERT_CHUNK = 500  # lignes par INSERT multi-valeurs (limite de paramètres SQLite)
+
+
 @router.post("/batch")
 def add_fridge_items_batch(items: list[FridgeItemCreate]):
     """Ajoute plusieurs produits au frigo (panier temporaire → frigo)."""
     db = get_db()
     added = []
     try:
-        for item in items:
-            cursor = db.execute(
-                """INSERT INTO fridge_items (product_id, name, barcode, image_url, category, quantity, unit, dlc, nutrition_json)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (item.product_id, item.name, item.barcode, item.image_url,
-                 item.category, item.quantity, item.unit, item.dlc, item.nutrition_json)
-            )
-            added.append({"id": cursor.lastrowid, "name": item.name})
+        values = [
+            (item.product_id, item.name, item.barcode, item.image_url,
+             item.category, item.quantity, item.unit, item.dlc, item.nutrition_json, name_tokens_json(item.name))
+            for item in items
+        ]
+        # INSERT multi-lignes ... RETURNING : les lignes complètes sans relecture
+        for start in range(0, len(values), BATCH_INSERT_CHUNK):
+            chunk = values[start:start + BATCH_INSERT_CHUNK]
+            placeholders = ", ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"] * len(chunk))
+            rows = db.execute(
+                f"INSERT INTO fridge_items ({FRIDGE_INSERT_COLUMNS}) VALUES {placeholders} RETURNING *",
+                [v for row in chunk for v in row]
+            ).fetchall()
+            added.extend(rows_to_list(rows))
+        if added:
+            names = sorted({a["name"] for a in added})
+            enqueue_job("prefetch_search", {"names": names}, db=db)
         db.commit()
+        scheduler.wake()
         return {"success": True, "added": added, "count": len(added), "message": f"{len(added)} produit(s) ajouté(s) au frigo."}
     finally:
         db.close()
 
 
+def _values_cte(rows: list[tuple], columns: str) -> tuple[str, list]:
+    """CTE VALUES pour passer une liste de tuples en une seule requête."""
+    width = len(rows[0])
+    placeholders = ", ".join(["(" + ", ".join("?" * width) + ")"] * len(rows))
+    return f"WITH req({columns}) AS (VALUES {placeholders})", [v for row in rows for v in row]
+
+
+@router.post("/bulk/consume")
+def consume_fridge_items_bulk(request: BulkConsumeRequest):
+    """
+    Consomme plusieurs produits en une transaction. Une quantité inférieure
+    au stock du produit le décrémente (il reste actif) ; sans quantité, ou
+    au-delà, le produit est entièrement consommé.
+    """
+    requested = {}
+    for entry in request.items:
+        requested[entry.id] = entry.quantity  # le dernier l'emporte en cas de doublon
+    db = get_db()
+    try:
+        cte, params = _values_cte(list(requested.items()), "id, qty")
+        rows = db.execute(
+            f"""{cte}
+                UPDATE fridge_items SET
+                    status = CASE WHEN req.qty IS NULL OR req.qty >= fridge_items.quantity
+                                  THEN 'consumed' ELSE fridge_items.status END,
+                    quantity = CASE WHEN req.qty IS NULL OR req.qty >= fridge_items.quantity
+                                    THEN fridge_items.quantity ELSE fridge_items.quantity - req.qty END
+                FROM req
+                WHERE fridge_items.id = req.id AND fridge_items.status = 'active'
+                RETURNING fridge_items.id, name, category, quantity, unit, status""",
+            params
+        ).fetchall()
+
+        consumed = []
+        for row in rows:
+            # Entièrement consommé : quantité inchangée ; sinon la quantité demandée
+            qty = row["quantity"] if row["status"] == "consumed" else requested[row["id"]]
+            consumed.append({**dict(row), "consumed_quantity": qty})
+
+        db.executemany(
+            """INSERT INTO consumption_history (fridge_item_id, product_name, category, quantity, unit, user_name)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(c["id"], c["name"], c["category"], c["consumed_quantity"], c["unit"], request.user_name) for c in consumed]
+        )
+        record_consumption_daily_many(
+            db, [(c["name"], c["category"], request.user_name, c["consumed_quantity"]) for c in consumed]
+        )
+        db.commit()
+
+        # Stocks minimum vérifiés une seule fois pour les produits concernés
+        alerts = [stock_alert_message(r) for r in find_low_stock(db, [c["name"] for c in consumed])]
+        found = {c["id"] for c in consumed}
+        return {
+            "success": True,
+            "consumed": consumed,
+            "count": len(consumed),
+            "not_found": [i for i in requested if i not in found],
+            "stock_alerts": alerts,
+            "message": f"{len(consumed)} produit(s) consommé(s).",
+        }
+    finally:
+        db.close()
+
+
+@router.post("/bulk/update")
+def update_fridge_items_bulk(request: BulkUpdateRequest):
+    """Met à jour plusieurs produits en une transaction (executemany par jeu de champs)."""
+    groups: dict[tuple, list] = {}
+    ids = []
+    for entry in request.items:
+        data = {k: v for k, v in entry.model_dump(exclude_unset=True).items() if k != "id" and v is not None}
+        if "name" in data:
+            data["name_tokens"] = name_tokens_json(data["name"])
+        ids.append(entry.id)
+        if data:
+            fields = tuple(sorted(data))
+            groups.setdefault(fields, []).append([data[f] for f in fields] + [entry.id])
+    db = get_db()
+    try:
+        for fields, values in groups.items():
+            db.executemany(
+                f"UPDATE fridge_items SET {', '.join(f'{f} = ?' for f in fields)} WHERE id = ?", values
+            )
+        db.commit()
+        ids = list(dict.fromkeys(ids))
+        rows = rows_to_list(db.execute(
+            f"SELECT * FROM fridge_items WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall())
+        found = {r["id"] for r in rows}
+        return {
+            "success": True,
+            "items": rows,
+            "count": len(rows),
+            "not_found": [i for i in ids if i not in found],
+        }
+    finally:
+        db.close()
+
+
+@router.post("/bulk/delete")
+def delete_fridge_items_bulk(request: BulkDeleteRequest):
+    """Supprime plusieurs produits en une seule requête."""
+    ids = list(dict.fromkeys(request.ids))
+    db = get_db()
+    try:
+        rows = db.execute(
+            f"DELETE FROM fridge_items WHERE id IN ({','.join('?' * len(ids))}) RETURNING id, name, status",
+            ids
+        ).fetchall()
+        db.commit()
+        deleted = rows_to_list(rows)
+        active_names = [r["name"] for r in deleted if r["status"] == "active"]
+        alerts = [stock_alert_message(r) for r in find_low_stock(db, active_names)]
+        found = {r["id"] for r in deleted}
+        return {
+            "success": True,
+            "deleted": [r["id"] for r in deleted],
+            "count": len(deleted),
+            "not_found": [i for i in ids if i not in found],
+            "stock_alerts": alerts,
+            "message": f"{len(deleted)} produit(s) supprimé(s).",
+        }
+    finally:
+        db.close()
+
+
 @router.put("/{item_id}")
 def update_fridge_item(item_id: int, update: FridgeItemUpdate):
     """Met à jour un produit du frigo."""
@@ -150,6 +309,8 @@ def update_fridge_item(item_id: int, update: FridgeItemUpdate):
         fields = []
         values = []
         update_data = update.model_dump(exclude_unset=True)
+        if update_data.get("name") is not None:
+            update_data["name_tokens"] = name_tokens_json(update_data["name"])
         for key, val in update_data.items():
             if val is not None:
                 fields.append(f"{key} = ?")
@@ -197,6 +358,7 @@ def consume_fridge_item(item_id: int, user_name: str = "Famille"):
                VALUES (?, ?, ?, ?, ?, ?)""",
             (item_id, item["name"], item["category"], item["quantity"], item["unit"], user_name)
         )
+        record_consumption_daily(db, item["name"], item["category"], user_name, item["quantity"])
         # Marquer comme consommé
         db.execute("UPDATE fridge_items SET status = 'consumed' WHERE id = ?", (item_id,))
         db.commit()
@@ -245,29 +407,25 @@ def clear_fridge(confirm: bool = False):
 
 @router.get("/stats/summary")
 def fridge_summary():
-    """Résumé rapide du frigo."""
+    """Résumé rapide du frigo (une seule requête sur l'index partiel des produits actifs)."""
     db = get_db()
     try:
-        total = db.execute("SELECT COUNT(*) as c FROM fridge_items WHERE status='active'").fetchone()["c"]
         today = date.today().isoformat()
         soon = (date.today() + timedelta(days=3)).isoformat()
-        expiring = db.execute(
-            "SELECT COUNT(*) as c FROM fridge_items WHERE status='active' AND dlc IS NOT NULL AND dlc <= ? AND dlc >= ?",
-            (soon, today)
-        ).fetchone()["c"]
-        expired = db.execute(
-            "SELECT COUNT(*) as c FROM fridge_items WHERE status='active' AND dlc IS NOT NULL AND dlc < ?",
-            (today,)
-        ).fetchone()["c"]
-        categories = db.execute(
-            "SELECT category, COUNT(*) as c FROM fridge_items WHERE status='active' GROUP BY category ORDER BY c DESC"
+        rows = db.execute(
+            """SELECT category, COUNT(*) as c,
+                      SUM(dlc IS NOT NULL AND dlc <= ? AND dlc >= ?) as expiring,
+                      SUM(dlc > '' AND dlc < ?) as expired
+               FROM fridge_items WHERE status = 'active'
+               GROUP BY category ORDER BY c DESC""",
+            (soon, today, today)
         ).fetchall()
         return {
             "success": True,
-            "total": total,
-            "expiring_soon": expiring,
-            "expired": expired,
-            "categories": rows_to_list(categories),
+            "total": sum(r["c"] for r in rows),
+            "expiring_soon": sum(r["expiring"] for r in rows),
+            "expired": sum(r["expired"] for r in rows),
+            "categories": [{"category": r["category"], "c": r["c"]} for r in rows],
         }
     finally:
         db.close()
@@ -275,20 +433,5 @@ def fridge_summary():
 
 def _check_stock_alert(db, product_name: str) -> dict | None:
     """Vérifie si le stock est bas pour un produit donné."""
-    min_row = db.execute(
-        "SELECT * FROM stock_minimums WHERE LOWER(product_name) = LOWER(?)", (product_name,)
-    ).fetchone()
-    if not min_row:
-        return None
-    current = db.execute(
-        "SELECT COALESCE(SUM(quantity), 0) as total FROM fridge_items WHERE LOWER(name) = LOWER(?) AND status = 'active'",
-        (product_name,)
-    ).fetchone()["total"]
-    if current < min_row["min_quantity"]:
-        return {
-            "product_name": product_name,
-            "current": current,
-            "minimum": min_row["min_quantity"],
-            "message": f"Stock bas : {product_name} ({current}/{min_row['min_quantity']} {min_row['unit']})"
-        }
-    return None
+    low = find_low_stock(db, [product_name])
+    return stock_alert_message(low[0]) if low else None
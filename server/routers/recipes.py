@@ -5,11 +5,19 @@ FrigoScan — Router Recettes.
 from fastapi import APIRouter, HTTPException, Query
 from server.database import get_db, dict_from_row, rows_to_list
 from server.models import RecipeCreate
+from server.pagination import keyset_page, approximate_total
+from server.projection import project, select_columns
 from server.services.recipe_service import (
-    search_recipes_online, get_random_recipes, compute_match_score,
+    search_recipes_online, get_random_recipes, rank_recipes, preference_weights,
     filter_by_diet, suggest_alternatives, load_local_recipes,
     get_recipes_by_category, RECIPE_CATEGORIES_FR,
 )
+from server.services.recipe_reservoir import take_random_recipes, request_top_up
+from server.services.recipe_store import publish, get_recipe, recipe_key, CONTENT_FIELDS
+from server.services.quantity import annotate_ingredients_json
+from server.services.ingredient_tokens import ingredient_tokens_json
+from typing import Optional
+import asyncio
 import json
 import random as rnd
 
@@ -27,13 +35,41 @@ def _get_target_servings(db) -> int:
     return 4
 
 
+def _get_bool_setting(db, key: str) -> bool:
+    row = db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    return bool(row) and row["value"].strip().lower() == "true"
+
+
 @router.get("/")
-def list_recipes():
-    """Liste toutes les recettes en base locale."""
+def list_recipes(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    fields: Optional[str] = None,
+):
+    """
+    Liste les recettes en base locale (toutes sans `limit`, sinon
+    pagination par curseur sur created_at/id).
+    `fields` : colonnes renvoyées ou exclues (-instructions).
+    """
     db = get_db()
     try:
-        rows = db.execute("SELECT * FROM recipes ORDER BY created_at DESC").fetchall()
-        return {"success": True, "recipes": rows_to_list(rows)}
+        columns = select_columns(db, "recipes", fields)
+        if limit is None and not cursor:
+            select = ", ".join(columns) if columns else "*"
+            rows = db.execute(f"SELECT {select} FROM recipes ORDER BY created_at DESC").fetchall()
+            return {"success": True, "recipes": rows_to_list(rows)}
+
+        recipes, next_cursor, prev_cursor = keyset_page(
+            db, "recipes", [], [], ["created_at", "id"], True, limit or 50, cursor=cursor, columns=columns,
+        )
+        return {
+            "success": True,
+            "recipes": recipes,
+            "total": approximate_total(db, "recipes", [], []) if with_total else None,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
     finally:
         db.close()
 
@@ -42,17 +78,24 @@ def list_recipes():
 async def suggest_recipes(
     max_results: int = 10,
     min_score: float = 20.0,
-    prefer_dlc: bool = True,
-    prefer_seasonal: bool = False,
+    prefer_dlc: Optional[bool] = None,
+    prefer_seasonal: Optional[bool] = None,
+    fields: Optional[str] = None,
+    summary: bool = True,
 ):
     """
     Suggère des recettes adaptées au contenu du frigo.
-    Trie par score de correspondance.
+    Trie par score de correspondance ; avec prefer_dlc / prefer_seasonal
+    (par défaut les réglages recipe_prefer_*), par score pondéré : les
+    ingrédients à DLC proche et de saison rapportent des points en plus.
+    Réponse résumée (clé, titre, image, temps, score) ; fiche complète par
+    GET /by-key/{key}, ou directement avec summary=false.
+    `fields` : champs des recettes renvoyés ou exclus (-instructions).
     """
     db = get_db()
     try:
-        # Récupérer contenu du frigo
-        fridge_rows = db.execute("SELECT * FROM fridge_items WHERE status='active'").fetchall()
+        # Récupérer contenu du frigo (jours restants avant DLC calculés en SQL)
+        fridge_rows = db.execute("SELECT * FROM fridge_items_dlc WHERE status='active'").fetchall()
         fridge_items = rows_to_list(fridge_rows)
 
         if not fridge_items:
@@ -75,6 +118,12 @@ async def suggest_recipes(
         # Nombre de personnes
         target_servings = _get_target_servings(db)
 
+        # Préférences de classement (paramètres, sinon réglages)
+        if prefer_dlc is None:
+            prefer_dlc = _get_bool_setting(db, "recipe_prefer_dlc")
+        if prefer_seasonal is None:
+            prefer_seasonal = _get_bool_setting(db, "recipe_prefer_seasonal")
+
         # Flux stable: API externe d'abord, fallback local ensuite
         db_recipes = rows_to_list(db.execute("SELECT * FROM recipes").fetchall())
         all_recipes = list(db_recipes)
@@ -86,16 +135,20 @@ async def suggest_recipes(
             online = await search_recipes_online(name, target_servings=target_servings)
             all_recipes.extend(online)
 
-        extra_random = await get_random_recipes(10, target_servings=target_servings)
+        # Recettes aléatoires : réserve pré-chargée (sans consommation), sinon en ligne
+        extra_random = take_random_recipes(10, target_servings, consume=False)
+        if len(extra_random) < 10:
+            extra_random = await get_random_recipes(10, target_servings=target_servings)
+            request_top_up(target_servings)
         all_recipes.extend(extra_random)
 
         if len(all_recipes) < 30:
             local_recipes = load_local_recipes()
             all_recipes.extend(local_recipes)
 
-        # Dédupliquer par titre
+        # Dédupliquer par titre, sans les recettes bannies
         deduped = []
-        seen_titles = set()
+        seen_titles = set(banned_titles)
         for recipe in all_recipes:
             title = (recipe.get("title") or "").strip().lower()
             if not title or title in seen_titles:
@@ -104,34 +157,22 @@ async def suggest_recipes(
             deduped.append(recipe)
         all_recipes = deduped
 
-        # Filtrer par régime
+        # Filtrer par régime avant tout calcul de score
         all_recipes = filter_by_diet(all_recipes, diets, allergens, custom_exclusions)
 
-        # Calculer scores
-        scored = []
-        for recipe in all_recipes:
-            ingredients_json = recipe.get("ingredients_json", "[]")
-            score, missing = compute_match_score(ingredients_json, fridge_items)
-            recipe["match_score"] = score
-            recipe["missing_ingredients"] = missing
-            if score >= min_score:
-                scored.append(recipe)
-
-        # Trier par score décroissant
-        scored.sort(key=lambda r: r.get("match_score", 0), reverse=True)
-
-        # Filtrer les recettes bannies
-        scored = [r for r in scored if r.get("title", "").lower().strip() not in banned_titles]
-
-        top_recipes = scored[:max_results]
-        return {"success": True, "recipes": top_recipes}
+        # Classement : tas borné aux max_results meilleures (score décroissant)
+        weights = None
+        if prefer_dlc or prefer_seasonal:
+            weights = preference_weights(fridge_items, prefer_dlc, prefer_seasonal)
+        top_recipes = rank_recipes(all_recipes, fridge_items, max_results, min_score, weights)
+        return {"success": True, "recipes": project(publish(top_recipes, summary), fields)}
     finally:
         db.close()
 
 
 @router.get("/search")
-async def search_recipes(q: str = ""):
-    """Recherche de recettes (locale + en ligne)."""
+async def search_recipes(q: str = "", fields: Optional[str] = None, summary: bool = True):
+    """Recherche de recettes (locale + en ligne) ; `fields` et `summary` comme pour /suggest."""
     if len(q) < 2:
         raise HTTPException(400, "Recherche trop courte.")
 
@@ -158,18 +199,18 @@ async def search_recipes(q: str = ""):
         # Filtrer les bannies
         results = [r for r in results if r.get("title", "").lower().strip() not in banned_titles]
 
-        return {"success": True, "recipes": results}
+        return {"success": True, "recipes": project(publish(results, summary), fields)}
     finally:
         db.close()
 
 
 @router.get("/suggest/random")
-async def suggest_random_recipes(max_results: int = 12):
+def suggest_random_recipes(max_results: int = 12, fields: Optional[str] = None, summary: bool = True):
     """
     Suggestions de recettes de zéro (aléatoires, filtrées par régime).
-    Ignore le contenu du frigo.
+    Ignore le contenu du frigo. Tirage dans la réserve pré-chargée
+    (recettes déjà traduites) ; complément local si la réserve est à froid.
     """
-    import random as rnd
     db = get_db()
     try:
         # Réglages
@@ -187,83 +228,95 @@ async def suggest_random_recipes(max_results: int = 12):
 
         # Nombre de personnes
         target_servings = _get_target_servings(db)
+    finally:
+        db.close()
 
-        # Récupérer des recettes aléatoires en ligne
-        all_recipes = await get_random_recipes(20, target_servings=target_servings)
-
-        # Ajouter de la variété avec des termes de recherche
-        variety_terms = [
-            "chicken", "pasta", "salad", "soup", "beef", "fish", "rice",
-            "dessert", "cake", "curry", "stew", "pie", "sandwich", "taco",
-            "pizza", "sushi", "noodle", "bread", "seafood", "vegetable",
-            "chocolate", "pancake", "grill", "roast", "wrap",
-        ]
-        rnd.shuffle(variety_terms)
-        for term in variety_terms[:3]:
-            online = await search_recipes_online(term, target_servings=target_servings)
-            all_recipes.extend(online)
+    detailed = take_random_recipes(
+        max_results, target_servings,
+        diets=diets, allergens=allergens, custom_exclusions=custom_exclusions,
+        banned_titles=banned_titles,
+    )
+    # Complément asynchrone si la réserve passe sous le seuil bas
+    request_top_up(target_servings)
+
+    # Compléter avec recettes locales si nécessaire
+    if len(detailed) < max_results:
+        local_recipes = load_local_recipes()
+        seen = {r.get("title", "").strip().lower() for r in detailed}
+        rnd.shuffle(local_recipes)
+        for recipe in local_recipes:
+            key = recipe.get("title", "").strip().lower()
+            if key and key not in seen and key not in banned_titles:
+                detailed.append(recipe)
+                seen.add(key)
+            if len(detailed) >= max_results:
+                break
 
-        # Filtrer par régime
-        all_recipes = filter_by_diet(all_recipes, diets, allergens, custom_exclusions)
+    rnd.shuffle(detailed)
+    return {"success": True, "recipes": project(publish(detailed[:max_results], summary), fields)}
 
-        # Dédupliquer + filtrer bannies
-        seen = set()
-        unique = []
-        for r in all_recipes:
-            title = r.get("title", "").lower().strip()
-            if title and title not in seen and title not in banned_titles:
-                seen.add(title)
-                unique.append(r)
 
-        # Garder uniquement des recettes avec détails exploitables
-        detailed = []
-        for recipe in unique:
-            has_ingredients = False
-            try:
-                ingredients = json.loads(recipe.get("ingredients_json", "[]"))
-                has_ingredients = isinstance(ingredients, list) and len(ingredients) > 0
-            except Exception:
-                has_ingredients = False
+def _insert_saved_recipe(db, recipe: dict, key: Optional[str] = None) -> int:
+    """
+    Insère une recette sauvegardée ; jetons d'ingrédients et clé de contenu
+    calculés sur les valeurs écrites (ou `key` : clé du magasin de recettes).
+    """
+    row = {field: recipe.get(field) for field in CONTENT_FIELDS}
+    for field in ("ingredients_json", "tags_json", "diet_tags_json"):
+        row[field] = row[field] or "[]"
+    cursor = db.execute(
+        f"""INSERT INTO recipes ({", ".join(CONTENT_FIELDS)}, ingredient_tokens_json, recipe_key)
+            VALUES ({", ".join("?" * (len(CONTENT_FIELDS) + 2))})""",
+        (*row.values(), ingredient_tokens_json(row["ingredients_json"]), key or recipe_key(row))
+    )
+    return cursor.lastrowid
 
-            instructions = (recipe.get("instructions") or "").strip().lower()
-            has_real_instructions = bool(instructions) and "voir le site marmiton" not in instructions
 
-            if has_ingredients or has_real_instructions:
-                detailed.append(recipe)
+@router.post("/")
+def add_recipe(recipe: RecipeCreate):
+    """Ajoute une recette à la base locale."""
+    db = get_db()
+    try:
+        values = recipe.model_dump()
+        values["ingredients_json"] = annotate_ingredients_json(recipe.ingredients_json)
+        new_id = _insert_saved_recipe(db, values)
+        db.commit()
+        return {"success": True, "id": new_id, "message": f"Recette '{recipe.title}' ajoutée."}
+    finally:
+        db.close()
 
-        # Compléter avec recettes locales si nécessaire
-        if len(detailed) < max_results:
-            local_recipes = load_local_recipes()
-            seen = {r.get("title", "").strip().lower() for r in detailed}
-            rnd.shuffle(local_recipes)
-            for recipe in local_recipes:
-                key = recipe.get("title", "").strip().lower()
-                if key and key not in seen:
-                    detailed.append(recipe)
-                    seen.add(key)
-                if len(detailed) >= max_results:
-                    break
-
-        rnd.shuffle(detailed)
-        return {"success": True, "recipes": detailed[:max_results]}
+
+# ---- Fiches par clé de contenu ----
+
+def _recipe_or_404(key: str, db) -> dict:
+    recipe = get_recipe(key, db)
+    if recipe is None:
+        raise HTTPException(404, "Recette introuvable ou expirée : relancez la recherche.")
+    return recipe
+
+
+@router.get("/by-key/{key}")
+def get_recipe_by_key(key: str):
+    """Fiche complète d'une recette renvoyée (résumée) par une liste."""
+    db = get_db()
+    try:
+        return {"success": True, "recipe": _recipe_or_404(key, db)}
     finally:
         db.close()
 
 
-@router.post("/")
-def add_recipe(recipe: RecipeCreate):
-    """Ajoute une recette à la base locale."""
+@router.post("/by-key/{key}/save")
+def save_recipe_by_key(key: str):
+    """Sauvegarde dans « Mes recettes » une recette du magasin (sans renvoyer la fiche)."""
     db = get_db()
     try:
-        cursor = db.execute(
-            """INSERT INTO recipes (title, ingredients_json, instructions, prep_time, cook_time, servings, source_url, image_url, tags_json, diet_tags_json)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (recipe.title, recipe.ingredients_json, recipe.instructions,
-             recipe.prep_time, recipe.cook_time, recipe.servings,
-             recipe.source_url, recipe.image_url, recipe.tags_json, recipe.diet_tags_json)
-        )
+        existing = db.execute("SELECT id FROM recipes WHERE recipe_key = ?", (key,)).fetchone()
+        if existing:
+            return {"success": True, "id": existing["id"], "message": "Recette déjà sauvegardée."}
+        recipe = _recipe_or_404(key, db)
+        new_id = _insert_saved_recipe(db, recipe, key=key)
         db.commit()
-        return {"success": True, "id": cursor.lastrowid, "message": f"Recette '{recipe.title}' ajoutée."}
+        return {"success": True, "id": new_id, "message": f"Recette '{recipe.get('title')}' ajoutée."}
     finally:
         db.close()
 
@@ -298,7 +351,8 @@ def list_categories():
 
 
 @router.get("/suggest/category/{category}")
-async def suggest_by_category(category: str, max_results: int = 12):
+async def suggest_by_category(category: str, max_results: int = 12, fields: Optional[str] = None,
+                              summary: bool = True):
     """
     Suggestions de recettes par catégorie TheMealDB (traduit en français).
     """
@@ -332,13 +386,15 @@ async def suggest_by_category(category: str, max_results: int = 12):
                 seen.add(title)
                 unique.append(r)
 
-        return {"success": True, "recipes": unique[:max_results], "category": category}
+        return {"success": True, "recipes": project(publish(unique[:max_results], summary), fields),
+                "category": category}
     finally:
         db.close()
 
 
 @router.get("/suggest/categories")
-async def suggest_by_multiple_categories(categories: list = None, max_results: int = 12):
+async def suggest_by_multiple_categories(categories: list = None, max_results: int = 12,
+                                         fields: Optional[str] = None, summary: bool = True):
     """
     Suggestions de recettes par multiple catégories (intersection).
     """
@@ -361,11 +417,13 @@ async def suggest_by_multiple_categories(categories: list = None, max_results: i
         # Nombre de personnes
         target_servings = _get_target_servings(db)
 
-        # Recuperer recettes pour chaque categorie
-        all_recipes = []
-        for category in categories:
-            recipes = await get_recipes_by_category(category, max_results=max_results + 10, target_servings=target_servings)
-            all_recipes.extend(recipes)
+        # Recuperer recettes pour chaque categorie (en parallèle)
+        batches = await asyncio.gather(
+            *(get_recipes_by_category(category, max_results=max_results + 10, target_servings=target_servings)
+              for category in categories),
+            return_exceptions=True,
+        )
+        all_recipes = [r for batch in batches if isinstance(batch, list) for r in batch]
 
         # Filtrer par régime
         all_recipes = filter_by_diet(all_recipes, diets, allergens, custom_exclusions)
@@ -379,7 +437,8 @@ async def suggest_by_multiple_categories(categories: list = None, max_results: i
                 seen.add(title)
                 unique.append(r)
 
-        return {"success": True, "recipes": unique[:max_results], "categories": categories}
+        return {"success": True, "recipes": project(publish(unique[:max_results], summary), fields),
+                "categories": categories}
     finally:
         db.close()
 
@@ -399,16 +458,21 @@ def list_banned():
 
 @router.post("/ban")
 def ban_recipe(payload: dict):
-    """Bannir une recette par titre."""
+    """Bannir une recette par clé ({"key": ...}) ou par titre."""
+    key = (payload.get("key") or "").strip() or None
     title = (payload.get("title") or "").strip()
-    if not title:
-        raise HTTPException(400, "Titre requis.")
     image_url = payload.get("image_url", "")
     db = get_db()
     try:
+        if key and not title:
+            recipe = _recipe_or_404(key, db)
+            title = (recipe.get("title") or "").strip()
+            image_url = image_url or recipe.get("image_url") or ""
+        if not title:
+            raise HTTPException(400, "Titre requis.")
         db.execute(
-            "INSERT OR IGNORE INTO banned_recipes (title, image_url) VALUES (?, ?)",
-            (title, image_url)
+            "INSERT OR IGNORE INTO banned_recipes (title, image_url, recipe_key) VALUES (?, ?, ?)",
+            (title, image_url, key)
         )
         db.commit()
         return {"success": True, "message": f"« {title} » bannie."}
@@ -4,6 +4,7 @@ FrigoScan — Router Scan (code-barres).
 
 from fastapi import APIRouter, HTTPException
 from server.services.openfoodfacts import lookup_barcode, search_products
+from server.services.upstream import is_available
 from server.database import get_db, dict_from_row
 from server.models import ProductCreate
 import json
@@ -62,8 +63,28 @@ async def scan_barcode(barcode: str):
 
 @router.get("/search")
 async def search_off_products(q: str = ""):
-    """Recherche textuelle sur Open Food Facts."""
+    """Recherche textuelle sur Open Food Facts (produits locaux si OFF est indisponible)."""
     if len(q) < 2:
         raise HTTPException(400, "La recherche doit contenir au moins 2 caractères.")
+    if not is_available("openfoodfacts"):
+        return {"success": True, "products": _search_local_products(q), "source": "local"}
     results = await search_products(q)
+    if not results and not is_available("openfoodfacts"):
+        return {"success": True, "products": _search_local_products(q), "source": "local"}
     return {"success": True, "products": results[:20]}
+
+
+def _search_local_products(q: str) -> list[dict]:
+    """Produits déjà connus en base (cache des scans précédents)."""
+    db = get_db()
+    try:
+        rows = db.execute(
+            "SELECT * FROM products WHERE name LIKE ? OR brand LIKE ? ORDER BY name LIMIT 20",
+            (f"%{q}%", f"%{q}%")
+        ).fetchall()
+        products = [dict_from_row(r) for r in rows]
+        for product in products:
+            product["source"] = "local"
+        return products
+    finally:
+        db.close()
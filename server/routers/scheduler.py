@@ -0,0 +1,24 @@
+"""
+FrigoScan — Router Planificateur (tâches de fond).
+"""
+
+from fastapi import APIRouter, HTTPException
+from server.services.scheduler import get_scheduler_status, enqueue_job, scheduler, JOB_HANDLERS
+
+router = APIRouter(prefix="/api/scheduler", tags=["Planificateur"])
+
+
+@router.get("/status")
+def scheduler_status():
+    """État du planificateur : configuration, file de tâches, cache."""
+    return {"success": True, **get_scheduler_status()}
+
+
+@router.post("/run/{job_type}")
+def run_job(job_type: str):
+    """Programme immédiatement une tâche (préchauffage, réserve aléatoire...)."""
+    if job_type not in JOB_HANDLERS:
+        raise HTTPException(404, f"Tâche inconnue : {job_type}")
+    job_id = enqueue_job(job_type)
+    scheduler.wake()
+    return {"success": True, "job_id": job_id, "message": f"Tâche '{job_type}' programmée."}
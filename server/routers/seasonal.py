@@ -3,7 +3,8 @@ FrigoScan — Router Produits de saison.
 """
 
 from fastapi import APIRouter
-from server.services.seasonal_service import get_seasonal_products, is_seasonal
+from server.models import SeasonalCheckRequest
+from server.services.seasonal_service import get_seasonal_products, is_seasonal, check_seasonal_batch
 
 router = APIRouter(prefix="/api/seasonal", tags=["Produits de saison"])
 
@@ -20,3 +21,14 @@ def check_seasonal(product_name: str, month: int = None):
     """Vérifie si un produit est de saison."""
     result = is_seasonal(product_name, month)
     return {"success": True, "product": product_name, "is_seasonal": result}
+
+
+@router.post("/check")
+def check_seasonal_many(request: SeasonalCheckRequest):
+    """Vérifie une liste de produits en un seul appel (annotation du frigo, des recettes)."""
+    results = check_seasonal_batch(request.names, request.month)
+    return {
+        "success": True,
+        "results": results,
+        "seasonal_count": sum(1 for r in results.values() if r["is_seasonal"]),
+    }
@@ -2,9 +2,14 @@
 FrigoScan — Router Réglages.
 """
 
-from fastapi import APIRouter, HTTPException
-from server.database import get_db, dict_from_row, rows_to_list, reset_db, backup_db, DEFAULT_SETTINGS
+from fastapi import APIRouter, HTTPException, Query
+from server.database import get_db, dict_from_row, rows_to_list, reset_db, backup_db, get_backup_stats, DEFAULT_SETTINGS
 from server.models import SettingUpdate, SettingBulkUpdate, StockMinimum
+from server.services.change_feed import entity_changes, entity_version
+from server.services.ingredient_tokens import name_tokens_json, ingredient_tokens_json
+from server.services.quantity import annotate_ingredients_json
+from server.services.recipe_store import recipe_key
+from typing import Optional
 import json
 import random
 from datetime import date, timedelta
@@ -12,22 +17,34 @@ from datetime import date, timedelta
 router = APIRouter(prefix="/api/settings", tags=["Réglages"])
 
 
+def _settings_dict(rows) -> dict:
+    settings = {}
+    for row in rows:
+        key = row["key"]
+        value = row["value"]
+        # Essayer de parser JSON
+        try:
+            settings[key] = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            settings[key] = value
+    return settings
+
+
 @router.get("/")
-def get_all_settings():
-    """Récupère tous les réglages."""
+def get_all_settings(since: Optional[int] = Query(None, ge=0)):
+    """
+    Récupère tous les réglages ; avec `since`, seulement ceux modifiés
+    (settings) ou supprimés (deletes) depuis cette version.
+    """
     db = get_db()
     try:
+        if since is not None:
+            delta = entity_changes(db, "settings", since)
+            delta["settings"] = _settings_dict(delta.pop("upserts"))
+            return delta
+        version = entity_version(db, "settings")
         rows = db.execute("SELECT * FROM settings").fetchall()
-        settings = {}
-        for row in rows:
-            key = row["key"]
-            value = row["value"]
-            # Essayer de parser JSON
-            try:
-                settings[key] = json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                settings[key] = value
-        return {"success": True, "settings": settings}
+        return {"success": True, "settings": _settings_dict(rows), "version": version}
     finally:
         db.close()
 
@@ -111,7 +128,8 @@ def create_backup():
     """Crée une sauvegarde de la base."""
     try:
         path = backup_db()
-        return {"success": True, "path": path, "message": "Sauvegarde créée avec succès."}
+        return {"success": True, "path": path, "stats": get_backup_stats()["last"],
+                "message": "Sauvegarde créée avec succès."}
     except Exception as e:
         raise HTTPException(500, f"Erreur lors de la sauvegarde : {str(e)}")
 
@@ -138,6 +156,7 @@ def hard_reset_database(confirm: bool = False):
         # Supprimer tout
         db.execute("DELETE FROM fridge_items")
         db.execute("DELETE FROM consumption_history")
+        db.execute("DELETE FROM consumption_daily")
         db.execute("DELETE FROM recipes")  # Recettes sauvegardées
         db.execute("DELETE FROM weekly_menu")
         db.execute("DELETE FROM shopping_list")
@@ -180,8 +199,8 @@ def generate_demo_data():
         for name, category in demo_foods:
             dlc = today + timedelta(days=random.randint(7, 60))
             db.execute(
-                "INSERT INTO fridge_items (name, category, quantity, unit, dlc, status) VALUES (?, ?, ?, ?, ?, ?)",
-                (name, category, round(random.uniform(1, 5), 1), "unité", dlc.isoformat(), "active")
+                "INSERT INTO fridge_items (name, category, quantity, unit, dlc, status, name_tokens) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, category, round(random.uniform(1, 5), 1), "unité", dlc.isoformat(), "active", name_tokens_json(name))
             )
         
         # Ajouter quelques aliments avec DLC proches (pour démonstration des alertes)
@@ -193,8 +212,8 @@ def generate_demo_data():
         ]
         for name, category, dlc in demo_expiring:
             db.execute(
-                "INSERT INTO fridge_items (name, category, quantity, unit, dlc, status) VALUES (?, ?, ?, ?, ?, ?)",
-                (name, category, 1.0, "unité", dlc.isoformat(), "active")
+                "INSERT INTO fridge_items (name, category, quantity, unit, dlc, status, name_tokens) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, category, 1.0, "unité", dlc.isoformat(), "active", name_tokens_json(name))
             )
         
         # Ajouter recettes sauvegardées
@@ -209,9 +228,14 @@ def generate_demo_data():
              "Battre les œufs, cuire à la poêle, ajouter fromage à mi-cuisson.", 1, 0, 5),
         ]
         for title, ingredients_json, instructions, servings, prep, cook in saved_recipes:
+            row = {
+                "title": title, "ingredients_json": annotate_ingredients_json(ingredients_json),
+                "instructions": instructions, "prep_time": prep, "cook_time": cook, "servings": servings,
+                "source_url": None, "image_url": None, "tags_json": "[]", "diet_tags_json": "[]",
+            }
             db.execute(
-                "INSERT OR IGNORE INTO recipes (title, ingredients_json, instructions, servings, prep_time, cook_time) VALUES (?, ?, ?, ?, ?, ?)",
-                (title, ingredients_json, instructions, servings, prep, cook)
+                "INSERT OR IGNORE INTO recipes (title, ingredients_json, instructions, prep_time, cook_time, servings, source_url, image_url, tags_json, diet_tags_json, ingredient_tokens_json, recipe_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*row.values(), ingredient_tokens_json(row["ingredients_json"]), recipe_key(row))
             )
         
         # Recettes bannies avec images
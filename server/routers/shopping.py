@@ -2,24 +2,65 @@
 FrigoScan — Router Liste de courses.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from server.database import get_db, dict_from_row, rows_to_list
+from server.pagination import keyset_page, approximate_total
+from server.projection import select_columns
 from server.models import ShoppingItemCreate
+from server.services.stock_service import find_low_stock, add_low_stock_to_shopping
+from server.services.quantity import compatible, convert
+from server.services.change_feed import entity_changes, entity_version
+from typing import Optional
 import json
 
 router = APIRouter(prefix="/api/shopping", tags=["Liste de courses"])
 
+# Même ordre que la liste complète, id en dernier pour départager
+SHOPPING_SORT_KEYS = ["is_purchased", "COALESCE(category, '')", "product_name", "id"]
+
 
 @router.get("/")
-def list_shopping_items(show_purchased: bool = False):
-    """Liste les éléments de la liste de courses."""
+def list_shopping_items(
+    show_purchased: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    since: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None,
+):
+    """
+    Liste les éléments de la liste de courses.
+    Sans `limit`, toute la liste est renvoyée ; avec `limit`, pagination par curseur.
+    Avec `since` : seulement les changements depuis cette version.
+    `fields` : colonnes renvoyées ou exclues (-colonne).
+    """
     db = get_db()
     try:
-        if show_purchased:
-            rows = db.execute("SELECT * FROM shopping_list ORDER BY is_purchased, category, product_name").fetchall()
-        else:
-            rows = db.execute("SELECT * FROM shopping_list WHERE is_purchased = 0 ORDER BY category, product_name").fetchall()
-        return {"success": True, "items": rows_to_list(rows), "count": len(rows)}
+        if since is not None:
+            return entity_changes(db, "shopping", since)
+        version = entity_version(db, "shopping")
+        where = [] if show_purchased else ["is_purchased = 0"]
+        columns = select_columns(db, "shopping_list", fields)
+        if limit is None and not cursor:
+            select = ", ".join(columns) if columns else "*"
+            if show_purchased:
+                rows = db.execute(f"SELECT {select} FROM shopping_list ORDER BY is_purchased, category, product_name").fetchall()
+            else:
+                rows = db.execute(f"SELECT {select} FROM shopping_list WHERE is_purchased = 0 ORDER BY category, product_name").fetchall()
+            return {"success": True, "items": rows_to_list(rows), "count": len(rows), "version": version}
+
+        items, next_cursor, prev_cursor = keyset_page(
+            db, "shopping_list", where, [], SHOPPING_SORT_KEYS, False, limit or 50, cursor=cursor, columns=columns,
+        )
+        return {
+            "success": True,
+            "items": items,
+            "count": len(items),
+            "total": approximate_total(db, "shopping_list", where, []) if with_total else None,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "version": version,
+        }
     finally:
         db.close()
 
@@ -29,13 +70,14 @@ def add_shopping_item(item: ShoppingItemCreate):
     """Ajoute un article à la liste de courses."""
     db = get_db()
     try:
-        # Vérifier si déjà dans la liste
-        existing = db.execute(
-            "SELECT * FROM shopping_list WHERE LOWER(product_name) = LOWER(?) AND is_purchased = 0",
+        # Déjà dans la liste avec une unité compatible : on additionne (converti dans son unité)
+        existing_rows = db.execute(
+            "SELECT * FROM shopping_list WHERE product_name = ? COLLATE NOCASE AND is_purchased = 0",
             (item.product_name,)
-        ).fetchone()
+        ).fetchall()
+        existing = next((r for r in existing_rows if compatible(r["unit"], item.unit)), None)
         if existing:
-            new_qty = existing["quantity"] + item.quantity
+            new_qty = round(existing["quantity"] + convert(item.quantity, item.unit, existing["unit"]), 3)
             db.execute("UPDATE shopping_list SET quantity = ? WHERE id = ?", (new_qty, existing["id"]))
             db.commit()
             return {"success": True, "message": f"Quantité mise à jour pour '{item.product_name}'."}
@@ -106,30 +148,14 @@ def check_stock_alerts():
     """Vérifie les stocks minimum et génère des alertes / ajouts à la liste."""
     db = get_db()
     try:
-        minimums = rows_to_list(db.execute("SELECT * FROM stock_minimums").fetchall())
-        alerts = []
-        for m in minimums:
-            current = db.execute(
-                "SELECT COALESCE(SUM(quantity), 0) as total FROM fridge_items WHERE LOWER(name) = LOWER(?) AND status='active'",
-                (m["product_name"],)
-            ).fetchone()["total"]
-            if current < m["min_quantity"]:
-                # Ajouter à la liste de courses si pas déjà présent
-                existing = db.execute(
-                    "SELECT id FROM shopping_list WHERE LOWER(product_name) = LOWER(?) AND is_purchased = 0",
-                    (m["product_name"],)
-                ).fetchone()
-                if not existing:
-                    db.execute(
-                        "INSERT INTO shopping_list (product_name, category, quantity, unit, source) VALUES (?, ?, ?, ?, ?)",
-                        (m["product_name"], m["category"], m["min_quantity"] - current, m["unit"], "stock_alert")
-                    )
-                alerts.append({
-                    "product_name": m["product_name"],
-                    "current": current,
-                    "minimum": m["min_quantity"],
-                    "unit": m["unit"],
-                })
+        low_stock = find_low_stock(db)
+        # Ajouter à la liste de courses ce qui n'y est pas déjà
+        add_low_stock_to_shopping(db, low_stock)
+        alerts = [
+            {"product_name": r["product_name"], "current": r["current"],
+             "minimum": r["min_quantity"], "unit": r["unit"]}
+            for r in low_stock
+        ]
         db.commit()
         return {"success": True, "alerts": alerts, "count": len(alerts)}
     finally:
@@ -4,10 +4,14 @@ FrigoScan — Router Statistiques et Historique.
 
 from fastapi import APIRouter, Query
 from server.database import get_db, rows_to_list
+from server.pagination import keyset_page, approximate_total
 from datetime import datetime, date, timedelta
+from typing import Optional
 
 router = APIRouter(prefix="/api/stats", tags=["Statistiques"])
 
+DAY_NAMES = ["Dimanche", "Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+
 
 @router.get("/consumption")
 def consumption_history(
@@ -15,37 +19,45 @@ def consumption_history(
     user_name: str = None,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    with_total: bool = True,
 ):
-    """Historique des consommations avec pagination."""
+    """Historique des consommations avec pagination (numéro de page ou curseur)."""
     db = get_db()
     try:
         since = (date.today() - timedelta(days=days)).isoformat()
-        
-        # Requêtes avec paramètres
-        base_query = "FROM consumption_history WHERE consumed_at >= ?"
+
+        where = ["consumed_at >= ?"]
         params = [since]
-        
+
         if user_name:
-            base_query += " AND user_name = ?"
+            where.append("user_name = ?")
             params.append(user_name)
-        
-        # Total
-        count_query = f"SELECT COUNT(*) as c {base_query}"
-        total = db.execute(count_query, params).fetchone()["c"]
-        
+
+        # Total (exact par page, approximatif et optionnel avec un curseur)
+        if cursor:
+            total = approximate_total(db, "consumption_history", where, params) if with_total else None
+        else:
+            total = db.execute(
+                "SELECT COUNT(*) as c FROM consumption_history WHERE " + " AND ".join(where), params
+            ).fetchone()["c"]
+
         # Pagination
-        offset = (page - 1) * limit
-        rows_query = f"SELECT * {base_query} ORDER BY consumed_at DESC LIMIT ? OFFSET ?"
-        rows = db.execute(rows_query, params + [limit, offset]).fetchall()
-        
-        pages = (total + limit - 1) // limit
+        rows, next_cursor, prev_cursor = keyset_page(
+            db, "consumption_history", where, params, ["consumed_at", "id"], True, limit,
+            cursor=cursor, offset=(page - 1) * limit,
+        )
+
+        pages = (total + limit - 1) // limit if total is not None else None
         return {
             "success": True,
-            "data": rows_to_list(rows),
-            "page": page,
+            "data": rows,
+            "page": None if cursor else page,
             "limit": limit,
             "total": total,
             "pages": pages,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
         }
     finally:
         db.close()
@@ -53,27 +65,43 @@ def consumption_history(
 
 @router.get("/summary")
 def stats_summary(days: int = 30):
-    """Statistiques résumées."""
+    """Statistiques résumées (servies depuis les agrégats journaliers consumption_daily)."""
     db = get_db()
     try:
         since = (date.today() - timedelta(days=days)).isoformat()
 
-        # Total consommés
-        consumed = db.execute(
-            "SELECT COUNT(*) as c FROM consumption_history WHERE consumed_at >= ?", (since,)
-        ).fetchone()["c"]
+        # Agrégats du jour par (catégorie, produit) sur la période : une ligne par jour et produit
+        rows = db.execute(
+            """SELECT day, category, product_name, SUM(count) AS count, SUM(qty) AS qty
+               FROM consumption_daily WHERE day >= ?
+               GROUP BY day, category, product_name""",
+            (since,)
+        ).fetchall()
+
+        consumed = 0
+        categories: dict[str, dict] = {}
+        products: dict[str, int] = {}
+        weekdays = [0] * 7
+        for row in rows:
+            consumed += row["count"]
+            cat = categories.setdefault(row["category"], {"count": 0, "total_qty": 0})
+            cat["count"] += row["count"]
+            cat["total_qty"] += row["qty"]
+            products[row["product_name"]] = products.get(row["product_name"], 0) + row["count"]
+            # Même convention que strftime('%w') : 0 = dimanche
+            weekdays[(date.fromisoformat(row["day"]).weekday() + 1) % 7] += row["count"]
 
         # Par catégorie
-        by_category = rows_to_list(db.execute(
-            "SELECT category, COUNT(*) as count, SUM(quantity) as total_qty FROM consumption_history WHERE consumed_at >= ? GROUP BY category ORDER BY count DESC",
-            (since,)
-        ).fetchall())
+        by_category = sorted(
+            ({"category": c or None, "count": v["count"], "total_qty": v["total_qty"]} for c, v in categories.items()),
+            key=lambda x: x["count"], reverse=True
+        )
 
         # Produits les plus consommés
-        top_products = rows_to_list(db.execute(
-            "SELECT product_name, COUNT(*) as count FROM consumption_history WHERE consumed_at >= ? GROUP BY product_name ORDER BY count DESC LIMIT 10",
-            (since,)
-        ).fetchall())
+        top_products = [
+            {"product_name": name, "count": count}
+            for name, count in sorted(products.items(), key=lambda x: x[1], reverse=True)[:10]
+        ]
 
         # Produits gaspillés (expirés/supprimés)
         wasted = db.execute(
@@ -82,22 +110,15 @@ def stats_summary(days: int = 30):
         ).fetchone()["c"]
 
         # Consommation par jour de la semaine
-        by_day = rows_to_list(db.execute(
-            """SELECT 
-                CASE CAST(strftime('%w', consumed_at) AS INTEGER)
-                    WHEN 0 THEN 'Dimanche' WHEN 1 THEN 'Lundi' WHEN 2 THEN 'Mardi'
-                    WHEN 3 THEN 'Mercredi' WHEN 4 THEN 'Jeudi' WHEN 5 THEN 'Vendredi'
-                    WHEN 6 THEN 'Samedi'
-                END as day_name,
-                COUNT(*) as count
-               FROM consumption_history WHERE consumed_at >= ?
-               GROUP BY strftime('%w', consumed_at) ORDER BY strftime('%w', consumed_at)""",
-            (since,)
-        ).fetchall())
+        by_day = [
+            {"day_name": DAY_NAMES[i], "count": count}
+            for i, count in enumerate(weekdays) if count
+        ]
 
-        # Consommation par mois
+        # Consommation par mois (12 derniers mois ayant des consommations)
         by_month = rows_to_list(db.execute(
-            "SELECT strftime('%Y-%m', consumed_at) as month, COUNT(*) as count FROM consumption_history GROUP BY month ORDER BY month DESC LIMIT 12"
+            """SELECT substr(day, 1, 7) as month, SUM(count) as count FROM consumption_daily
+               GROUP BY month ORDER BY month DESC LIMIT 12"""
         ).fetchall())
 
         return {
@@ -0,0 +1,195 @@
+"""
+FrigoScan — Flux de modifications (frigo, courses, réglages, stocks minimum,
+recettes sauvegardées et bannies).
+Chaque modification de ces tables ajoute une ligne à change_log (triggers,
+même transaction) avec une version croissante. Un client qui connaît la
+version de ses données demande les changements depuis cette version
+(`since=`) : lignes modifiées dans leur état courant et identifiants
+supprimés, au lieu de recharger les listes complètes.
+Le flux SSE (/api/changes/stream) pousse ces deltas dès qu'ils apparaissent.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from server.database import get_db, rows_to_list
+
+
+# Entité -> (table ou vue lue pour l'état courant, clé, clé entière)
+ENTITIES = {
+    "fridge": ("fridge_items_dlc", "id", True),
+    "shopping": ("shopping_list", "id", True),
+    "settings": ("settings", "key", False),
+    "stock_minimums": ("stock_minimums", "id", True),
+    "recipes": ("recipes", "id", True),
+    "banned_recipes": ("banned_recipes", "id", True),
+}
+HIDDEN_COLUMNS = ("name_tokens", "ingredient_tokens_json")   # colonnes dérivées, inutiles au client
+MAX_CHANGES = 5000                  # au-delà : reset, le client recharge tout
+CHANGE_LOG_KEEP = 20000             # versions conservées par l'élagage
+STREAM_POLL_INTERVAL = 1.0          # secondes entre deux lectures de la version
+STREAM_KEEPALIVE = 15.0             # commentaire SSE envoyé en l'absence de changement
+ID_CHUNK = 500
+
+
+def parse_entities(entities: Optional[str]) -> list[str]:
+    """Liste 'fridge,shopping' validée ; toutes les entités par défaut."""
+    if not entities:
+        return list(ENTITIES)
+    selected = [e.strip() for e in entities.split(",") if e.strip()]
+    unknown = [e for e in selected if e not in ENTITIES]
+    if unknown:
+        raise HTTPException(400, f"Entités inconnues : {', '.join(unknown)}")
+    return selected
+
+
+def current_version(db) -> int:
+    """Dernière version attribuée (0 pour une base neuve)."""
+    row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row["seq"] if row else 0
+
+
+def entity_version(db, entity: str) -> int:
+    """Version de la dernière modification d'une entité (table_versions, tenue par trigger)."""
+    row = db.execute("SELECT version FROM table_versions WHERE name = ?", (entity,)).fetchone()
+    return row["version"] if row else 0
+
+
+def table_versions(db, names) -> dict[str, int]:
+    """Versions de plusieurs entités (et 'epoch') en une requête."""
+    names = list(names)
+    rows = db.execute(
+        f"SELECT name, version FROM table_versions WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    versions = dict.fromkeys(names, 0)
+    versions.update((row["name"], row["version"]) for row in rows)
+    return versions
+
+
+def _current_rows(db, entity: str, ids: list[str]) -> list[dict]:
+    table, key, integer_key = ENTITIES[entity]
+    keys = [int(i) for i in ids] if integer_key else list(ids)
+    rows: list[dict] = []
+    for start in range(0, len(keys), ID_CHUNK):
+        chunk = keys[start:start + ID_CHUNK]
+        rows.extend(rows_to_list(db.execute(
+            f"SELECT * FROM {table} WHERE {key} IN ({','.join('?' * len(chunk))})", chunk
+        ).fetchall()))
+    for row in rows:
+        for column in HIDDEN_COLUMNS:
+            row.pop(column, None)
+    return rows
+
+
+def changes_since(db, since: int, entities: Optional[list[str]] = None,
+                  upto: Optional[int] = None) -> dict:
+    """
+    Deltas depuis `since` (jusqu'à `upto`, la dernière version par défaut),
+    par entité : {"upserts": [lignes], "deletes": [clés]}.
+    reset=True si l'historique ne couvre plus `since` (élagage, base
+    recréée) ou s'il y a trop de changements : le client recharge la liste.
+    """
+    entities = entities or list(ENTITIES)
+    latest = current_version(db)
+    version = latest if upto is None else min(upto, latest)
+    oldest = db.execute("SELECT MIN(version) AS v FROM change_log").fetchone()["v"]
+    reset = since > latest or (since < version and (oldest is None or since < oldest - 1))
+
+    changes: dict[str, dict] = {}
+    if not reset and since < version:
+        placeholders = ",".join("?" * len(entities))
+        log = db.execute(
+            f"""SELECT entity, entity_id, op FROM change_log
+                WHERE version > ? AND version <= ? AND entity IN ({placeholders})
+                ORDER BY version LIMIT ?""",
+            [since, version, *entities, MAX_CHANGES + 1]
+        ).fetchall()
+        if len(log) > MAX_CHANGES:
+            reset = True
+        else:
+            last_op: dict[str, dict[str, str]] = {}
+            for row in log:
+                last_op.setdefault(row["entity"], {})[row["entity_id"]] = row["op"]
+            for entity, ops in last_op.items():
+                deleted = [i for i, op in ops.items() if op == "delete"]
+                upserts = _current_rows(db, entity, [i for i, op in ops.items() if op == "upsert"])
+                if ENTITIES[entity][2]:
+                    deleted = [int(i) for i in deleted]
+                changes[entity] = {"upserts": upserts, "deletes": deleted}
+    if not reset:
+        version = max(version, since)  # rien de plus récent pour ces entités
+    return {"version": version, "since": since, "reset": reset, "changes": changes}
+
+
+def entity_changes(db, entity: str, since: int) -> dict:
+    """
+    Deltas d'une seule entité (paramètre since= des listes) ; la version
+    renvoyée est celle de l'entité, comme dans les listes complètes.
+    """
+    feed = changes_since(db, since, [entity], upto=entity_version(db, entity))
+    delta = feed["changes"].get(entity, {"upserts": [], "deletes": []})
+    return {"success": True, "version": feed["version"], "since": since, "reset": feed["reset"], **delta}
+
+
+def prune_change_log(keep: int = CHANGE_LOG_KEEP) -> int:
+    """Supprime les versions les plus anciennes ; retourne le nombre de lignes supprimées."""
+    db = get_db()
+    try:
+        cursor = db.execute("DELETE FROM change_log WHERE version <= ?", (current_version(db) - keep,))
+        db.commit()
+        return cursor.rowcount
+    finally:
+        db.close()
+
+
+def _read_version() -> int:
+    db = get_db()
+    try:
+        return current_version(db)
+    finally:
+        db.close()
+
+
+def _read_changes(since: int, entities: list[str]) -> tuple[int, Optional[dict]]:
+    db = get_db()
+    try:
+        version = current_version(db)
+        if version == since:
+            return version, None
+        return version, changes_since(db, since, entities)
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+async def change_events(since: Optional[int], entities: list[str],
+                        is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+    """
+    Événements SSE : 'ready' (version de départ), puis 'change' à chaque
+    nouvelle version (deltas), commentaires de maintien entre deux.
+    """
+    if since is None:
+        since = await run_in_threadpool(_read_version)
+    yield _sse("ready", {"version": since}, since)
+    idle = 0.0
+    while not await is_disconnected():
+        version, feed = await run_in_threadpool(_read_changes, since, entities)
+        if feed is not None:
+            since = version
+            idle = 0.0
+            if feed["reset"] or feed["changes"]:
+                yield _sse("change", feed, version)
+            continue
+        if idle >= STREAM_KEEPALIVE:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+        idle += STREAM_POLL_INTERVAL
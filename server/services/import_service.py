@@ -0,0 +1,357 @@
+"""
+FrigoScan — Import JSON / NDJSON en flux.
+Le fichier est lu par morceaux (pas de plafond de taille ni de json.loads
+global) et les lignes sont insérées par lots (executemany).
+En mode par lots, chaque lot est validé dans un SAVEPOINT avec le point de
+reprise du job : après un échec, l'import reprend là où il s'était arrêté.
+En mode atomique, tout l'import tient dans une seule transaction.
+"""
+
+import codecs
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Iterator, Optional
+
+from server import database
+from server.database import get_db, dict_from_row
+from server.services.ingredient_tokens import name_tokens_json, ingredient_tokens_json
+from server.services.quantity import annotate_ingredients_json
+from server.services.recipe_store import recipe_key
+
+logger = logging.getLogger("frigoscan.import")
+
+IMPORT_CHUNK = 500        # lignes par executemany
+READ_SIZE = 64 * 1024     # octets lus à chaque remplissage du tampon
+
+VALID_KEYS = {'products', 'fridge', 'recipes', 'consumption_history', 'weekly_menu',
+              'shopping_list', 'settings', 'stock_minimums', 'export_date'}
+
+
+def _recipe_params(r: dict) -> tuple:
+    """
+    Recette exportée -> paramètres ; quantités analysées, jetons et clé de
+    contenu calculés à l'import.
+    """
+    row = {
+        "title": r.get("title"),
+        "ingredients_json": annotate_ingredients_json(r.get("ingredients_json", "[]")),
+        "instructions": r.get("instructions"),
+        "prep_time": r.get("prep_time", 0), "cook_time": r.get("cook_time", 0), "servings": r.get("servings", 4),
+        "source_url": r.get("source_url"), "image_url": r.get("image_url"),
+        "tags_json": r.get("tags_json", "[]"), "diet_tags_json": r.get("diet_tags_json", "[]"),
+    }
+    return (*row.values(), ingredient_tokens_json(row["ingredients_json"]), recipe_key(row))
+
+
+# Tables importées : requête + conversion d'une ligne exportée en paramètres
+IMPORT_TABLES = {
+    "products": (
+        "INSERT OR IGNORE INTO products (barcode, name, brand, image_url, category, nutrition_json) VALUES (?, ?, ?, ?, ?, ?)",
+        lambda p: (p.get("barcode"), p.get("name", ""), p.get("brand"), p.get("image_url"),
+                   p.get("category"), p.get("nutrition_json", "{}")),
+    ),
+    "fridge": (
+        "INSERT INTO fridge_items (name, barcode, image_url, category, quantity, unit, dlc, nutrition_json, status, name_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        lambda i: (i.get("name"), i.get("barcode"), i.get("image_url"), i.get("category"),
+                   i.get("quantity", 1), i.get("unit", "unité"), i.get("dlc"),
+                   i.get("nutrition_json", "{}"), i.get("status", "active"), name_tokens_json(i.get("name"))),
+    ),
+    "recipes": (
+        "INSERT INTO recipes (title, ingredients_json, instructions, prep_time, cook_time, servings, source_url, image_url, tags_json, diet_tags_json, ingredient_tokens_json, recipe_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _recipe_params,
+    ),
+    "settings": (
+        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+        lambda s: (s.get("key"), s.get("value", "")),
+    ),
+}
+
+_NDJSON_HEAD = re.compile(r'\s*\{\s*"(format|table)"\s*:')
+
+
+class ImportFormatError(ValueError):
+    """Fichier mal formé ou contenu inattendu (erreur 400)."""
+
+
+# ---------------------------------------------------------------------------
+# Lecture en flux
+# ---------------------------------------------------------------------------
+
+class _JsonReader:
+    """Lit des valeurs JSON successives depuis un fichier binaire, par morceaux."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(READ_SIZE)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+        try:
+            text = self.utf8.decode(chunk, final=self.eof)
+        except UnicodeDecodeError as e:
+            raise ImportFormatError(f"Erreur décodage: {e}")
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return bool(chunk)
+
+    def head(self) -> str:
+        while len(self.buf) - self.pos < 64 and self._fill():
+            pass
+        return self.buf[self.pos:self.pos + 64]
+
+    def peek(self) -> str:
+        """Prochain caractère significatif ('' en fin de fichier)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ImportFormatError(f"JSON invalide: '{char}' attendu, '{found or 'fin de fichier'}' trouvé")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if not self._fill():
+                    raise ImportFormatError(f"JSON invalide: {e}")
+                continue
+            if end == len(self.buf) and self._fill():
+                continue  # valeur peut-être tronquée (nombre) : relire avec la suite
+            self.pos = end
+            return value
+
+
+def _iter_export_object(reader: _JsonReader) -> Iterator[tuple[str, object]]:
+    """Export JSON classique : {"clé": [lignes...], ...}, lu élément par élément."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if key not in VALID_KEYS:
+            raise ImportFormatError(f"Clés inconnues: {key}")
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() != ",":
+                        reader.expect("]")
+                        break
+                    reader.pos += 1
+        else:
+            reader.value()
+            if key in IMPORT_TABLES:
+                raise ImportFormatError(f"'{key}' doit être une liste")
+        if reader.peek() != ",":
+            reader.expect("}")
+            break
+        reader.pos += 1
+    if reader.peek():
+        raise ImportFormatError("JSON invalide: contenu après l'objet principal")
+
+
+def _iter_ndjson(reader: _JsonReader) -> Iterator[tuple[str, object]]:
+    """Export NDJSON : en-tête {"format": ...} puis une ligne {"table", "row"} par enregistrement."""
+    while reader.peek():
+        line = reader.value()
+        if not isinstance(line, dict):
+            raise ImportFormatError("NDJSON invalide: chaque ligne doit être un objet")
+        if "format" in line:
+            continue
+        key = line.get("table")
+        if key not in VALID_KEYS:
+            raise ImportFormatError(f"Clés inconnues: {key}")
+        yield key, line.get("row")
+
+
+def iter_import_rows(fp) -> tuple[_JsonReader, Iterator[tuple[str, object]]]:
+    """Détecte le format (JSON ou NDJSON) et retourne (lecteur, itérateur de (clé, ligne))."""
+    reader = _JsonReader(fp)
+    if _NDJSON_HEAD.match(reader.head()):
+        return reader, _iter_ndjson(reader)
+    return reader, _iter_export_object(reader)
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+_live_progress: dict[int, dict] = {}  # progression des jobs en cours (non encore validée)
+
+
+def import_file(path: Path, atomic: bool = True, job_id: Optional[int] = None,
+                chunk_size: int = IMPORT_CHUNK) -> dict:
+    """
+    Importe un fichier d'export (fusion). Retourne {table: lignes importées}.
+    Avec `job_id`, reprend après les lignes déjà validées du job et
+    enregistre le point de reprise à chaque lot (sauf en mode atomique).
+    """
+    db = get_db()
+    skip, imported = 0, {}
+    if job_id is not None:
+        job = db.execute("SELECT committed_rows, imported_json FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        skip, imported = job["committed_rows"], json.loads(job["imported_json"] or "{}")
+    position = skip
+    pending: list[tuple] = []
+    pending_key: Optional[str] = None
+
+    try:
+        with open(path, "rb") as fp:
+            reader, rows = iter_import_rows(fp)
+
+            def _flush():
+                if not pending:
+                    return
+                sql = IMPORT_TABLES[pending_key][0]
+                first = position - len(pending)
+                if not atomic:
+                    db.execute("SAVEPOINT import_chunk")
+                try:
+                    db.executemany(sql, pending)
+                except Exception as e:
+                    if not atomic:
+                        db.execute("ROLLBACK TO import_chunk")
+                        db.execute("RELEASE import_chunk")
+                    raise ValueError(f"Lot '{pending_key}' #{first}-{position - 1} invalide: {e}")
+                imported[pending_key] = imported.get(pending_key, 0) + len(pending)
+                if job_id is not None:
+                    _live_progress[job_id] = {"processed_rows": position, "bytes_done": reader.bytes_read}
+                    if not atomic:
+                        db.execute(
+                            """UPDATE import_jobs SET committed_rows = ?, bytes_done = ?, imported_json = ?,
+                                      updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
+                            (position, reader.bytes_read, json.dumps(imported), job_id)
+                        )
+                if not atomic:
+                    db.execute("RELEASE import_chunk")  # valide le lot et son point de reprise
+                pending.clear()
+
+            if atomic:
+                db.execute("BEGIN IMMEDIATE")
+            index = 0
+            for key, row in rows:
+                if key not in IMPORT_TABLES:
+                    continue
+                index += 1
+                if index <= skip:
+                    continue
+                if not isinstance(row, dict):
+                    raise ImportFormatError(f"Ligne '{key}' #{index - 1} invalide: objet attendu")
+                if key != pending_key or len(pending) >= chunk_size:
+                    _flush()
+                    pending_key = key
+                pending.append(IMPORT_TABLES[key][1](row))
+                position = index
+            _flush()
+            if atomic:
+                db.commit()
+        return imported
+    except Exception:
+        if db.in_transaction:
+            db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Jobs d'import
+# ---------------------------------------------------------------------------
+
+def import_dir() -> Path:
+    path = database.DB_DIR / "imports"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def create_import_job(filename: str, atomic: bool = False) -> tuple[int, Path]:
+    """Crée le job ; retourne (id, chemin où déposer le fichier)."""
+    db = get_db()
+    try:
+        job_id = db.execute(
+            "INSERT INTO import_jobs (filename, atomic) VALUES (?, ?)", (filename, int(atomic))
+        ).lastrowid
+        path = import_dir() / f"import_{job_id}.upload"
+        db.execute("UPDATE import_jobs SET file_path = ? WHERE id = ?", (str(path), job_id))
+        db.commit()
+        return job_id, path
+    finally:
+        db.close()
+
+
+def _set_job(job_id: int, **fields) -> None:
+    db = get_db()
+    try:
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        db.execute(
+            f"UPDATE import_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (*fields.values(), job_id)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_import_job(job_id: int) -> None:
+    """Exécute (ou reprend) un job d'import ; le fichier est supprimé une fois l'import terminé."""
+    job = get_import_job(job_id)
+    path = Path(job["file_path"])
+    _live_progress[job_id] = {"processed_rows": job["committed_rows"], "bytes_done": job["bytes_done"]}
+    _set_job(job_id, status="running", error=None, total_bytes=path.stat().st_size)
+    try:
+        imported = import_file(path, atomic=bool(job["atomic"]), job_id=job_id)
+    except Exception as e:
+        logger.error(f"Import #{job_id} échoué: {e}")
+        _set_job(job_id, status="failed", error=str(e))
+    else:
+        rows = sum(imported.values())
+        _set_job(job_id, status="done", imported_json=json.dumps(imported), committed_rows=rows,
+                 bytes_done=path.stat().st_size)
+        path.unlink(missing_ok=True)
+    finally:
+        _live_progress.pop(job_id, None)
+
+
+def is_job_active(job_id: int) -> bool:
+    return job_id in _live_progress
+
+
+def get_import_job(job_id: int) -> Optional[dict]:
+    """État du job, avec la progression en cours (lignes lues, octets) s'il tourne."""
+    db = get_db()
+    try:
+        job = dict_from_row(db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        db.close()
+    if job is None:
+        return None
+    job["imported"] = json.loads(job.pop("imported_json") or "{}")
+    job["processed_rows"] = job["committed_rows"]
+    job.update(_live_progress.get(job_id, {}))
+    job["percent"] = round(100 * job["bytes_done"] / job["total_bytes"], 1) if job["total_bytes"] else 0.0
+    return job
@@ -0,0 +1,230 @@
+"""
+FrigoScan — Jetons canoniques d'ingrédients.
+Un nom d'ingrédient ("Tomates cerises fraîches", "chicken breast") est réduit
+une seule fois, à l'écriture, en jetons canoniques : synonymes EN -> FR
+(INGREDIENT_FR), adjectifs culinaires retirés, accents et pluriels repliés.
+Les jetons sont stockés sur fridge_items (name_tokens), recipes
+(ingredient_tokens_json) et les recettes en cache (miroir, réserve) ;
+le calcul du score ne compare plus que des ensembles de jetons.
+Changer les règles : incrémenter TOKEN_RULES_VERSION, tout est recalculé
+au démarrage suivant (rebuild_ingredient_tokens).
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from . import recipe_service
+
+logger = logging.getLogger("frigoscan.ingredient_tokens")
+
+TOKEN_RULES_VERSION = 2
+VERSION_SETTING = "ingredient_tokens_version"
+MIN_TOKEN_LENGTH = 3  # jetons plus courts ignorés pour le recouvrement (évite "ail" dans "détail")
+
+# Adjectifs / épithètes culinaires retirés (formes repliées comparées)
+CULINARY_ADJECTIVES = (
+    "frais", "fraîche", "séché", "séchée", "entier", "entière", "moulu", "moulue",
+    "haché", "hachée", "tranché", "tranchée", "concassé", "concassée", "émincé", "émincée",
+    "râpé", "râpée", "rôti", "rôtie", "grillé", "grillée", "cuit", "cuite", "cru", "crue",
+    "gros", "grosse", "petit", "petite", "grand", "grande", "moyen", "moyenne",
+    "épais", "épaisse", "blanc", "blanche", "noir", "noire", "rouge", "jaune", "vert", "verte",
+    "fresh", "dried", "chopped", "minced", "sliced", "diced", "ground", "large", "small", "medium",
+)
+# Mots vides comparés avant repli des accents ("thé" n'est pas "the")
+STOPWORDS = ("de", "du", "des", "la", "le", "les", "au", "aux", "en", "et", "à", "un", "une",
+             "of", "the", "and", "with")
+# Ingrédients de base toujours considérés comme disponibles
+BASIC_INGREDIENTS = ("eau", "sel", "poivre", "huile")
+
+_WORD_RE = re.compile(r"[a-zà-ÿœæ]+")
+_ELISION_RE = re.compile(r"\b[dlj]['’]")
+
+
+def _fold(token: str) -> str:
+    """Accents et ligatures repliés, pluriel ramené au singulier."""
+    token = token.replace("œ", "oe").replace("æ", "ae")
+    token = "".join(c for c in unicodedata.normalize("NFKD", token) if not unicodedata.combining(c))
+    if len(token) > 3 and token.endswith("x") and token[-3:-1] in ("au", "eu", "ou"):
+        return token[:-1]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+_ADJECTIVES = frozenset(_fold(a) for a in CULINARY_ADJECTIVES)
+_ADJECTIVES = _ADJECTIVES | frozenset(a + "e" for a in _ADJECTIVES if not a.endswith("e"))
+_STOPWORDS = frozenset(STOPWORDS)
+
+
+def _synonym(text: str) -> Optional[str]:
+    """Traduction française d'un nom (ou d'un mot) anglais connu."""
+    return recipe_service.INGREDIENT_OVERRIDES_FR.get(text) or recipe_service._lookup_ingredient(text)
+
+
+@lru_cache(maxsize=8192)
+def canonical_tokens(name: Optional[str]) -> tuple[str, ...]:
+    """
+    Jetons canoniques d'un nom d'ingrédient, dans l'ordre, sans doublon.
+    Un nom fait seulement de mots vides ou d'adjectifs ("Vert") garde ses mots repliés.
+    """
+    text = (name or "").lower().strip()
+    if not text:
+        return ()
+    text = _synonym(text) or text
+    words: list[str] = []
+    for word in _WORD_RE.findall(_ELISION_RE.sub(" ", text.lower())):
+        translated = _synonym(word)
+        words.extend(_WORD_RE.findall(translated.lower()) if translated else (word,))
+    tokens: list[str] = []
+    for word in words:
+        if word in _STOPWORDS:
+            continue
+        token = _fold(word)
+        if token in _ADJECTIVES or token in tokens:
+            continue
+        tokens.append(token)
+    if not tokens:
+        tokens = list(dict.fromkeys(_fold(word) for word in words))
+    return tuple(tokens)
+
+
+_BASIC_TOKENS = frozenset(_fold(name) for name in BASIC_INGREDIENTS)
+
+
+def is_basic(tokens: Iterable[str]) -> bool:
+    return any(t in _BASIC_TOKENS for t in tokens)
+
+
+def name_tokens_json(name: Optional[str]) -> str:
+    """Colonne fridge_items.name_tokens."""
+    return json.dumps(list(canonical_tokens(name)), ensure_ascii=False)
+
+
+def _ingredient_name(ing) -> str:
+    if isinstance(ing, dict):
+        return ing.get("name") or ""
+    return ing if isinstance(ing, str) else ""
+
+
+def ingredient_tokens_json(ingredients) -> str:
+    """Jetons de chaque ingrédient (liste ou ingredients_json), dans l'ordre de la recette."""
+    if isinstance(ingredients, str):
+        try:
+            ingredients = json.loads(ingredients or "[]")
+        except ValueError:
+            ingredients = []
+    if not isinstance(ingredients, list):
+        ingredients = []
+    return json.dumps([list(canonical_tokens(_ingredient_name(ing))) for ing in ingredients], ensure_ascii=False)
+
+
+def with_ingredient_tokens(recipe: dict) -> dict:
+    """Ajoute ingredient_tokens_json à une recette (dict modifié et renvoyé)."""
+    recipe["ingredient_tokens_json"] = ingredient_tokens_json(recipe.get("ingredients_json", "[]"))
+    return recipe
+
+
+def load_tokens(tokens_json: Optional[str], expected: Optional[int] = None) -> Optional[list]:
+    """Jetons stockés ; None s'ils manquent ou ne correspondent pas (nombre d'ingrédients)."""
+    if not tokens_json:
+        return None
+    try:
+        tokens = json.loads(tokens_json)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(tokens, list) or (expected is not None and len(tokens) != expected):
+        return None
+    return tokens
+
+
+def fridge_tokens(fridge_items: list[dict]) -> tuple[frozenset, frozenset]:
+    """
+    (jetons significatifs, noms canoniques complets) du frigo, calculés une
+    fois par suggestion ; name_tokens stocké si présent.
+    """
+    words: set[str] = set()
+    phrases: set[tuple] = set()
+    for item in fridge_items:
+        tokens = load_tokens(item.get("name_tokens"))
+        if tokens is None:
+            tokens = canonical_tokens(item.get("name"))
+        if tokens:
+            phrases.add(tuple(tokens))
+            words.update(t for t in tokens if len(t) >= MIN_TOKEN_LENGTH)
+    return frozenset(words), frozenset(phrases)
+
+
+# ---------------------------------------------------------------------------
+# Remplissage et reconstruction
+# ---------------------------------------------------------------------------
+
+def _stored_version(db) -> Optional[int]:
+    row = db.execute("SELECT value FROM settings WHERE key = ?", (VERSION_SETTING,)).fetchone()
+    try:
+        return int(row["value"]) if row else None
+    except ValueError:
+        return None
+
+
+def _recompute_json_rows(db, table: str, key: str) -> int:
+    """Jetons des recettes sérialisées (recipe_json) d'une table de cache."""
+    rows = db.execute(f"SELECT {key}, recipe_json FROM {table}").fetchall()
+    updates = []
+    for row in rows:
+        try:
+            recipe = json.loads(row["recipe_json"])
+        except ValueError:
+            continue
+        updates.append((json.dumps(with_ingredient_tokens(recipe), ensure_ascii=False), row[key]))
+    db.executemany(f"UPDATE {table} SET recipe_json = ? WHERE {key} = ?", updates)
+    return len(updates)
+
+
+def backfill_ingredient_tokens(db, rebuild: bool = False) -> dict:
+    """
+    Calcule les jetons manquants (ou tous avec `rebuild`) ; à appeler dans
+    une transaction, l'appelant valide.
+    """
+    where = "" if rebuild else " WHERE name_tokens IS NULL"
+    fridge = db.execute(f"SELECT id, name FROM fridge_items{where}").fetchall()
+    db.executemany("UPDATE fridge_items SET name_tokens = ? WHERE id = ?",
+                   [(name_tokens_json(r["name"]), r["id"]) for r in fridge])
+    where = "" if rebuild else " WHERE ingredient_tokens_json IS NULL"
+    recipes = db.execute(f"SELECT id, ingredients_json FROM recipes{where}").fetchall()
+    db.executemany("UPDATE recipes SET ingredient_tokens_json = ? WHERE id = ?",
+                   [(ingredient_tokens_json(r["ingredients_json"]), r["id"]) for r in recipes])
+    stats = {"fridge_items": len(fridge), "recipes": len(recipes)}
+    if rebuild:
+        stats["mealdb_mirror"] = _recompute_json_rows(db, "mealdb_mirror", "id_meal")
+        stats["recipe_reservoir"] = _recompute_json_rows(db, "recipe_reservoir", "id")
+    return stats
+
+
+def rebuild_ingredient_tokens(db) -> dict:
+    """Recalcule tous les jetons (frigo, recettes, miroir, réserve) et le cache mémoire."""
+    stats = backfill_ingredient_tokens(db, rebuild=True)
+    db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+               (VERSION_SETTING, str(TOKEN_RULES_VERSION)))
+    db.commit()
+    canonical_tokens.cache_clear()
+    recipe_service.clear_search_cache()
+    logger.info(f"Jetons d'ingrédients recalculés (règles v{TOKEN_RULES_VERSION}): {stats}")
+    return stats
+
+
+def ensure_ingredient_tokens(db) -> dict:
+    """Au démarrage : reconstruction si les règles ont changé, sinon remplissage des lignes sans jetons."""
+    try:
+        if _stored_version(db) != TOKEN_RULES_VERSION:
+            return rebuild_ingredient_tokens(db)
+        stats = backfill_ingredient_tokens(db)
+        db.commit()
+        return stats
+    except sqlite3.Error as e:
+        logger.warning(f"Jetons d'ingrédients non calculés: {e}")
+        return {}
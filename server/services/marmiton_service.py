@@ -14,6 +14,8 @@ from datetime import datetime
 from pathlib import Path
 from urllib.parse import quote_plus
 
+from .upstream import upstream_get
+
 logger = logging.getLogger("frigoscan.marmiton")
 
 # Configuration API Marmiton
@@ -117,7 +119,7 @@ async def _enrich_recipe_from_detail(client: httpx.AsyncClient, base_recipe: dic
         return base_recipe
 
     try:
-        resp = await client.get(detail_url, timeout=TIMEOUT, follow_redirects=True)
+        resp = await upstream_get(client, "marmiton", detail_url, endpoint="recipe", timeout=TIMEOUT, follow_redirects=True)
         if resp.status_code != 200:
             return base_recipe
         blocks = _extract_json_ld_blocks(resp.text)
@@ -309,7 +311,7 @@ async def search_marmiton_recipes(query: str, limit: int = 12) -> list[dict]:
     try:
         async with httpx.AsyncClient(timeout=TIMEOUT, headers=DEFAULT_HEADERS) as client:
             search_url = f"https://www.marmiton.org/recettes/recherche.aspx?aqt={quote_plus(query)}"
-            resp = await client.get(search_url, follow_redirects=True)
+            resp = await upstream_get(client, "marmiton", search_url, follow_redirects=True)
             if resp.status_code != 200:
                 logger.warning(f"⚠️ Marmiton search status {resp.status_code}, fallback local")
                 return _get_fallback_recipes(query)
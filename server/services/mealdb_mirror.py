@@ -0,0 +1,222 @@
+"""
+FrigoScan — Miroir local du catalogue TheMealDB.
+Le catalogue ne compte que quelques centaines de recettes : on le recopie en
+base (recettes normalisées, titres/instructions traduits, régimes détectés)
+et les recherches / catégories sont servies localement.
+Rafraîchissement incrémental par idMeal : seules les recettes nouvelles ou
+anciennes sont re-téléchargées.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httpx
+
+from server.database import get_db
+from . import recipe_service
+from .upstream import upstream_get
+
+logger = logging.getLogger("frigoscan.mealdb_mirror")
+
+REFRESH_AFTER_DAYS = 30  # une recette plus ancienne est re-téléchargée
+SEARCH_LIMIT = 24        # même plafond que la recherche en ligne
+
+
+# ---------------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------------
+
+def mirror_size() -> int:
+    """Nombre de recettes dans le miroir (0 si la table n'existe pas encore)."""
+    db = get_db()
+    try:
+        return db.execute("SELECT COUNT(*) AS c FROM mealdb_mirror").fetchone()["c"]
+    except sqlite3.Error:
+        return 0
+    finally:
+        db.close()
+
+
+def _recipe_from_row(row: sqlite3.Row, target_servings: int) -> dict:
+    """Recette FR depuis le miroir (re-normalisée si le nombre de personnes diffère)."""
+    if target_servings == 4:
+        return json.loads(row["recipe_json"])
+    recipe = recipe_service._normalize_mealdb(json.loads(row["meal_json"]), target_servings=target_servings)
+    recipe["title"] = row["title_fr"] or recipe["title"]
+    recipe["instructions"] = row["instructions_fr"] or recipe["instructions"]
+    return recipe
+
+
+def search_mirror(candidates: list[str], target_servings: int = 4, limit: int = SEARCH_LIMIT) -> list[dict]:
+    """Recherche par titre (anglais ou français), comme search.php?s=."""
+    if not candidates:
+        return []
+    db = get_db()
+    try:
+        recipes: list[dict] = []
+        seen: set[str] = set()
+        for candidate in candidates:
+            rows = db.execute(
+                "SELECT * FROM mealdb_mirror WHERE search_text LIKE ? ORDER BY title_en LIMIT ?",
+                (f"%{candidate.lower()}%", limit)
+            ).fetchall()
+            for row in rows:
+                if row["id_meal"] in seen:
+                    continue
+                seen.add(row["id_meal"])
+                recipes.append(_recipe_from_row(row, target_servings))
+            if len(recipes) >= limit:
+                break
+        return recipes[:limit]
+    except sqlite3.Error as e:
+        logger.warning(f"Miroir TheMealDB indisponible: {e}")
+        return []
+    finally:
+        db.close()
+
+
+def mirror_by_category(category: str, max_results: int = 12, target_servings: int = 4) -> list[dict]:
+    """Recettes d'une catégorie TheMealDB, tirées au hasard dans le miroir."""
+    db = get_db()
+    try:
+        rows = db.execute(
+            "SELECT * FROM mealdb_mirror WHERE category = ? ORDER BY RANDOM() LIMIT ?",
+            (category, max_results)
+        ).fetchall()
+        return [_recipe_from_row(row, target_servings) for row in rows]
+    except sqlite3.Error as e:
+        logger.warning(f"Miroir TheMealDB indisponible: {e}")
+        return []
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Synchronisation
+# ---------------------------------------------------------------------------
+
+async def _get_json(client: httpx.AsyncClient, url: str, params: Optional[dict] = None) -> Optional[dict]:
+    resp = await upstream_get(client, "themealdb", url, params=params)
+    if resp.status_code != 200:
+        return None
+    return resp.json()
+
+
+async def _list_catalogue(client: httpx.AsyncClient, semaphore: asyncio.Semaphore) -> Optional[dict[str, str]]:
+    """Retourne {idMeal: catégorie} pour tout le catalogue, None si incomplet."""
+    data = await _get_json(client, recipe_service.MEALDB_CATEGORIES)
+    categories = [c.get("strCategory") for c in (data or {}).get("meals") or [] if c.get("strCategory")]
+    if not categories:
+        return None
+
+    async def _filter(category: str):
+        async with semaphore:
+            return category, await _get_json(client, recipe_service.MEALDB_FILTER, {"c": category})
+
+    catalogue: dict[str, str] = {}
+    for category, payload in await asyncio.gather(*(_filter(c) for c in categories)):
+        if payload is None:
+            return None  # liste partielle : ne rien supprimer sur cette base
+        for meal in payload.get("meals") or []:
+            if meal.get("idMeal"):
+                catalogue[meal["idMeal"]] = category
+    return catalogue
+
+
+async def _fetch_meal(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, meal_id: str,
+                      translate: bool) -> Optional[tuple]:
+    """Télécharge, normalise et traduit une recette ; retourne la ligne à insérer."""
+    async with semaphore:
+        data = await _get_json(client, recipe_service.MEALDB_LOOKUP, {"i": meal_id})
+        meals = (data or {}).get("meals") or []
+        if not meals:
+            return None
+        meal = meals[0]
+        recipe = recipe_service._normalize_mealdb(meal, target_servings=4)
+        title_fr = recipe["title"]
+        instructions_fr = recipe["instructions"]
+        if translate:
+            title_fr = await recipe_service._translate_text_api(recipe["title"], "en", "fr")
+            instructions_fr = await recipe_service._translate_instructions_full(recipe["instructions"])
+        recipe["title"] = title_fr
+        recipe["instructions"] = instructions_fr
+
+    search_text = f"{meal.get('strMeal', '')} {title_fr}".lower()
+    return (
+        meal_id, meal.get("strMeal", ""), title_fr, meal.get("strCategory"), meal.get("strArea"),
+        json.dumps(meal, ensure_ascii=False), json.dumps(recipe, ensure_ascii=False),
+        instructions_fr, recipe["diet_tags_json"], search_text,
+    )
+
+
+async def sync_mealdb_mirror(concurrency: int = 4, refresh_after_days: int = REFRESH_AFTER_DAYS,
+                             translate: bool = True) -> dict:
+    """
+    Synchronise le miroir : liste le catalogue (list + filter), télécharge
+    les recettes nouvelles ou anciennes (lookup) avec une concurrence bornée,
+    et supprime celles retirées du catalogue.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with httpx.AsyncClient(timeout=recipe_service.TIMEOUT) as client:
+        catalogue = await _list_catalogue(client, semaphore)
+        if catalogue is None:
+            raise RuntimeError("Catalogue TheMealDB indisponible")
+
+        db = get_db()
+        try:
+            known = {r["id_meal"]: r["synced_at"] for r in db.execute(
+                "SELECT id_meal, synced_at FROM mealdb_mirror").fetchall()}
+        finally:
+            db.close()
+
+        stale_before = datetime.utcnow() - timedelta(days=refresh_after_days)
+        to_fetch = [
+            meal_id for meal_id in catalogue
+            if meal_id not in known or datetime.fromisoformat(str(known[meal_id])) < stale_before
+        ]
+        removed = [meal_id for meal_id in known if meal_id not in catalogue]
+
+        results = await asyncio.gather(
+            *(_fetch_meal(client, semaphore, meal_id, translate) for meal_id in to_fetch),
+            return_exceptions=True,
+        )
+
+    rows = [r for r in results if isinstance(r, tuple)]
+    failed = len(results) - len(rows)
+
+    db = get_db()
+    try:
+        db.executemany(
+            """INSERT INTO mealdb_mirror (id_meal, title_en, title_fr, category, area, meal_json,
+                                          recipe_json, instructions_fr, diet_tags_json, search_text, synced_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT(id_meal) DO UPDATE SET
+                   title_en = excluded.title_en, title_fr = excluded.title_fr,
+                   category = excluded.category, area = excluded.area,
+                   meal_json = excluded.meal_json, recipe_json = excluded.recipe_json,
+                   instructions_fr = excluded.instructions_fr, diet_tags_json = excluded.diet_tags_json,
+                   search_text = excluded.search_text, synced_at = CURRENT_TIMESTAMP""",
+            rows
+        )
+        if removed:
+            db.executemany("DELETE FROM mealdb_mirror WHERE id_meal = ?", [(m,) for m in removed])
+        db.commit()
+    finally:
+        db.close()
+
+    stats = {
+        "catalogue": len(catalogue),
+        "fetched": len(rows),
+        "failed": failed,
+        "removed": len(removed),
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+    }
+    logger.info(f"Miroir TheMealDB synchronisé: {stats}")
+    return stats
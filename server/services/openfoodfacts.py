@@ -8,6 +8,8 @@ import json
 import logging
 from typing import Optional
 
+from .upstream import upstream_get
+
 logger = logging.getLogger("frigoscan.openfoodfacts")
 
 OFF_BASE_URL = "https://world.openfoodfacts.org/api/v2/product"
@@ -23,7 +25,7 @@ async def lookup_barcode(barcode: str) -> Optional[dict]:
     url = f"{OFF_BASE_URL}/{barcode}.json"
     try:
         async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(url)
+            resp = await upstream_get(client, "openfoodfacts", url, hedge=True, endpoint="product")
             if resp.status_code != 200:
                 return None
             data = resp.json()
@@ -40,7 +42,7 @@ async def search_products(query: str, page: int = 1, page_size: int = 20) -> lis
     """Recherche textuelle de produits."""
     try:
         async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(SEARCH_URL, params={
+            resp = await upstream_get(client, "openfoodfacts", SEARCH_URL, params={
                 "search_terms": query,
                 "search_simple": 1,
                 "action": "process",
@@ -0,0 +1,192 @@
+"""
+FrigoScan — Quantités et unités.
+Un seul analyseur (expressions compilées au chargement) transforme une mesure
+texte ("2 c. à soupe", "1 1/2 cups", "250g", "3 gousses") en quantité typée :
+valeur dans l'unité canonique de sa dimension (g, ml, ou unité comptée).
+Les conversions masse / volume / comptage deviennent de l'arithmétique.
+"""
+
+import json
+import re
+from functools import lru_cache
+from fractions import Fraction
+from typing import NamedTuple, Optional
+
+MASS = "mass"
+VOLUME = "volume"
+COUNT = "count"
+
+# Unité affichée -> (unité canonique, facteur vers l'unité canonique, dimension, alias)
+UNITS = {
+    "mg": ("g", 0.001, MASS, ("milligramme", "milligrammes")),
+    "g": ("g", 1.0, MASS, ("gr", "gr.", "gramme", "grammes", "gram", "grams")),
+    "kg": ("g", 1000.0, MASS, ("kilo", "kilos", "kilogramme", "kilogrammes", "kilogram", "kilograms")),
+    "once": ("g", 28.35, MASS, ("onces", "oz", "oz.", "ounce", "ounces", "-ounce")),
+    "livre": ("g", 453.6, MASS, ("livres", "lb", "lbs", "lbs.", "pound", "pounds")),
+    "mL": ("ml", 1.0, VOLUME, ("ml", "ml.", "millilitre", "millilitres", "milliliter", "milliliters")),
+    "cL": ("ml", 10.0, VOLUME, ("cl", "cl.", "centilitre", "centilitres", "centiliter", "centiliters")),
+    "dL": ("ml", 100.0, VOLUME, ("dl", "décilitre", "décilitres")),
+    "L": ("ml", 1000.0, VOLUME, ("l", "l.", "litre", "litres", "liter", "liters")),
+    "c. à café": ("ml", 5.0, VOLUME, ("c.à café", "càc", "cuillère à café", "cuillères à café",
+                                      "tsp", "tsp.", "teaspoon", "teaspoons")),
+    "c. à soupe": ("ml", 15.0, VOLUME, ("c.à soupe", "càs", "cuillère à soupe", "cuillères à soupe",
+                                        "tbsp", "tbsp.", "tbs", "tbs.", "tblsp", "tblsp.", "tbls", "tbls.",
+                                        "tablespoon", "tablespoons")),
+    "tasse": ("ml", 240.0, VOLUME, ("tasses", "cup", "cups", "cup.")),
+    "quart": ("ml", 946.0, VOLUME, ("quarts", "qt", "qt.")),
+    "pincée": ("ml", 0.3, VOLUME, ("pincées", "pinch", "pinches", "pinch.")),
+    "trait": ("ml", 0.6, VOLUME, ("traits", "dash", "dashes", "splash", "splashes")),
+    "unité": ("unité", 1.0, COUNT, ("unités", "u", "pièce", "pièces", "piece", "pieces", "pc", "pcs", "x")),
+    "gousse": ("gousse", 1.0, COUNT, ("gousses", "clove", "cloves")),
+    "feuille": ("feuille", 1.0, COUNT, ("feuilles", "leaf", "leaves")),
+    "tranche": ("tranche", 1.0, COUNT, ("tranches", "slice", "slices")),
+    "boîte": ("boîte", 1.0, COUNT, ("boîtes", "boite", "boites", "can", "cans", "tin", "tins")),
+    "sachet": ("sachet", 1.0, COUNT, ("sachets", "packet", "packets", "package", "packages")),
+    "pot": ("pot", 1.0, COUNT, ("pots", "jar", "jars")),
+    "botte": ("botte", 1.0, COUNT, ("bottes", "bunch", "bunches")),
+    "brin": ("brin", 1.0, COUNT, ("brins", "sprig", "sprigs")),
+    "tige": ("tige", 1.0, COUNT, ("tiges", "stalk", "stalks")),
+    "poignée": ("poignée", 1.0, COUNT, ("poignées", "handful", "handfuls", "handfull")),
+    "filet": ("filet", 1.0, COUNT, ("filets", "fillet", "fillets")),
+}
+
+_ALIASES: dict[str, str] = {}
+for _unit, (_canonical, _factor, _dimension, _aliases) in UNITS.items():
+    for _alias in (_unit, *_aliases):
+        _ALIASES[_alias.lower()] = _unit
+
+_UNICODE_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3, "⅛": 0.125}
+_FRAC = "".join(_UNICODE_FRACTIONS)
+
+# Fraction simple en premier : sinon "1/2" s'arrêterait au "1"
+_NUMBER = rf"(?:\d+/\d+|\d+(?:[.,]\d+)?(?:\s*[{_FRAC}]|\s+\d+/\d+)?|[{_FRAC}])"
+_QUANTITY_RE = re.compile(rf"^\s*(?P<num>{_NUMBER})(?:\s*(?:-|–|à|to)\s*(?P<upper>{_NUMBER}))?\s*")
+_UNIT_RE = re.compile(
+    r"(?P<unit>" + "|".join(re.escape(a) for a in sorted(_ALIASES, key=len, reverse=True)) + r")(?![\wÀ-ÿ])"
+)
+
+
+class Quantity(NamedTuple):
+    """Mesure analysée : quantité écrite + valeur dans l'unité canonique."""
+    amount: float          # quantité telle qu'écrite (2 pour "2 c. à soupe")
+    unit: str              # unité affichée normalisée ("c. à soupe")
+    value: float           # valeur dans l'unité canonique (30.0)
+    canonical_unit: str    # g, ml, unité, gousse...
+    dimension: str         # mass / volume / count
+
+    def to_dict(self) -> dict:
+        return {
+            "amount": round(self.amount, 4),
+            "unit": self.unit,
+            "value": round(self.value, 4),
+            "canonical_unit": self.canonical_unit,
+            "dimension": self.dimension,
+        }
+
+
+def parse_amount(text: Optional[str]) -> Optional[float]:
+    """Nombre seul : '2', '2,5', '1/2', '1 1/2', '1½' ; None si illisible."""
+    q = (text or "").strip()
+    if not q:
+        return None
+    try:
+        if q[-1] in _UNICODE_FRACTIONS:
+            head = q[:-1].strip()
+            return (float(head.replace(",", ".")) if head else 0.0) + _UNICODE_FRACTIONS[q[-1]]
+        if " " in q and "/" in q:
+            main, frac = q.split(" ", 1)
+            return float(main) + float(Fraction(frac))
+        if "/" in q:
+            return float(Fraction(q))
+        return float(q.replace(",", "."))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def unit_info(unit: Optional[str]) -> Optional[tuple[str, float, str]]:
+    """(unité canonique, facteur, dimension) d'une unité libre ; '' compte comme 'unité'."""
+    key = (unit or "").strip().lower() or "unité"
+    name = _ALIASES.get(key)
+    if name is None:
+        return None
+    canonical, factor, dimension, _ = UNITS[name]
+    return canonical, factor, dimension
+
+
+@lru_cache(maxsize=8192)
+def parse_quantity(measure: Optional[str]) -> Optional[Quantity]:
+    """
+    Analyse une mesure ; None si elle n'a ni nombre ni unité reconnue
+    ("selon le goût"). Sans unité, la quantité compte des unités ;
+    une plage ("2-3") retient la borne haute.
+    """
+    text = (measure or "").strip()
+    if not text:
+        return None
+    lowered = text.lower()
+    match = _QUANTITY_RE.match(lowered)
+    if match:
+        amount = parse_amount(match.group("upper") or match.group("num"))
+        if amount is None:
+            return None
+        rest = lowered[match.end():]
+    else:
+        amount, rest = 1.0, lowered
+    unit_match = _UNIT_RE.match(rest)
+    if unit_match:
+        unit = _ALIASES[unit_match.group("unit")]
+    elif match:
+        unit = "unité"
+    else:
+        return None
+    canonical, factor, dimension, _ = UNITS[unit]
+    return Quantity(amount, unit, amount * factor, canonical, dimension)
+
+
+def _same_unit(unit_a: Optional[str], unit_b: Optional[str]) -> bool:
+    return (unit_a or "").strip().lower() == (unit_b or "").strip().lower()
+
+
+def convert(value: float, from_unit: Optional[str], to_unit: Optional[str]) -> float:
+    """
+    Convertit `value` ; ValueError si les unités sont inconnues ou incompatibles.
+    Deux unités libres identiques ("botte de") restent compatibles entre elles.
+    """
+    if _same_unit(from_unit, to_unit):
+        return value
+    source, target = unit_info(from_unit), unit_info(to_unit)
+    if source is None or target is None or source[0] != target[0]:
+        raise ValueError(f"Unités incompatibles : {from_unit} -> {to_unit}")
+    return value * source[1] / target[1]
+
+
+def compatible(unit_a: Optional[str], unit_b: Optional[str]) -> bool:
+    if _same_unit(unit_a, unit_b):
+        return True
+    a, b = unit_info(unit_a), unit_info(unit_b)
+    return a is not None and b is not None and a[0] == b[0]
+
+
+def annotate_ingredients(ingredients: list) -> list:
+    """Ajoute la mesure analysée ("qty") à chaque ingrédient qui en a une."""
+    for ing in ingredients:
+        if not isinstance(ing, dict):
+            continue
+        parsed = parse_quantity(ing.get("measure")) if isinstance(ing.get("measure"), str) else None
+        if parsed is not None:
+            ing["qty"] = parsed.to_dict()
+        else:
+            ing.pop("qty", None)
+    return ingredients
+
+
+def annotate_ingredients_json(ingredients_json: str) -> str:
+    """Variante sur ingredients_json ; le texte est rendu tel quel s'il n'est pas une liste JSON."""
+    try:
+        ingredients = json.loads(ingredients_json or "[]")
+    except (TypeError, ValueError):
+        return ingredients_json
+    if not isinstance(ingredients, list):
+        return ingredients_json
+    return json.dumps(annotate_ingredients(ingredients))
@@ -0,0 +1,186 @@
+"""
+FrigoScan — Réserve persistante de recettes aléatoires.
+Recettes déjà normalisées, traduites et étiquetées (régimes), stockées en base
+pour que /api/recipes/suggest/random réponde sans appel réseau.
+La réserve est consommée au fil des tirages et complétée en tâche de fond
+(planificateur) dès qu'elle passe sous le seuil bas.
+"""
+
+import asyncio
+import json
+import logging
+import random
+from typing import Optional
+
+from server.database import get_db
+from .recipe_service import get_random_recipes, filter_by_diet, _translate_recipe_async
+
+logger = logging.getLogger("frigoscan.reservoir")
+
+LOW_WATER = 40    # en dessous : on programme un complément
+HIGH_WATER = 120  # au-dessus : on arrête de compléter
+BATCH_SIZE = 12   # recettes demandées par lot à TheMealDB
+MAX_BATCHES_PER_RUN = 4  # travail borné par exécution (contre-pression)
+
+
+def _title_key(recipe: dict) -> str:
+    return (recipe.get("title") or "").strip().lower()
+
+
+def _has_details(recipe: dict) -> bool:
+    """Recette exploitable : des ingrédients ou de vraies instructions."""
+    try:
+        ingredients = json.loads(recipe.get("ingredients_json", "[]"))
+        if isinstance(ingredients, list) and ingredients:
+            return True
+    except Exception:
+        pass
+    instructions = (recipe.get("instructions") or "").strip().lower()
+    return bool(instructions) and "voir le site marmiton" not in instructions
+
+
+def reservoir_size(target_servings: int = 4, db=None) -> int:
+    own_db = db is None
+    if own_db:
+        db = get_db()
+    try:
+        return db.execute(
+            "SELECT COUNT(*) AS c FROM recipe_reservoir WHERE target_servings = ?",
+            (target_servings,)
+        ).fetchone()["c"]
+    finally:
+        if own_db:
+            db.close()
+
+
+def take_random_recipes(
+    count: int,
+    target_servings: int = 4,
+    diets: Optional[list[str]] = None,
+    allergens: Optional[list[str]] = None,
+    custom_exclusions: Optional[list[str]] = None,
+    banned_titles: Optional[set[str]] = None,
+    consume: bool = True,
+) -> list[dict]:
+    """
+    Tire jusqu'à `count` recettes au hasard dans la réserve, en O(count) :
+    on part d'un id aléatoire et on lit une fenêtre via la clé primaire
+    (pas de ORDER BY RANDOM() sur toute la table).
+    Avec `consume`, les recettes examinées sont retirées de la réserve
+    (servies, ou incompatibles avec les réglages actuels).
+    """
+    banned_titles = banned_titles or set()
+    window = count * 2 + 4
+    db = get_db()
+    try:
+        bounds = db.execute(
+            "SELECT MIN(id) AS lo, MAX(id) AS hi FROM recipe_reservoir WHERE target_servings = ?",
+            (target_servings,)
+        ).fetchone()
+        if bounds["lo"] is None:
+            return []
+        start = random.randint(bounds["lo"], bounds["hi"])
+        rows = db.execute(
+            "SELECT id, recipe_json FROM recipe_reservoir WHERE target_servings = ? AND id >= ? ORDER BY id LIMIT ?",
+            (target_servings, start, window)
+        ).fetchall()
+        if len(rows) < window:
+            # Reprendre depuis le début de la table
+            rows += db.execute(
+                "SELECT id, recipe_json FROM recipe_reservoir WHERE target_servings = ? AND id < ? ORDER BY id LIMIT ?",
+                (target_servings, start, window - len(rows))
+            ).fetchall()
+
+        candidates = []
+        for row in rows:
+            recipe = json.loads(row["recipe_json"])
+            recipe["_reservoir_id"] = row["id"]
+            candidates.append(recipe)
+        random.shuffle(candidates)
+
+        compatible = filter_by_diet(candidates, diets or [], allergens or [], custom_exclusions)
+        picked = [r for r in compatible if _title_key(r) not in banned_titles][:count]
+
+        if consume:
+            picked_ids = {r["_reservoir_id"] for r in picked}
+            rejected_ids = {r["_reservoir_id"] for r in candidates} - {r["_reservoir_id"] for r in compatible}
+            drop = list(picked_ids | rejected_ids)
+            if drop:
+                db.execute(
+                    f"DELETE FROM recipe_reservoir WHERE id IN ({','.join('?' * len(drop))})",
+                    drop
+                )
+                db.commit()
+
+        for recipe in picked:
+            recipe.pop("_reservoir_id", None)
+        return picked
+    finally:
+        db.close()
+
+
+def request_top_up(target_servings: int = 4) -> bool:
+    """Programme un complément si la réserve est sous le seuil bas."""
+    from .scheduler import enqueue_job, scheduler
+
+    if reservoir_size(target_servings) >= LOW_WATER:
+        return False
+    enqueue_job("refresh_random", {"target_servings": target_servings})
+    scheduler.wake()
+    return True
+
+
+async def top_up_reservoir(target_servings: int = 4, concurrency: int = 2) -> dict:
+    """
+    Complète la réserve jusqu'au seuil haut, par lots bornés.
+    Chaque recette est traduite (titre, instructions) avant d'être stockée.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _translate(recipe: dict) -> dict:
+        async with semaphore:
+            return await _translate_recipe_async(recipe)
+
+    added = 0
+    batches = 0
+    while batches < MAX_BATCHES_PER_RUN:
+        current = reservoir_size(target_servings)
+        if current >= HIGH_WATER:
+            break
+        batches += 1
+        fetched = await get_random_recipes(min(BATCH_SIZE, HIGH_WATER - current), target_servings=target_servings)
+        fetched = [r for r in fetched if _title_key(r) and _has_details(r)]
+        if not fetched:
+            break
+        translated = await asyncio.gather(*(_translate(dict(r)) for r in fetched))
+
+        db = get_db()
+        try:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO recipe_reservoir (title_key, target_servings, recipe_json) VALUES (?, ?, ?)",
+                [(_title_key(r), target_servings, json.dumps(r, ensure_ascii=False)) for r in translated]
+            )
+            db.commit()
+            added += db.total_changes - before
+        finally:
+            db.close()
+
+    size = reservoir_size(target_servings)
+    logger.info(f"Réserve aléatoire: +{added} recettes ({size} disponibles)")
+    return {"added": added, "batches": batches, "size": size}
+
+
+def get_reservoir_stats() -> dict:
+    db = get_db()
+    try:
+        rows = db.execute(
+            "SELECT target_servings, COUNT(*) AS c FROM recipe_reservoir GROUP BY target_servings"
+        ).fetchall()
+    finally:
+        db.close()
+    return {
+        "sizes": {str(r["target_servings"]): r["c"] for r in rows},
+        "low_water": LOW_WATER,
+        "high_water": HIGH_WATER,
+    }
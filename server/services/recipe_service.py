@@ -4,10 +4,16 @@ Recherche de recettes en ligne (TheMealDB + fallback Marmiton).
 Calcul du score de correspondance avec le contenu du frigo.
 """
 
+import asyncio
+import heapq
 import httpx
 import json
 import logging
+import os
 import re
+import time
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -16,14 +22,18 @@ from .marmiton_service import (
     get_random_marmiton_recipes,
     get_marmiton_categories,
 )
+from . import ingredient_tokens, seasonal_service
+from .quantity import parse_amount, annotate_ingredients, annotate_ingredients_json
+from .upstream import upstream_get
 
 logger = logging.getLogger("frigoscan.recipes")
 
-MEALDB_SEARCH = "https://www.themealdb.com/api/json/v1/1/search.php"
-MEALDB_LOOKUP = "https://www.themealdb.com/api/json/v1/1/lookup.php"
-MEALDB_RANDOM = "https://www.themealdb.com/api/json/v1/1/random.php"
-MEALDB_FILTER = "https://www.themealdb.com/api/json/v1/1/filter.php"
-MEALDB_CATEGORIES = "https://www.themealdb.com/api/json/v1/1/list.php?c=list"
+MEALDB_BASE = os.getenv("MEALDB_BASE_URL", "https://www.themealdb.com/api/json/v1/1")
+MEALDB_SEARCH = f"{MEALDB_BASE}/search.php"
+MEALDB_LOOKUP = f"{MEALDB_BASE}/lookup.php"
+MEALDB_RANDOM = f"{MEALDB_BASE}/random.php"
+MEALDB_FILTER = f"{MEALDB_BASE}/filter.php"
+MEALDB_CATEGORIES = f"{MEALDB_BASE}/list.php?c=list"
 TIMEOUT = 15.0
 
 # API de traduction gratuite MyMemory
@@ -100,6 +110,76 @@ RECIPE_TITLES_FR = {
 
 LOCAL_RECIPES_PATH = Path(__file__).parent.parent / "data" / "local_recipes.json"
 
+# ---- Cache mémoire des résultats en ligne -----------------------------------------
+# Alimenté à la demande et par le planificateur (pré-chargement, préchauffage).
+SEARCH_CACHE_TTL = 6 * 3600  # secondes
+SEARCH_CACHE_MAX_ENTRIES = 500
+
+_online_cache: dict[tuple, tuple[float, list[dict]]] = {}
+
+
+def _cache_get(key: tuple) -> Optional[list[dict]]:
+    """Retourne une copie des recettes en cache, ou None si absent/expiré."""
+    entry = _online_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, recipes = entry
+    if time.monotonic() - stored_at > SEARCH_CACHE_TTL:
+        _online_cache.pop(key, None)
+        return None
+    # Copie : les appelants enrichissent les recettes (match_score...)
+    return [dict(r) for r in recipes]
+
+
+def _cache_put(key: tuple, recipes: list[dict]) -> None:
+    """Mémorise un résultat non vide (éviction du plus ancien si plein)."""
+    if not recipes:
+        return
+    if key not in _online_cache and len(_online_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+        oldest = min(_online_cache, key=lambda k: _online_cache[k][0])
+        _online_cache.pop(oldest, None)
+    _online_cache[key] = (
+        time.monotonic(),
+        [r if r.get("ingredient_tokens_json") else ingredient_tokens.with_ingredient_tokens(r)
+         for r in map(dict, recipes)],
+    )
+
+
+# ---- Instrumentation des étapes (pipeline catégories) ------------------------------
+CATEGORY_CONCURRENCY = 6  # lookups + traductions simultanés par catégorie
+
+_stage_timings: dict[str, dict] = {}
+
+
+def record_stage_timing(stage: str, seconds: float) -> None:
+    """Cumule la durée d'une étape (nombre, total, max en ms)."""
+    ms = seconds * 1000
+    entry = _stage_timings.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    entry["count"] += 1
+    entry["total_ms"] += ms
+    entry["max_ms"] = max(entry["max_ms"], ms)
+
+
+def get_stage_timings() -> dict:
+    """Durées cumulées par étape, avec la moyenne."""
+    return {
+        stage: {
+            "count": e["count"],
+            "avg_ms": round(e["total_ms"] / e["count"], 1) if e["count"] else 0.0,
+            "max_ms": round(e["max_ms"], 1),
+        }
+        for stage, e in _stage_timings.items()
+    }
+
+
+def get_cache_stats() -> dict:
+    """Résumé du cache en ligne (pour le statut du planificateur)."""
+    return {"entries": len(_online_cache)}
+
+
+def clear_search_cache() -> None:
+    _online_cache.clear()
+
 # ---- Traduction anglais → français ------------------------------------------------
 
 async def _translate_text_api(text: str, source_lang: str = "en", target_lang: str = "fr") -> str:
@@ -136,7 +216,7 @@ async def _translate_text_api(text: str, source_lang: str = "en", target_lang: s
                 "q": text,
                 "langpair": f"{source_lang}|{target_lang}"
             }
-            resp = await client.get(TRANSLATION_API, params=params)
+            resp = await upstream_get(client, "mymemory", TRANSLATION_API, params=params)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("responseStatus") == 200:
@@ -260,110 +340,155 @@ INGREDIENT_FR = {
     "handfull": "poignée", "-ounce": "once",
 }
 
-def _translate_ingredient_name(name_en: str) -> str:
-    """Traduit un nom d'ingrédient anglais en français."""
-    import re
-
-    key = (name_en or "").lower().strip()
-    if not key:
-        return ""
+# ---------------------------------------------------------------------------
+# Traducteur compilé (ingrédients et mesures TheMealDB)
+# Tables et expressions régulières construites une seule fois au chargement ;
+# les résultats par chaîne sont mémorisés (lru_cache).
+# ---------------------------------------------------------------------------
+
+TRANSLATION_CACHE_SIZE = 8192
+
+# Qualificatifs culinaires d'un nom d'ingrédient
+INGREDIENT_PREP_FR = {
+    "finely chopped": "finement haché",
+    "roughly chopped": "grossièrement haché",
+    "finely sliced": "finement tranché",
+    "chopped": "haché",
+    "minced": "émincé",
+    "diced": "en dés",
+    "sliced": "tranché",
+    "crushed": "écrasé",
+    "grated": "râpé",
+    "ground": "moulu",
+}
+_INGREDIENT_PREP_ORDER = sorted(INGREDIENT_PREP_FR, key=len, reverse=True)
+_INGREDIENT_PREP_RE = {p: re.compile(rf"\b{re.escape(p)}\b") for p in INGREDIENT_PREP_FR}
+
+# Traduction directe prioritaire
+INGREDIENT_OVERRIDES_FR = {
+    "egg white": "blanc d'œuf",
+    "egg whites": "blancs d'œufs",
+    "red wine vinegar": "vinaigre de vin rouge",
+    "black beans": "haricots noirs",
+    "white beans": "haricots blancs",
+    "black olives": "olives noires",
+    "green chilli": "piment vert",
+    "green chilies": "piments verts",
+    "red chilli": "piment rouge",
+    "red chilli powder": "poudre de piment rouge",
+    "white bread": "pain blanc",
+    "desiccated coconut": "noix de coco râpée",
+    "romano pepper": "poivron romano",
+    "king prawns": "crevettes royales",
+    "raw king prawns": "crevettes royales crues",
+    "squid": "calamar",
+}
 
-    prep_map = {
-        "finely chopped": "finement haché",
-        "roughly chopped": "grossièrement haché",
-        "finely sliced": "finement tranché",
-        "chopped": "haché",
-        "minced": "émincé",
-        "diced": "en dés",
-        "sliced": "tranché",
-        "crushed": "écrasé",
-        "grated": "râpé",
-        "ground": "moulu",
-    }
+# Fallback mot à mot (utile pour "red onion", "onions", etc.)
+INGREDIENT_TOKENS_FR = {
+    "large": "grand",
+    "medium": "moyen",
+    "small": "petit",
+    "red": "rouge",
+    "green": "vert",
+    "white": "blanc",
+    "black": "noir",
+    "raw": "cru",
+    "dried": "séché",
+    "desiccated": "râpé",
+    "king": "royal",
+}
+_SIZE_TOKENS_FR = frozenset({
+    "petit", "petite", "petits", "petites", "grand", "grande", "grands", "grandes",
+    "moyen", "moyenne", "moyens", "moyennes",
+})
+_COLOR_STATE_TOKENS_FR = frozenset({
+    "rouge", "rouges", "vert", "verte", "verts", "vertes", "blanc", "blanche", "blancs", "blanches",
+    "noir", "noire", "noirs", "noires", "cru", "crue", "crus", "crues", "séché", "séchée", "séchés",
+    "séchées", "râpé", "râpée", "râpés", "râpées",
+})
+# Accord du qualificatif : terminaison -> (m. sing., f. sing., m. plur., f. plur.)
+_PREP_ENDINGS = {
+    "é": ("é", "ée", "és", "ées"),
+    "u": ("u", "ue", "us", "ues"),
+}
 
-    # Traduction directe prioritaire
-    phrase_overrides = {
-        "egg white": "blanc d'œuf",
-        "egg whites": "blancs d'œufs",
-        "red wine vinegar": "vinaigre de vin rouge",
-        "black beans": "haricots noirs",
-        "white beans": "haricots blancs",
-        "black olives": "olives noires",
-        "green chilli": "piment vert",
-        "green chilies": "piments verts",
-        "red chilli": "piment rouge",
-        "red chilli powder": "poudre de piment rouge",
-        "white bread": "pain blanc",
-        "desiccated coconut": "noix de coco râpée",
-        "romano pepper": "poivron romano",
-        "king prawns": "crevettes royales",
-        "raw king prawns": "crevettes royales crues",
-        "squid": "calamar",
-    }
+_SPACES_RE = re.compile(r"\s+")
+_D_APOSTROPHE_RE = re.compile(r"\bd\'\s+")
 
-    if key in phrase_overrides:
-        return phrase_overrides[key]
 
+def _lookup_ingredient(key: str) -> Optional[str]:
+    """Entrée du dictionnaire, y compris au singulier ('onions' -> 'onion')."""
     if key in INGREDIENT_FR:
         return INGREDIENT_FR[key]
     if key.endswith('s') and key[:-1] in INGREDIENT_FR:
         return INGREDIENT_FR[key[:-1]]
+    return None
+
+
+def _agree_prep(prep_text: str, noun_fr: str) -> str:
+    """Accorde un qualificatif ('haché') avec le nom qu'il suit."""
+    n = (noun_fr or "").strip().lower()
+    is_plural = n.endswith("s")
+    is_feminine = n.endswith("e") or n.endswith("es")
+
+    for stem_end, (masc_s, fem_s, masc_p, fem_p) in _PREP_ENDINGS.items():
+        if prep_text.endswith(stem_end):
+            stem = prep_text[:-len(stem_end)]
+            if is_feminine and is_plural:
+                return stem + fem_p
+            if is_feminine:
+                return stem + fem_s
+            if is_plural:
+                return stem + masc_p
+            return prep_text
+    return prep_text
+
+
+@lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
+def _translate_ingredient_name(name_en: str) -> str:
+    """Traduit un nom d'ingrédient anglais en français."""
+    key = (name_en or "").lower().strip()
+    if not key:
+        return ""
+
+    if key in INGREDIENT_OVERRIDES_FR:
+        return INGREDIENT_OVERRIDES_FR[key]
+    direct = _lookup_ingredient(key)
+    if direct is not None:
+        return direct
 
     # Extraire un qualificatif culinaire éventuel
     prep_found = ""
     base = key
-    for prep_en in sorted(prep_map.keys(), key=len, reverse=True):
+    for prep_en in _INGREDIENT_PREP_ORDER:
         if prep_en in base:
             prep_found = prep_en
-            base = re.sub(rf"\b{re.escape(prep_en)}\b", "", base).strip()
+            base = _INGREDIENT_PREP_RE[prep_en].sub("", base).strip()
             break
 
-    base = re.sub(r"\s+", " ", base).strip(" ,.-")
+    base = _SPACES_RE.sub(" ", base).strip(" ,.-")
     if not base:
         base = key
 
     # Re-traduction exacte sur base nettoyée
-    if base in INGREDIENT_FR:
-        base_fr = INGREDIENT_FR[base]
-    elif base.endswith('s') and base[:-1] in INGREDIENT_FR:
-        base_fr = INGREDIENT_FR[base[:-1]]
-    else:
-        # Fallback mot à mot (utile pour "red onion", "onions", etc.)
-        token_overrides = {
-            "large": "grand",
-            "medium": "moyen",
-            "small": "petit",
-            "red": "rouge",
-            "green": "vert",
-            "white": "blanc",
-            "black": "noir",
-            "raw": "cru",
-            "dried": "séché",
-            "desiccated": "râpé",
-            "king": "royal",
-        }
-
+    base_fr = _lookup_ingredient(base)
+    if base_fr is None:
         translated_words = []
         for w in base.split():
             w_clean = w.strip(" ,.-")
             if not w_clean:
                 continue
-            if w_clean in token_overrides:
-                translated_words.append(token_overrides[w_clean])
-            elif w_clean in INGREDIENT_FR:
-                translated_words.append(INGREDIENT_FR[w_clean])
-            elif w_clean.endswith('s') and w_clean[:-1] in INGREDIENT_FR:
-                translated_words.append(INGREDIENT_FR[w_clean[:-1]])
+            if w_clean in INGREDIENT_TOKENS_FR:
+                translated_words.append(INGREDIENT_TOKENS_FR[w_clean])
             else:
-                translated_words.append(w_clean)
+                translated_words.append(_lookup_ingredient(w_clean) or w_clean)
 
         # Réordonner légèrement pour un français plus naturel
-        size_tokens = {"petit", "petite", "petits", "petites", "grand", "grande", "grands", "grandes", "moyen", "moyenne", "moyens", "moyennes"}
-        color_state_tokens = {"rouge", "rouges", "vert", "verte", "verts", "vertes", "blanc", "blanche", "blancs", "blanches", "noir", "noire", "noirs", "noires", "cru", "crue", "crus", "crues", "séché", "séchée", "séchés", "séchées", "râpé", "râpée", "râpés", "râpées"}
         if len(translated_words) >= 2:
-            core = [w for w in translated_words if w not in size_tokens and w not in color_state_tokens]
-            sizes = [w for w in translated_words if w in size_tokens]
-            states = [w for w in translated_words if w in color_state_tokens]
+            core = [w for w in translated_words if w not in _SIZE_TOKENS_FR and w not in _COLOR_STATE_TOKENS_FR]
+            sizes = [w for w in translated_words if w in _SIZE_TOKENS_FR]
+            states = [w for w in translated_words if w in _COLOR_STATE_TOKENS_FR]
             if core:
                 translated_words = sizes + core + states
 
@@ -372,206 +497,137 @@ def _translate_ingredient_name(name_en: str) -> str:
     if not prep_found:
         return base_fr
 
-    prep_fr = prep_map[prep_found]
-
-    def _agree_prep(prep_text: str, noun_fr: str) -> str:
-        import re
-        p = prep_text
-        n = (noun_fr or "").strip().lower()
-
-        is_plural = n.endswith("s")
-        is_feminine = n.endswith("e") or n.endswith("es")
+    prep_fr = _agree_prep(INGREDIENT_PREP_FR[prep_found], base_fr)
+    out = f"{base_fr} {prep_fr}".strip()
+    out = _SPACES_RE.sub(" ", out)
+    return _D_APOSTROPHE_RE.sub("d'", out)
+
+
+# Unités de mesure (mot à mot)
+MEASURE_UNITS_FR = {
+    'teaspoon': 'c. à café', 'teaspoons': 'c. à café', 'tsp': 'c. à café', 'tsp.': 'c. à café',
+    'tablespoon': 'c. à soupe', 'tablespoons': 'c. à soupe', 'tbsp': 'c. à soupe',
+    'tbs': 'c. à soupe', 'tbsp.': 'c. à soupe', 'tbs.': 'c. à soupe',
+    'tblsp': 'c. à soupe', 'tblsp.': 'c. à soupe',
+    'tbls': 'c. à soupe', 'tbls.': 'c. à soupe',
+    'cup': 'tasse', 'cups': 'tasse', 'cup.': 'tasse', 'c': 'tasse',
+    'quart': 'quart', 'quarts': 'quarts', 'qt': 'quart', 'qt.': 'quart',
+    'ounce': 'once', 'ounces': 'once', 'oz': 'once', 'oz.': 'once',
+    'pound': 'livre', 'pounds': 'livre', 'lb': 'livre', 'lbs': 'livre', 'lbs.': 'livre',
+    'gram': 'g', 'grams': 'g', 'g': 'g', 'gr': 'g', 'gr.': 'g',
+    'kilogram': 'kg', 'kg': 'kg',
+    'milliliter': 'mL', 'milliliters': 'mL', 'ml': 'mL', 'ml.': 'mL',
+    'centiliter': 'cL', 'centiliters': 'cL', 'cl': 'cL', 'cl.': 'cL',
+    'liter': 'L', 'liters': 'L', 'l': 'L', 'l.': 'L',
+    'pinch': 'pincée', 'pinches': 'pincée', 'pinch.': 'pincée',
+    'dash': 'trait', 'dashes': 'trait',
+    'splash': 'trait', 'splashes': 'trait',
+    'clove': 'gousse', 'cloves': 'gousses', 'clove.': 'gousse', 'cloves.': 'gousses',
+    'leaf': 'feuille', 'leaves': 'feuilles', 'leaf.': 'feuille', 'leaves.': 'feuilles',
+    'sprinkling': 'pincée', 'sprinkle': 'pincée', 'sprinkles': 'pincée',
+    'topping': 'garniture', 'toppings': 'garniture',
+    'whole': 'entier', 'dried': 'séché', 'fresh': 'frais',
+    'handful': 'poignée', 'handfuls': 'poignée',
+    'milliliters)': 'mL)', 'milliliter)': 'mL)',
+    'handfull': 'poignée', '-ounce': 'once',
+}
+_PLURALIZABLE_UNITS = frozenset({'tasse', 'once', 'livre', 'pincée', 'trait', 'gousse', 'quart'})
+
+# Expressions multi-mots des mesures, traduites avant les unités
+MEASURE_PHRASES_FR = {
+    'finely chopped': 'finement haché',
+    'roughly chopped': 'grossièrement haché',
+    'finely sliced': 'finement tranché',
+    'chopped': 'haché',
+    'minced': 'émincé',
+    'diced': 'en dés',
+    'sliced': 'tranché',
+    'crushed': 'écrasé',
+    'grated': 'râpé',
+    'ground': 'moulu',
+    'cloves minced': 'gousses émincées',
+    'clove minced': 'gousse émincée',
+    'cloves chopped': 'gousses hachées',
+    'clove chopped': 'gousse hachée',
+    'to serve': 'à servir',
+    'to taste': 'selon le goût',
+    'for brushing': 'pour badigeonner',
+    'juice of': 'jus de',
+    'zest of': 'zeste de',
+}
+# Une seule alternance, plus longues expressions d'abord
+_MEASURE_PHRASES_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in sorted(MEASURE_PHRASES_FR, key=len, reverse=True)) + r")\b"
+)
+_MEASURE_SPLIT_RE = re.compile(r'^([\d.,/\s]*)(.*)$')
+_MEASURE_QTY_RE = re.compile(r'^([\d.,/\s]+)(.*)$')
 
-        endings = {
-            "é": ("é", "ée", "és", "ées"),
-            "u": ("u", "ue", "us", "ues"),
-        }
 
-        for stem_end, forms in endings.items():
-            masc_s, fem_s, masc_p, fem_p = forms
-            if re.search(rf"{stem_end}$", p):
-                if is_feminine and is_plural:
-                    return re.sub(rf"{stem_end}$", fem_p, p)
-                if is_feminine:
-                    return re.sub(rf"{stem_end}$", fem_s, p)
-                if is_plural:
-                    return re.sub(rf"{stem_end}$", masc_p, p)
-                return p
-        return p
-
-    prep_fr = _agree_prep(prep_fr, base_fr)
-    out = f"{base_fr} {prep_fr}".strip()
-    out = re.sub(r"\s+", " ", out)
-    out = re.sub(r"\bd\'\s+", "d'", out)
-    return out
+def _translate_unit_phrase(text: str) -> str:
+    out = (text or "").strip().lower()
+    if not out:
+        return out
+    out = _MEASURE_PHRASES_RE.sub(lambda m: MEASURE_PHRASES_FR[m.group(0)], out)
+    translated = " ".join(MEASURE_UNITS_FR.get(w, w) for w in out.split()).strip()
+    translated = _SPACES_RE.sub(" ", translated)
+    return _D_APOSTROPHE_RE.sub("d'", translated)
 
 
+@lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
 def _translate_measure(measure_en: str) -> str:
     """Traduit les unités de mesure anglaises en français."""
     if not measure_en:
         return measure_en
-    m = measure_en.strip().lower()
-    # Mapping des unités
-    units_map = {
-        'teaspoon': 'c. à café', 'teaspoons': 'c. à café', 'tsp': 'c. à café', 'tsp.': 'c. à café',
-        'tablespoon': 'c. à soupe', 'tablespoons': 'c. à soupe', 'tbsp': 'c. à soupe',
-        'tbs': 'c. à soupe', 'tbsp.': 'c. à soupe', 'tbs.': 'c. à soupe',
-        'tblsp': 'c. à soupe', 'tblsp.': 'c. à soupe',
-        'tbls': 'c. à soupe', 'tbls.': 'c. à soupe',
-        'cup': 'tasse', 'cups': 'tasse', 'cup.': 'tasse', 'c': 'tasse',
-        'quart': 'quart', 'quarts': 'quarts', 'qt': 'quart', 'qt.': 'quart',
-        'ounce': 'once', 'ounces': 'once', 'oz': 'once', 'oz.': 'once',
-        'pound': 'livre', 'pounds': 'livre', 'lb': 'livre', 'lbs': 'livre', 'lbs.': 'livre',
-        'gram': 'g', 'grams': 'g', 'g': 'g', 'gr': 'g', 'gr.': 'g',
-        'kilogram': 'kg', 'kg': 'kg',
-        'milliliter': 'mL', 'milliliters': 'mL', 'ml': 'mL', 'ml.': 'mL',
-        'centiliter': 'cL', 'centiliters': 'cL', 'cl': 'cL', 'cl.': 'cL',
-        'liter': 'L', 'liters': 'L', 'l': 'L', 'l.': 'L',
-        'pinch': 'pincée', 'pinches': 'pincée', 'pinch.': 'pincée',
-        'dash': 'trait', 'dashes': 'trait',
-        'splash': 'trait', 'splashes': 'trait',
-        'clove': 'gousse', 'cloves': 'gousses', 'clove.': 'gousse', 'cloves.': 'gousses',
-        'leaf': 'feuille', 'leaves': 'feuilles', 'leaf.': 'feuille', 'leaves.': 'feuilles',
-        'sprinkling': 'pincée', 'sprinkle': 'pincée', 'sprinkles': 'pincée',
-        'topping': 'garniture', 'toppings': 'garniture',
-        'whole': 'entier', 'dried': 'séché', 'fresh': 'frais',
-        'handful': 'poignée', 'handfuls': 'poignée',
-        'milliliters)': 'mL)', 'milliliter)': 'mL)',
-        'handfull': 'poignée', '-ounce': 'once',
-    }
-    pluralizable_units = {'tasse', 'once', 'livre', 'pincée', 'trait', 'gousse', 'quart'}
-    phrase_map = {
-        'finely chopped': 'finement haché',
-        'roughly chopped': 'grossièrement haché',
-        'finely sliced': 'finement tranché',
-        'chopped': 'haché',
-        'minced': 'émincé',
-        'diced': 'en dés',
-        'sliced': 'tranché',
-        'crushed': 'écrasé',
-        'grated': 'râpé',
-        'ground': 'moulu',
-        'cloves minced': 'gousses émincées',
-        'clove minced': 'gousse émincée',
-        'cloves chopped': 'gousses hachées',
-        'clove chopped': 'gousse hachée',
-        'to serve': 'à servir',
-        'to taste': 'selon le goût',
-        'for brushing': 'pour badigeonner',
-        'juice of': 'jus de',
-        'zest of': 'zeste de',
-    }
-
-    def _parse_qty(text: str) -> float | None:
-        from fractions import Fraction
-        try:
-            q = (text or "").strip()
-            if not q:
-                return None
-            if ' ' in q and '/' in q:
-                main, frac = q.split(' ', 1)
-                return float(main) + float(Fraction(frac))
-            if '/' in q:
-                return float(Fraction(q))
-            return float(q.replace(',', '.'))
-        except Exception:
-            return None
-
-    def _translate_unit_phrase(text: str) -> str:
-        import re
-        out = (text or "").strip().lower()
-        if not out:
-            return out
-
-        # D'abord les expressions multi-mots
-        for src in sorted(phrase_map.keys(), key=len, reverse=True):
-            out = re.sub(rf"\b{re.escape(src)}\b", phrase_map[src], out)
-
-        # Puis mot à mot pour les unités
-        words = []
-        for w in out.split():
-            words.append(units_map.get(w, w))
-        translated = " ".join(words).strip()
-        translated = re.sub(r"\s+", " ", translated)
-        translated = re.sub(r"\bd\'\s+", "d'", translated)
-        return translated
-
     # Chercher l'unité (la partie sans les chiffres)
-    import re
-    match = re.match(r'^([\d.,/\s]*)(.*)$', measure_en.strip())
-    if match:
-        qty_part = match.group(1).strip()  # e.g. "1/2", "250"
-        unit_part = match.group(2).strip().lower()  # e.g. "cup", "ml"
-        
-        # Traduire l'unité
-        translated_unit = _translate_unit_phrase(unit_part)
+    match = _MEASURE_SPLIT_RE.match(measure_en.strip())
+    if not match:
+        return measure_en
+    qty_part = match.group(1).strip()  # e.g. "1/2", "250"
+    translated_unit = _translate_unit_phrase(match.group(2).strip().lower())
 
-        # Pluralisation simple des unités françaises
-        qty_value = _parse_qty(qty_part)
-        if qty_value is not None and qty_value > 1 and translated_unit in pluralizable_units and not translated_unit.endswith('s'):
-            translated_unit = f"{translated_unit}s"
-        
-        # Recombiner
-        if qty_part:
-            return f"{qty_part} {translated_unit}".strip()
-        else:
-            return translated_unit
-    return measure_en
+    # Pluralisation simple des unités françaises
+    qty_value = parse_amount(qty_part)
+    if qty_value is not None and qty_value > 1 and translated_unit in _PLURALIZABLE_UNITS \
+            and not translated_unit.endswith('s'):
+        translated_unit = f"{translated_unit}s"
 
+    if qty_part:
+        return f"{qty_part} {translated_unit}".strip()
+    return translated_unit
 
+
+@lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
 def _adapt_and_translate_measure(measure_en: str, ratio: float) -> str:
     """Adapte les quantités selon le ratio et traduit les unités.
-    
+
     Args:
         measure_en: Mesure originale en anglais (ex: "2 cups", "1/2 tsp")
         ratio: Ratio d'adaptation (ex: 1.5 pour passer de 4 à 6 personnes)
     """
     if not measure_en or not measure_en.strip():
         return ""
-    
-    import re
-    from fractions import Fraction
-    
-    # Extraire quantité et unité
-    match = re.match(r'^([\d.,/\s]+)(.*)$', measure_en.strip())
+
+    match = _MEASURE_QTY_RE.match(measure_en.strip())
     if not match:
         # Pas de quantité numérique, juste traduire l'unité/texte
         return _translate_measure(measure_en)
-    
-    qty_str = match.group(1).strip()
-    unit_str = match.group(2).strip()
-    
-    try:
-        # Gérer les fractions (1/2, 1/4, etc.)
-        if ' ' in qty_str and '/' in qty_str:
-            # Ex: "1 1/2"
-            main, frac = qty_str.split(' ', 1)
-            qty = float(main) + float(Fraction(frac))
-        elif '/' in qty_str:
-            qty = float(Fraction(qty_str))
-        else:
-            qty = float(qty_str.replace(',', '.'))
-        
-        # Appliquer le ratio
-        adapted_qty = qty * ratio
-        
-        # Formater joliment
-        if adapted_qty == int(adapted_qty):
-            qty_formatted = str(int(adapted_qty))
-        else:
-            # Arrondir à 1 décimale si proche
-            if abs(adapted_qty - round(adapted_qty, 1)) < 0.01:
-                qty_formatted = f"{adapted_qty:.1f}"
-            else:
-                qty_formatted = f"{adapted_qty:.2f}"
-        
-        # Traduire l'unité
-        measure_adapted = f"{qty_formatted} {unit_str}"
-        return _translate_measure(measure_adapted)
-        
-    except (ValueError, ZeroDivisionError):
+
+    qty = parse_amount(match.group(1))
+    if qty is None:
         # Si échec du parsing, juste traduire tel quel
         return _translate_measure(measure_en)
+    adapted_qty = qty * ratio
+
+    # Formater joliment
+    if adapted_qty == int(adapted_qty):
+        qty_formatted = str(int(adapted_qty))
+    elif abs(adapted_qty - round(adapted_qty, 1)) < 0.01:
+        # Arrondir à 1 décimale si proche
+        qty_formatted = f"{adapted_qty:.1f}"
+    else:
+        qty_formatted = f"{adapted_qty:.2f}"
+
+    return _translate_measure(f"{qty_formatted} {match.group(2).strip()}")
 
 
 def _detect_diet_tags(meal: dict, ingredients_lower: list[str]) -> list[str]:
@@ -649,7 +705,7 @@ async def _translate_instructions_full(text: str) -> str:
                 "q": text,
                 "langpair": "en|fr"
             }
-            resp = await client.get(TRANSLATION_API, params=params)
+            resp = await upstream_get(client, "mymemory", TRANSLATION_API, params=params)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("responseStatus") == 200:
@@ -677,6 +733,7 @@ def _translate_recipe(recipe: dict) -> dict:
             if ing.get("measure"):
                 ing["measure"] = _translate_measure(ing["measure"])
         recipe["ingredients_json"] = json.dumps(ingredients)
+        ingredient_tokens.with_ingredient_tokens(recipe)
     except Exception:
         pass
 
@@ -714,6 +771,7 @@ async def _translate_recipe_async(recipe: dict) -> dict:
             if ing.get("measure"):
                 ing["measure"] = _translate_measure(ing["measure"])
         recipe["ingredients_json"] = json.dumps(ingredients)
+        ingredient_tokens.with_ingredient_tokens(recipe)
     except Exception:
         pass
 
@@ -760,6 +818,21 @@ RECIPE_CATEGORIES_FR = [
 
 
 async def get_recipes_by_category(category: str, max_results: int = 12, target_servings: int = 4) -> list[dict]:
+    """Récupère des recettes par catégorie (avec cache, cf. préchauffage du planificateur)."""
+    import random as rnd
+
+    cache_key = ("category", category, max_results, target_servings)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        rnd.shuffle(cached)
+        return cached
+
+    recipes = await _fetch_recipes_by_category(category, max_results, target_servings)
+    _cache_put(cache_key, recipes)
+    return recipes
+
+
+async def _fetch_recipes_by_category(category: str, max_results: int = 12, target_servings: int = 4) -> list[dict]:
     """Récupère des recettes par catégorie (filter TheMealDB), recherche ou multi-recherche."""
     import random as rnd
 
@@ -773,12 +846,15 @@ async def get_recipes_by_category(category: str, max_results: int = 12, target_s
         return results[:max_results]
 
     if cat_type == "multi":
-        terms = (cat_info or {}).get("terms", [category])
-        all_recipes = []
+        terms = list((cat_info or {}).get("terms", [category]))
         rnd.shuffle(terms)
-        for term in terms[:4]:
-            results = await search_recipes_online(term, target_servings=target_servings)
-            all_recipes.extend(results)
+        started = time.perf_counter()
+        batches = await asyncio.gather(
+            *(search_recipes_online(term, target_servings=target_servings) for term in terms[:4]),
+            return_exceptions=True,
+        )
+        record_stage_timing("multi_search", time.perf_counter() - started)
+        all_recipes = [r for batch in batches if isinstance(batch, list) for r in batch]
         rnd.shuffle(all_recipes)
         seen = set()
         unique = []
@@ -789,47 +865,86 @@ async def get_recipes_by_category(category: str, max_results: int = 12, target_s
                 unique.append(r)
         return unique[:max_results]
 
-    # Type "filter" — catégorie TheMealDB
-    recipes = []
+    # Type "filter" — catégorie TheMealDB, servie par le miroir local si synchronisé
+    from .mealdb_mirror import mirror_by_category
+    mirrored = mirror_by_category(category, max_results=max_results, target_servings=target_servings)
+    if mirrored:
+        return mirrored
+
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(MEALDB_FILTER, params={"c": category})
-            if resp.status_code != 200:
-                # Fallback : chercher par mot-clé
-                logger.info(f"Catégorie {category} ne retourne rien, fallback recherche")
-                return await search_recipes_online(category, target_servings=target_servings)
-            data = resp.json()
-            meals = data.get("meals") or []
-            if not meals:
-                # Fallback : chercher par mot-clé
-                return await search_recipes_online(category, target_servings=target_servings)
-            rnd.shuffle(meals)
-            meals = meals[:max_results + 5]  # Charger plus au cas où certains échouent
-            for meal in meals:
-                meal_id = meal.get("idMeal")
-                if not meal_id:
-                    continue
-                try:
-                    detail_resp = await client.get(MEALDB_LOOKUP, params={"i": meal_id})
-                    if detail_resp.status_code == 200:
-                        detail_data = detail_resp.json()
-                        detail_meals = detail_data.get("meals") or []
-                        if detail_meals:
-                            recipe = _normalize_mealdb(detail_meals[0], target_servings=target_servings)
-                            recipe = await _translate_recipe_async(recipe)
-                            recipes.append(recipe)
-                    if len(recipes) >= max_results:
-                        break  # Arrêter une fois qu'on a assez
-                except Exception as e:
-                    logger.warning(f"Erreur lookup {meal_id}: {e}")
-                    continue
+        return await _category_pipeline(category, max_results, target_servings)
     except Exception as e:
         logger.warning(f"Erreur recettes par catégorie {category}: {e}")
         # Dernière tentative : recherche par mot-clé
         try:
             return await search_recipes_online(category, target_servings=target_servings)
         except Exception:
-            pass
+            return []
+
+
+async def _category_pipeline(category: str, max_results: int, target_servings: int) -> list[dict]:
+    """
+    Pipeline concurrent d'une catégorie TheMealDB : liste (filter), puis détails
+    (lookup) + normalisation + traduction en parallèle sous sémaphore.
+    Les tâches restantes sont annulées dès que max_results recettes sont prêtes.
+    """
+    import random as rnd
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+        resp = await upstream_get(client, "themealdb", MEALDB_FILTER, params={"c": category})
+        record_stage_timing("filter", time.perf_counter() - started)
+        meals = (resp.json().get("meals") or []) if resp.status_code == 200 else []
+        if not meals:
+            # Fallback : chercher par mot-clé
+            logger.info(f"Catégorie {category} ne retourne rien, fallback recherche")
+            return await search_recipes_online(category, target_servings=target_servings)
+
+        rnd.shuffle(meals)
+        meal_ids = [m["idMeal"] for m in meals[:max_results + 5] if m.get("idMeal")]  # marge si échecs
+        semaphore = asyncio.Semaphore(CATEGORY_CONCURRENCY)
+
+        async def _load(meal_id: str) -> Optional[dict]:
+            async with semaphore:
+                t0 = time.perf_counter()
+                detail_resp = await upstream_get(client, "themealdb", MEALDB_LOOKUP, hedge=True, params={"i": meal_id})
+                t1 = time.perf_counter()
+                record_stage_timing("lookup", t1 - t0)
+                detail_meals = (detail_resp.json().get("meals") or []) if detail_resp.status_code == 200 else []
+                if not detail_meals:
+                    return None
+                recipe = _normalize_mealdb(detail_meals[0], target_servings=target_servings)
+                t2 = time.perf_counter()
+                record_stage_timing("normalize", t2 - t1)
+                recipe = await _translate_recipe_async(recipe)
+                record_stage_timing("translate", time.perf_counter() - t2)
+                return recipe
+
+        tasks = [asyncio.create_task(_load(meal_id)) for meal_id in meal_ids]
+        recipes: list[dict] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    recipe = await next_done
+                except Exception as e:
+                    logger.warning(f"Erreur lookup catégorie {category}: {e}")
+                    continue
+                if recipe:
+                    recipes.append(recipe)
+                if len(recipes) >= max_results:
+                    break  # Assez de recettes : on annule le reste
+        finally:
+            cancelled = sum(1 for t in tasks if not t.done())
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    total = time.perf_counter() - started
+    record_stage_timing("category_total", total)
+    logger.info(
+        f"Catégorie {category}: {len(recipes)} recettes en {total * 1000:.0f} ms "
+        f"({len(meal_ids)} lookups lancés, {cancelled} annulés)"
+    )
     return recipes[:max_results]
 
 
@@ -853,7 +968,7 @@ def _normalize_marmiton_to_recipe_format(recipe: dict) -> dict:
 
     return {
         "title": recipe.get("title", ""),
-        "ingredients_json": json.dumps(ingredients),
+        "ingredients_json": json.dumps(annotate_ingredients(ingredients)),
         "instructions": instructions,
         "prep_time": recipe.get("prep_time", 30),
         "cook_time": recipe.get("cook_time", 30),
@@ -862,6 +977,7 @@ def _normalize_marmiton_to_recipe_format(recipe: dict) -> dict:
         "image_url": image_url,
         "tags_json": json.dumps(tags),
         "diet_tags_json": json.dumps(["végétarien"]),  # Les recettes Marmiton sont toutes végétariennes
+        "ingredient_tokens_json": ingredient_tokens.ingredient_tokens_json(ingredients),
     }
 
 
@@ -873,7 +989,9 @@ def load_local_recipes() -> list[dict]:
     if LOCAL_RECIPES_PATH.exists():
         try:
             with open(LOCAL_RECIPES_PATH, "r", encoding="utf-8") as f:
-                recipes.extend(json.load(f))
+                for r in json.load(f):
+                    r["ingredients_json"] = annotate_ingredients_json(r.get("ingredients_json", "[]"))
+                    recipes.append(ingredient_tokens.with_ingredient_tokens(r))
         except Exception as e:
             logger.warning(f"Erreur chargement local_recipes.json: {e}")
     
@@ -893,49 +1011,63 @@ def load_local_recipes() -> list[dict]:
     return recipes
 
 
-async def search_recipes_online(query: str, target_servings: int = 4) -> list[dict]:
-    """Recherche de recettes via TheMealDB (fallback Marmiton)."""
-    query = (query or "").strip()
-    if not query:
-        return []
+def _query_candidates(raw_query: str) -> list[str]:
+    """Variantes de recherche : requête brute, catégorie EN, traduction FR -> EN."""
+    candidates: list[str] = []
+    seen: set[str] = set()
 
-    def _query_candidates(raw_query: str) -> list[str]:
-        candidates: list[str] = []
-        seen: set[str] = set()
+    def add(value: str):
+        value = (value or "").strip()
+        if not value:
+            return
+        key = value.lower()
+        if key in seen:
+            return
+        seen.add(key)
+        candidates.append(value)
 
-        def add(value: str):
-            value = (value or "").strip()
-            if not value:
-                return
-            key = value.lower()
-            if key in seen:
-                return
-            seen.add(key)
-            candidates.append(value)
+    add(raw_query)
 
-        add(raw_query)
+    q_lower = raw_query.lower().strip()
+    add(CATEGORY_EN.get(raw_query, ""))
+    add(CATEGORY_EN.get(q_lower.capitalize(), ""))
 
-        q_lower = raw_query.lower().strip()
-        add(CATEGORY_EN.get(raw_query, ""))
-        add(CATEGORY_EN.get(q_lower.capitalize(), ""))
+    # Traduction FR -> EN simple basée sur le dictionnaire d'ingrédients existant.
+    fr_to_en = {fr.lower(): en for en, fr in INGREDIENT_FR.items()}
+    add(fr_to_en.get(q_lower, ""))
 
-        # Traduction FR -> EN simple basée sur le dictionnaire d'ingrédients existant.
-        fr_to_en = {fr.lower(): en for en, fr in INGREDIENT_FR.items()}
-        add(fr_to_en.get(q_lower, ""))
+    # Heuristique: supprimer pluriel simple.
+    if q_lower.endswith("s"):
+        singular = q_lower[:-1]
+        add(fr_to_en.get(singular, ""))
 
-        # Heuristique: supprimer pluriel simple.
-        if q_lower.endswith("s"):
-            singular = q_lower[:-1]
-            add(fr_to_en.get(singular, ""))
+    return candidates
+
+
+async def search_recipes_online(query: str, target_servings: int = 4) -> list[dict]:
+    """Recherche de recettes via TheMealDB (fallback Marmiton)."""
+    query = (query or "").strip()
+    if not query:
+        return []
 
-        return candidates
+    cache_key = ("search", query.lower(), target_servings)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Miroir local du catalogue TheMealDB (cf. tâche sync_mealdb)
+    from .mealdb_mirror import search_mirror
+    mirrored = search_mirror(_query_candidates(query), target_servings=target_servings)
+    if mirrored:
+        _cache_put(cache_key, mirrored)
+        return mirrored
 
     try:
         recipes: list[dict] = []
         seen_titles: set[str] = set()
         async with httpx.AsyncClient(timeout=TIMEOUT) as client:
             for candidate in _query_candidates(query):
-                resp = await client.get(MEALDB_SEARCH, params={"s": candidate})
+                resp = await upstream_get(client, "themealdb", MEALDB_SEARCH, hedge=True, params={"s": candidate})
                 if resp.status_code != 200:
                     continue
 
@@ -954,6 +1086,7 @@ async def search_recipes_online(query: str, target_servings: int = 4) -> list[di
 
         if recipes:
             logger.info(f"TheMealDB: {len(recipes)} recettes trouvées pour '{query}'")
+            _cache_put(cache_key, recipes)
             return recipes
     except Exception as e:
         logger.warning(f"Erreur recherche recettes TheMealDB: {e}")
@@ -961,6 +1094,7 @@ async def search_recipes_online(query: str, target_servings: int = 4) -> list[di
     try:
         fallback = await search_marmiton_recipes(query)
         logger.info(f"Fallback Marmiton: {len(fallback)} recettes trouvées pour '{query}'")
+        _cache_put(cache_key, fallback)
         return fallback
     except Exception as e:
         logger.warning(f"Erreur fallback Marmiton: {e}")
@@ -980,7 +1114,7 @@ async def get_random_recipes(count: int = 5, target_servings: int = 4) -> list[d
                 if len(recipes) >= safe_count:
                     break
 
-                resp = await client.get(MEALDB_RANDOM)
+                resp = await upstream_get(client, "themealdb", MEALDB_RANDOM)
                 if resp.status_code != 200:
                     continue
 
@@ -1045,6 +1179,210 @@ async def enrich_recipe_images_with_marmiton(recipes: list[dict], max_to_enrich:
     return recipes
 
 
+# Qualificatifs parfois placés dans la mesure TheMealDB ("2 chopped") : plus longs d'abord
+_MEASURE_PREP_TERMS = sorted([
+    "finely chopped", "roughly chopped", "finely sliced", "thinly sliced",
+    "chopped", "minced", "diced", "sliced", "crushed", "grated", "ground",
+    "large", "medium", "small",
+    "finely", "roughly", "thinly"
+], key=len, reverse=True)
+_MEASURE_PREP_RE = {t: re.compile(rf"\b{re.escape(t)}\b") for t in _MEASURE_PREP_TERMS}
+_MEASURE_PREP_STRIP_RE = {t: re.compile(rf"\b{re.escape(t)}\b", re.IGNORECASE) for t in _MEASURE_PREP_TERMS}
+_MEASURE_PREP_ANY_RE = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in _MEASURE_PREP_TERMS) + r")\b")
+
+_SPOON_RE = re.compile(r"c\.\s*à\s*(café|soupe)")
+_UNIT_WORD_RE = re.compile(r"[a-zA-ZÀ-ÿ\.]+")
+_DE_UNIT_TOKENS = frozenset({
+    "tasse", "tasses", "quart", "quarts", "once", "onces", "livre", "livres",
+    "pincée", "pincées", "trait", "traits", "gousse", "gousses",
+    "g", "kg", "ml", "cl", "l", "mL", "cL", "L"
+})
+_VOWELS_FR = ("a", "e", "i", "o", "u", "y", "h", "à", "â", "é", "è", "ê", "ë", "î", "ï", "ô", "ù", "û", "ü")
+
+# Participes accordés avec la mesure : radical -> (m. sing., f. sing., m. plur., f. plur.)
+_PREP_STEMS_FR = {
+    "éminc": ("émincé", "émincée", "émincés", "émincées"),
+    "hach": ("haché", "hachée", "hachés", "hachées"),
+    "tranch": ("tranché", "tranchée", "tranchés", "tranchées"),
+    "râp": ("râpé", "râpée", "râpés", "râpées"),
+    "écras": ("écrasé", "écrasée", "écrasés", "écrasées"),
+}
+_PREP_STEM_RE = {
+    stem: (re.compile(rf" ({re.escape(stem)})(é|ée|és|ées)$"),
+           re.compile(rf" ({re.escape(stem)})(é|ée|és|ées)$", re.IGNORECASE))
+    for stem in _PREP_STEMS_FR
+}
+
+_DE_DE_RE = re.compile(r"\bde\s+de\b")
+_D_D_RE = re.compile(r"\bd'\s+d'")
+_DE_D_RE = re.compile(r"\bde\s+d'")
+_LEADING_QTY_RE = re.compile(r"^([\d.,/\s]+)")
+_SINGULAR_IRREGULAR = {
+    "oeufs": "oeuf",
+    "œufs": "œuf",
+    "oignons": "oignon",
+    "carottes": "carotte",
+    "tomates": "tomate",
+    "pommes": "pomme",
+    "gousses": "gousse",
+}
+_SINGULAR_INVARIANTS = frozenset({"couscous", "maïs", "pois", "radis", "anis"})
+
+
+def _needs_de_prefix(measure_fr: str) -> bool:
+    m = (measure_fr or "").lower()
+    if not m:
+        return False
+    # Détecter la présence d'une unité réelle (et éviter les faux positifs comme la lettre "l" dans "finely").
+    if _SPOON_RE.search(m):
+        return True
+    return any(w in _DE_UNIT_TOKENS for w in _UNIT_WORD_RE.findall(m))
+
+
+def _add_de_prefix(name_fr: str) -> str:
+    n = (name_fr or "").strip()
+    if not n:
+        return n
+    nl = n.lower()
+    if nl.startswith("de ") or nl.startswith("d'"):
+        return n
+    return f"d'{n}" if nl.startswith(_VOWELS_FR) else f"de {n}"
+
+
+def _agree_prep_with_measure(name_fr: str, measure_fr: str) -> str:
+    n = (name_fr or "").strip()
+    m = (measure_fr or "").lower()
+    if not n:
+        return n
+
+    words = n.split()
+    if not words:
+        return n
+
+    idx = 0
+    if words[0].lower() in {"de", "d'"} and len(words) > 1:
+        idx = 1
+
+    noun = words[idx].lower()
+    is_plural = noun.endswith("s")
+    is_feminine = noun.endswith("e") or noun.endswith("es")
+
+    # Fallback par la mesure (utile quand le nom commence par d'...)
+    if any(token in m for token in ["gousses", "tasses", "onces", "livres", "pincées"]):
+        is_feminine = True
+        is_plural = True
+    elif any(token in m for token in ["gousse", "tasse", "once", "livre", "pincée"]):
+        is_feminine = True
+        is_plural = False
+
+    if is_feminine and is_plural:
+        form_idx = 3
+    elif is_feminine:
+        form_idx = 1
+    elif is_plural:
+        form_idx = 2
+    else:
+        form_idx = 0
+
+    lower_name = n.lower()
+    for stem, forms in _PREP_STEMS_FR.items():
+        search_re, replace_re = _PREP_STEM_RE[stem]
+        if search_re.search(lower_name):
+            return replace_re.sub(f" {forms[form_idx]}", n)
+    return n
+
+
+def _naturalize_french_ingredient(name_fr: str) -> str:
+    n = (name_fr or "").strip()
+    if not n:
+        return n
+
+    n = _SPACES_RE.sub(" ", n)
+    n = _D_APOSTROPHE_RE.sub("d'", n)
+    n = _DE_DE_RE.sub("de", n)
+    n = _D_D_RE.sub("d'", n)
+    n = _DE_D_RE.sub("d'", n)
+    return n.strip(" ,.-")
+
+
+def _maybe_singularize_by_quantity(name_fr: str, measure_fr: str) -> str:
+    n = (name_fr or "").strip()
+    m = (measure_fr or "").strip().lower()
+    if not n or not m:
+        return n
+
+    qty_match = _LEADING_QTY_RE.match(m)
+    if not qty_match:
+        return n
+
+    qty = parse_amount(qty_match.group(1))
+    if qty is None or abs(qty - 1.0) > 0.0001:
+        return n
+
+    # Isoler le noyau nominal (avant éventuel qualificatif final)
+    words = n.split()
+    if not words:
+        return n
+
+    idx = 0
+    if words[0].lower() in {"de", "d'"} and len(words) > 1:
+        idx = 1
+
+    first = words[idx]
+    lower_first = first.lower()
+
+    if lower_first in _SINGULAR_INVARIANTS:
+        return n
+
+    if lower_first in _SINGULAR_IRREGULAR:
+        words[idx] = _SINGULAR_IRREGULAR[lower_first]
+        return " ".join(words)
+
+    if lower_first.endswith("s") and len(lower_first) > 3:
+        words[idx] = first[:-1]
+        return " ".join(words)
+
+    return n
+
+
+@lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
+def _normalize_mealdb_ingredient(ing_en: str, measure_en: str, ratio: float) -> tuple[str, str]:
+    """Une ligne d'ingrédient TheMealDB -> (nom FR, mesure FR adaptée au ratio)."""
+    ing_work = ing_en
+    measure_work = measure_en
+
+    # Certains flux TheMealDB mettent "chopped/minced/..." dans la mesure.
+    # On le déplace vers l'ingrédient pour obtenir "oignons hachés" au lieu de "2 haché oignons".
+    measure_lower = measure_work.lower()
+    if _MEASURE_PREP_ANY_RE.search(measure_lower):
+        for prep in _MEASURE_PREP_TERMS:
+            if _MEASURE_PREP_RE[prep].search(measure_lower):
+                if prep not in ing_work.lower():
+                    ing_work = f"{prep} {ing_work}".strip()
+                measure_work = _MEASURE_PREP_STRIP_RE[prep].sub("", measure_work)
+                measure_work = _SPACES_RE.sub(" ", measure_work).strip(" ,.-")
+                measure_lower = measure_work.lower()
+
+    ing_fr = _translate_ingredient_name(ing_work)
+    measure_fr = _adapt_and_translate_measure(measure_work, ratio)
+
+    # Pour un rendu FR naturel: "2 c. à soupe de beurre", "4 quarts de bouillon"
+    if _needs_de_prefix(measure_fr):
+        ing_fr = _add_de_prefix(ing_fr)
+
+    ing_fr = _maybe_singularize_by_quantity(ing_fr, measure_fr)
+    ing_fr = _agree_prep_with_measure(ing_fr, measure_fr)
+    ing_fr = _naturalize_french_ingredient(ing_fr)
+    return ing_fr, measure_fr
+
+
+def clear_translation_caches() -> None:
+    """Vide les résultats mémorisés du traducteur (tests, benchmark)."""
+    for cached in (_translate_ingredient_name, _translate_measure, _adapt_and_translate_measure,
+                   _normalize_mealdb_ingredient):
+        cached.cache_clear()
+
+
 def _normalize_mealdb(meal: dict, target_servings: int = 4) -> dict:
     """Normalise une recette TheMealDB avec traduction et adaptation des quantités.
     
@@ -1059,170 +1397,6 @@ def _normalize_mealdb(meal: dict, target_servings: int = 4) -> dict:
     # Extraire et traduire les ingrédients avec adaptation des quantités
     ingredients = []
     all_ingredients_lower = []
-    
-    import re
-
-    prep_terms = sorted([
-        "finely chopped", "roughly chopped", "finely sliced", "thinly sliced",
-        "chopped", "minced", "diced", "sliced", "crushed", "grated", "ground",
-        "large", "medium", "small",
-        "finely", "roughly", "thinly"
-    ], key=len, reverse=True)
-
-    def _needs_de_prefix(measure_fr: str) -> bool:
-        import re
-        m = (measure_fr or "").lower()
-        if not m:
-            return False
-        # Détecter la présence d'une unité réelle (et éviter les faux positifs comme la lettre "l" dans "finely").
-        if re.search(r"c\.\s*à\s*(café|soupe)", m):
-            return True
-        unit_tokens = {
-            "tasse", "tasses", "quart", "quarts", "once", "onces", "livre", "livres",
-            "pincée", "pincées", "trait", "traits", "gousse", "gousses",
-            "g", "kg", "ml", "cl", "l", "mL", "cL", "L"
-        }
-        words = re.findall(r"[a-zA-ZÀ-ÿ\.]+", m)
-        return any(w in unit_tokens for w in words)
-
-    def _add_de_prefix(name_fr: str) -> str:
-        n = (name_fr or "").strip()
-        if not n:
-            return n
-        nl = n.lower()
-        if nl.startswith("de ") or nl.startswith("d'"):
-            return n
-        vowels = ("a", "e", "i", "o", "u", "y", "h", "à", "â", "é", "è", "ê", "ë", "î", "ï", "ô", "ù", "û", "ü")
-        return f"d'{n}" if nl.startswith(vowels) else f"de {n}"
-
-    def _agree_prep_with_measure(name_fr: str, measure_fr: str) -> str:
-        n = (name_fr or "").strip()
-        m = (measure_fr or "").lower()
-        if not n:
-            return n
-
-        words = n.split()
-        if not words:
-            return n
-
-        idx = 0
-        if words[0].lower() in {"de", "d'"} and len(words) > 1:
-            idx = 1
-
-        noun = words[idx].lower()
-        is_plural = noun.endswith("s")
-        is_feminine = noun.endswith("e") or noun.endswith("es")
-
-        # Fallback par la mesure (utile quand le nom commence par d'...)
-        if any(token in m for token in ["gousses", "tasses", "onces", "livres", "pincées"]):
-            is_feminine = True
-            is_plural = True
-        elif any(token in m for token in ["gousse", "tasse", "once", "livre", "pincée"]):
-            is_feminine = True
-            is_plural = False
-
-        lower_name = n.lower()
-        stems = {
-            "éminc": ("émincé", "émincée", "émincés", "émincées"),
-            "hach": ("haché", "hachée", "hachés", "hachées"),
-            "tranch": ("tranché", "tranchée", "tranchés", "tranchées"),
-            "râp": ("râpé", "râpée", "râpés", "râpées"),
-            "écras": ("écrasé", "écrasée", "écrasés", "écrasées"),
-        }
-
-        if is_feminine and is_plural:
-            form_idx = 3
-        elif is_feminine:
-            form_idx = 1
-        elif is_plural:
-            form_idx = 2
-        else:
-            form_idx = 0
-
-        import re
-        for stem, forms in stems.items():
-            pattern = rf" ({re.escape(stem)})(é|ée|és|ées)$"
-            if re.search(pattern, lower_name):
-                target = forms[form_idx]
-                return re.sub(pattern, f" {target}", n, flags=re.IGNORECASE)
-        return n
-
-    def _naturalize_french_ingredient(name_fr: str) -> str:
-        import re
-        n = (name_fr or "").strip()
-        if not n:
-            return n
-
-        n = re.sub(r"\s+", " ", n)
-        n = re.sub(r"\bd\'\s+", "d'", n)
-        n = re.sub(r"\bde\s+de\b", "de", n)
-        n = re.sub(r"\bd'\s+d'", "d'", n)
-        n = re.sub(r"\bde\s+d'", "d'", n)
-        return n.strip(" ,.-")
-
-    def _maybe_singularize_by_quantity(name_fr: str, measure_fr: str) -> str:
-        import re
-        from fractions import Fraction
-
-        n = (name_fr or "").strip()
-        m = (measure_fr or "").strip().lower()
-        if not n or not m:
-            return n
-
-        qty_match = re.match(r"^([\d.,/\s]+)", m)
-        if not qty_match:
-            return n
-
-        qty_raw = qty_match.group(1).strip()
-        try:
-            if ' ' in qty_raw and '/' in qty_raw:
-                main, frac = qty_raw.split(' ', 1)
-                qty = float(main) + float(Fraction(frac))
-            elif '/' in qty_raw:
-                qty = float(Fraction(qty_raw))
-            else:
-                qty = float(qty_raw.replace(',', '.'))
-        except Exception:
-            return n
-
-        if abs(qty - 1.0) > 0.0001:
-            return n
-
-        # Isoler le noyau nominal (avant éventuel qualificatif final)
-        words = n.split()
-        if not words:
-            return n
-
-        idx = 0
-        if words[0].lower() in {"de", "d'"} and len(words) > 1:
-            idx = 1
-
-        first = words[idx]
-        lower_first = first.lower()
-
-        irregular = {
-            "oeufs": "oeuf",
-            "œufs": "œuf",
-            "oignons": "oignon",
-            "carottes": "carotte",
-            "tomates": "tomate",
-            "pommes": "pomme",
-            "gousses": "gousse",
-        }
-        invariants = {"couscous", "maïs", "pois", "radis", "anis"}
-
-        if lower_first in invariants:
-            return n
-
-        if lower_first in irregular:
-            words[idx] = irregular[lower_first]
-            return " ".join(words)
-
-        if lower_first.endswith("s") and len(lower_first) > 3:
-            words[idx] = first[:-1]
-            return " ".join(words)
-
-        return n
 
     for i in range(1, 21):
         ing_en = (meal.get(f"strIngredient{i}") or "").strip()
@@ -1230,35 +1404,8 @@ def _normalize_mealdb(meal: dict, target_servings: int = 4) -> dict:
         
         if not ing_en:
             continue
-        
-        ing_work = ing_en
-        measure_work = measure_en
-
-        # Certains flux TheMealDB mettent "chopped/minced/..." dans la mesure.
-        # On le déplace vers l'ingrédient pour obtenir "oignons hachés" au lieu de "2 haché oignons".
-        measure_lower = measure_work.lower()
-        for prep in prep_terms:
-            if re.search(rf"\b{re.escape(prep)}\b", measure_lower):
-                if prep not in ing_work.lower():
-                    ing_work = f"{prep} {ing_work}".strip()
-                measure_work = re.sub(rf"\b{re.escape(prep)}\b", "", measure_work, flags=re.IGNORECASE)
-                measure_work = re.sub(r"\s+", " ", measure_work).strip(" ,.-")
-                measure_lower = measure_work.lower()
-
-        # Traduire le nom de l'ingrédient
-        ing_fr = _translate_ingredient_name(ing_work)
-        
-        # Adapter et traduire la mesure
-        measure_fr = _adapt_and_translate_measure(measure_work, ratio)
-        
-        # Pour un rendu FR naturel: "2 c. à soupe de beurre", "4 quarts de bouillon"
-        if _needs_de_prefix(measure_fr):
-            ing_fr = _add_de_prefix(ing_fr)
-
-        ing_fr = _maybe_singularize_by_quantity(ing_fr, measure_fr)
-        ing_fr = _agree_prep_with_measure(ing_fr, measure_fr)
-        ing_fr = _naturalize_french_ingredient(ing_fr)
 
+        ing_fr, measure_fr = _normalize_mealdb_ingredient(ing_en, measure_en, ratio)
         ingredients.append({"name": ing_fr, "measure": measure_fr})
         all_ingredients_lower.append(ing_en.lower())
     
@@ -1274,7 +1421,7 @@ def _normalize_mealdb(meal: dict, target_servings: int = 4) -> dict:
     
     return {
         "title": meal.get("strMeal", ""),
-        "ingredients_json": json.dumps(ingredients),
+        "ingredients_json": json.dumps(annotate_ingredients(ingredients)),
         "instructions": meal.get("strInstructions", ""),
         "prep_time": 30,
         "cook_time": 30,
@@ -1283,19 +1430,71 @@ def _normalize_mealdb(meal: dict, target_servings: int = 4) -> dict:
         "image_url": meal.get("strMealThumb", ""),
         "tags_json": json.dumps(tags),
         "diet_tags_json": json.dumps(diet_tags),
+        "ingredient_tokens_json": ingredient_tokens.ingredient_tokens_json(ingredients),
     }
 
 
-def compute_match_score(recipe_ingredients_json: str, fridge_items: list[dict]) -> tuple[float, list[str]]:
+def _recipe_tokens(ingredients: list, recipe_tokens_json: Optional[str]) -> list:
+    """Jetons stockés de la recette, recalculés s'ils manquent ou ne correspondent pas."""
+    tokens = ingredient_tokens.load_tokens(recipe_tokens_json, expected=len(ingredients))
+    if tokens is None:
+        tokens = json.loads(ingredient_tokens.ingredient_tokens_json(ingredients))
+    return tokens
+
+
+def _score_ingredients(ingredients: list, tokens: list, fridge_index: tuple[frozenset, frozenset],
+                       weights: Optional[dict] = None, max_weight: float = 0.0,
+                       floor: Optional[float] = None,
+                       min_score: float = 0.0) -> Optional[tuple[float, list[str], float]]:
+    """
+    Score d'une recette à partir des jetons : (score, manquants, bonus).
+    Le bonus somme, sur les ingrédients trouvés, le poids de leur meilleur
+    jeton (`weights` : DLC proche, saison) ; sans poids il vaut 0.
+    Abandonne (None) dès que le score ne peut plus atteindre `min_score`,
+    ou que score + bonus ne peut plus dépasser `floor` (k-ième du classement).
+    """
+    fridge_words, fridge_names = fridge_index
+    total = len(ingredients)
+    matched = 0
+    bonus = 0.0
+    missing = []
+    for position, (ing, ing_tokens) in enumerate(zip(ingredients, tokens)):
+        # Présent au frigo, ou ingrédient de base (eau, sel, poivre, huile)
+        if (tuple(ing_tokens) in fridge_names
+                or any(t in fridge_words for t in ing_tokens)
+                or ingredient_tokens.is_basic(ing_tokens)):
+            matched += 1
+            if weights:
+                best_weight = 0.0
+                for t in ing_tokens:
+                    weight = weights.get(t)
+                    if weight is not None and weight > best_weight:
+                        best_weight = weight
+                bonus += best_weight
+        else:
+            name = ing.get("name") if isinstance(ing, dict) else ing
+            missing.append(name or "")
+            remaining = total - position - 1
+            best = round((matched + remaining) / total * 100, 1)
+            if best < min_score:
+                return None
+            if floor is not None and best + bonus + remaining * max_weight <= floor:
+                return None
+    return (round((matched / total) * 100, 1), missing, bonus)
+
+
+def compute_match_score(recipe_ingredients_json: str, fridge_items: list[dict],
+                        recipe_tokens_json: Optional[str] = None,
+                        fridge_tokens: Optional[tuple[frozenset, frozenset]] = None) -> tuple[float, list[str]]:
     """
     Calcule le score de correspondance entre une recette et le contenu du frigo.
     Retourne (score 0-100, liste des ingrédients manquants).
-    
-    Utilise une logique de matching améliorée pour éviter les faux positifs
-    tout en gérant les variantes (pluriel, adjectifs, etc.).
+
+    Compare les jetons canoniques (ingredient_tokens) calculés à l'écriture :
+    un ingrédient est présent si son nom canonique est celui d'un produit du
+    frigo ou s'ils partagent un mot significatif. `fridge_tokens` (calculé une
+    fois par l'appelant) évite de reparcourir le frigo pour chaque recette.
     """
-    import re
-    
     try:
         ingredients = json.loads(recipe_ingredients_json)
     except Exception:
@@ -1304,89 +1503,98 @@ def compute_match_score(recipe_ingredients_json: str, fridge_items: list[dict])
     if not ingredients:
         return (0.0, [])
 
-    fridge_items_lower = []
-    for item in fridge_items:
-        name = (item.get("name") or "").lower().strip()
-        fridge_items_lower.append(name)
+    score, missing, _ = _score_ingredients(
+        ingredients, _recipe_tokens(ingredients, recipe_tokens_json),
+        fridge_tokens or ingredient_tokens.fridge_tokens(fridge_items),
+    )
+    return (score, missing)
 
-    def _normalize_word(word: str) -> str:
-        """Normalise un mot (enlève adjectifs, gère pluriel)."""
-        import re
-        
-        # Adjectifs / épithètes culinaires français courants à enlever
-        culinary_adjectives = [
-            'frais', 'fraîche', 'fraîches', 'séché', 'séchée', 'séchés', 'séchées',
-            'entier', 'entière', 'entiers', 'entières', 'moulu', 'moulue', 'moulus', 'moulues',
-            'haché', 'hachée', 'hachés', 'hachées', 'tranché', 'tranchée', 'tranchés', 'tranchées',
-            'concassé', 'concassée', 'concassés', 'concassées',  # pour tomates concassées
-            'rôti', 'rôtie', 'grillé', 'grillée', 'cuit', 'cuite',
-            'gros', 'petit', 'petite', 'épais', 'épaisse',
-            'blanc', 'blanche', 'noir', 'noire', 'rouge', 'jaune', 'vert', 'verte',
-        ]
-        
-        cleaned = word
-        # Enlever les adjectifs courants
-        for adj in culinary_adjectives:
-            cleaned = re.sub(rf'\b{adj}(e|s|es)?\b', '', cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        
-        # Gérer le pluriel: enlever 's' final si c'est un pluriel
-        if cleaned.endswith('s') and len(cleaned) > 2 and not cleaned.endswith(('ss', 'us', 'is')):
-            # Vérifier que ce n'est pas un mot qui se termine naturellement en 's'
-            singular = cleaned[:-1]
-            # Accepter les variantes singulier/pluriel courantes
-            if singular.endswith(('e', 'l', 'r', 'n', 't')):
-                return singular
-        
-        return cleaned
 
+# Préférences de classement : points ajoutés au score par ingrédient trouvé
+DLC_URGENCY_WEIGHTS = ((1, 15.0), (3, 10.0), (7, 5.0))  # (jours restants au plus, points)
+SEASONAL_WEIGHT = 5.0
 
-    def _match_ingredient(ing_name: str, fridge_list: list) -> bool:
-        """Teste si un ingrédient correspond à quelque chose du frigo."""
-        ing_clean = _normalize_word(ing_name)
-        
-        # Test 1 : correspondance directe après nettoyage
-        for fridge_item in fridge_list:
-            fridge_clean = _normalize_word(fridge_item)
-            if ing_clean == fridge_clean:
-                return True
-            
-            # Test 2 : un des mots de frigo est dans l'ingrédient de recette
-            # Mais comme mot entier (pour éviter "ail" dans "détail")
-            for fridge_word in fridge_clean.split():
-                if len(fridge_word) > 2:
-                    # Chercher le mot complet comme mot entier
-                    if re.search(rf'\b{re.escape(fridge_word)}\b', ing_clean, flags=re.IGNORECASE):
-                        return True
-            
-            # Test 3 : un des mots de recette est dans le frigo
-            for ing_word in ing_clean.split():
-                if len(ing_word) > 2:
-                    if re.search(rf'\b{re.escape(ing_word)}\b', fridge_clean, flags=re.IGNORECASE):
-                        return True
-        
-        return False
 
-    matched = 0
-    missing = []
-    for ing in ingredients:
-        ing_name = (ing.get("name") or "").lower().strip()
-        
-        # Vérifier si ça correspond au frigo
-        if _match_ingredient(ing_name, fridge_items_lower):
-            matched += 1
-        else:
-            # On ignore les ingrédients basiques (eau, sel, poivre, huile)
-            basic = ["water", "salt", "pepper", "oil", "eau", "sel", "poivre", "huile"]
-            if any(re.search(rf'\b{b}\b', ing_name, flags=re.IGNORECASE) for b in basic):
-                matched += 1
-            else:
-                missing.append(ing.get("name", ing_name))
+def dlc_urgency_weight(days_left: Optional[int]) -> float:
+    """Poids d'un produit selon sa DLC (0 sans DLC, au-delà d'une semaine ou périmé)."""
+    if days_left is None or days_left < 0:
+        return 0.0
+    for max_days, weight in DLC_URGENCY_WEIGHTS:
+        if days_left <= max_days:
+            return weight
+    return 0.0
 
-    total = len(ingredients)
-    score = round((matched / total) * 100, 1) if total > 0 else 0
-    return (score, missing)
 
+def preference_weights(fridge_items: list[dict], prefer_dlc: bool, prefer_seasonal: bool,
+                       month: Optional[int] = None) -> dict[str, float]:
+    """
+    Poids par jeton canonique, calculés une fois par requête : urgence DLC
+    des produits du frigo (dlc_days_left de la vue fridge_items_dlc) et
+    produits de saison du mois.
+    """
+    weights: dict[str, float] = {}
+    if prefer_dlc:
+        for item in fridge_items:
+            weight = dlc_urgency_weight(item.get("dlc_days_left"))
+            if not weight:
+                continue
+            tokens = ingredient_tokens.load_tokens(item.get("name_tokens"))
+            for t in tokens if tokens is not None else ingredient_tokens.canonical_tokens(item.get("name")):
+                if weight > weights.get(t, 0.0):
+                    weights[t] = weight
+    if prefer_seasonal:
+        for t in seasonal_service.seasonal_tokens(month or datetime.now().month):
+            weights[t] = weights.get(t, 0.0) + SEASONAL_WEIGHT
+    return weights
+
+
+def rank_recipes(recipes: list[dict], fridge_items: list[dict], k: int, min_score: float = 0.0,
+                 weights: Optional[dict[str, float]] = None) -> list[dict]:
+    """
+    Les k meilleures recettes (à égalité, l'ordre d'arrivée), avec
+    match_score et missing_ingredients renseignés.
+    Avec `weights` (preference_weights), le classement suit
+    weighted_score = match_score + bonus ; min_score porte toujours sur match_score.
+    Tas borné à k éléments : une recette est abandonnée dès que ses
+    ingrédients restants ne peuvent plus dépasser le k-ième score courant.
+    Les recettes bannies / hors régime doivent être retirées avant l'appel.
+    """
+    if k <= 0:
+        return []
+    fridge_index = ingredient_tokens.fridge_tokens(fridge_items)
+    max_weight = max(weights.values(), default=0.0) if weights else 0.0
+    heap: list[tuple[float, int, dict]] = []  # (clé de classement, -rang, recette) : le pire en tête
+    for rank, recipe in enumerate(recipes):
+        try:
+            ingredients = json.loads(recipe.get("ingredients_json") or "[]")
+        except Exception:
+            ingredients = []
+        if not ingredients:
+            scored = (0.0, [], 0.0)
+        else:
+            # À égalité, une recette plus tardive perd : il faut faire strictement mieux
+            scored = _score_ingredients(
+                ingredients, _recipe_tokens(ingredients, recipe.get("ingredient_tokens_json")),
+                fridge_index, weights, max_weight,
+                floor=heap[0][0] if len(heap) >= k else None, min_score=min_score,
+            )
+            if scored is None:
+                continue
+        score, missing, bonus = scored
+        if score < min_score:
+            continue
+        entry = (score + bonus, -rank, recipe)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+        else:
+            continue
+        recipe["match_score"] = score
+        recipe["missing_ingredients"] = missing
+        if weights is not None:
+            recipe["weighted_score"] = round(score + bonus, 1)
+    return [entry[2] for entry in sorted(heap, key=lambda e: (-e[0], -e[1]))]
 
 
 def _expand_custom_exclusions(custom_exclusions: list[str]) -> list[str]:
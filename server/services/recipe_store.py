@@ -0,0 +1,136 @@
+"""
+FrigoScan — Magasin de recettes adressées par contenu.
+Chaque recette, quelle que soit sa source (recettes sauvegardées, TheMealDB,
+Marmiton, réserve, fichier local), reçoit une clé dérivée de son contenu
+(SHA-256 du JSON canonique des champs de contenu) : la même recette garde la
+même clé d'un appel à l'autre. Les listes (suggestions, recherche,
+catégories) ne renvoient qu'un résumé par recette ; la fiche complète est
+gardée ici (table recipe_store, durée de vie RECIPE_STORE_TTL) et servie par
+GET /api/recipes/by-key/{key}. Bannir, sauvegarder se font par clé.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+from server.database import get_db, dict_from_row
+
+logger = logging.getLogger("frigoscan.recipe_store")
+
+RECIPE_STORE_TTL = 7 * 24 * 3600  # secondes ; prolongée à chaque apparition dans une liste
+KEY_LENGTH = 24                   # caractères hexadécimaux (96 bits)
+
+# Champs qui définissent la recette (la clé en dépend)
+CONTENT_FIELDS = (
+    "title", "ingredients_json", "instructions", "prep_time", "cook_time", "servings",
+    "source_url", "image_url", "tags_json", "diet_tags_json",
+)
+# Champs calculés pour une requête (score...) : ni dans la clé, ni dans le magasin
+REQUEST_FIELDS = ("match_score", "weighted_score", "missing_ingredients", "recipe_key")
+# Résumé renvoyé par les listes
+SUMMARY_FIELDS = (
+    "key", "id", "title", "image_url", "prep_time", "cook_time", "servings",
+    "match_score", "weighted_score", "missing_ingredients",
+)
+
+
+def recipe_key(recipe: dict) -> str:
+    """Clé de contenu d'une recette."""
+    content = {field: recipe.get(field) for field in CONTENT_FIELDS}
+    raw = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:KEY_LENGTH]
+
+
+def store_recipes(recipes: list[dict], db=None) -> list[dict]:
+    """
+    Enregistre les recettes (ou prolonge leur durée de vie) ; renvoie des
+    copies avec leur clé ("key").
+    """
+    keyed: list[dict] = []
+    records: dict[str, str] = {}
+    for recipe in recipes:
+        key = recipe_key(recipe)
+        item = dict(recipe, key=key)
+        keyed.append(item)
+        if key not in records:
+            records[key] = json.dumps(
+                {k: v for k, v in item.items() if k not in REQUEST_FIELDS}, ensure_ascii=False
+            )
+    if not records:
+        return keyed
+    own_db = db is None
+    if own_db:
+        db = get_db()
+    try:
+        now = time.time()
+        db.executemany(
+            """INSERT INTO recipe_store (key, recipe_json, stored_at) VALUES (?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET stored_at = excluded.stored_at""",
+            [(key, record, now) for key, record in records.items()]
+        )
+        db.commit()
+    finally:
+        if own_db:
+            db.close()
+    return keyed
+
+
+def summarize(recipes: list[dict]) -> list[dict]:
+    """Résumés de recettes déjà clés (cartes de la liste)."""
+    return [{field: recipe[field] for field in SUMMARY_FIELDS if field in recipe} for recipe in recipes]
+
+
+def publish(recipes: list[dict], summary: bool = True) -> list[dict]:
+    """Recettes d'une réponse de liste : clés + magasin, puis résumés (ou fiches complètes)."""
+    keyed = store_recipes(recipes)
+    return summarize(keyed) if summary else keyed
+
+
+def ensure_recipe_keys(db) -> int:
+    """Clé des recettes sauvegardées d'avant le magasin de recettes (migration, init_db)."""
+    rows = db.execute("SELECT * FROM recipes WHERE recipe_key IS NULL").fetchall()
+    if rows:
+        db.executemany("UPDATE recipes SET recipe_key = ? WHERE id = ?",
+                       [(recipe_key(dict(row)), row["id"]) for row in rows])
+        db.commit()
+    return len(rows)
+
+
+def get_recipe(key: str, db=None) -> Optional[dict]:
+    """
+    Fiche complète : magasin (non expirée), sinon recettes sauvegardées
+    (clé écrite à chaque insertion) ; None si inconnue.
+    """
+    own_db = db is None
+    if own_db:
+        db = get_db()
+    try:
+        row = db.execute(
+            "SELECT recipe_json FROM recipe_store WHERE key = ? AND stored_at >= ?",
+            (key, time.time() - RECIPE_STORE_TTL)
+        ).fetchone()
+        if row:
+            return json.loads(row["recipe_json"])
+        saved = dict_from_row(db.execute("SELECT * FROM recipes WHERE recipe_key = ?", (key,)).fetchone())
+        if saved:
+            saved.pop("recipe_key", None)
+            saved["key"] = key
+        return saved
+    finally:
+        if own_db:
+            db.close()
+
+
+def prune_recipe_store(ttl: int = RECIPE_STORE_TTL) -> int:
+    """Supprime les fiches expirées ; retourne le nombre de lignes supprimées."""
+    db = get_db()
+    try:
+        cursor = db.execute("DELETE FROM recipe_store WHERE stored_at < ?", (time.time() - ttl,))
+        db.commit()
+        if cursor.rowcount:
+            logger.info(f"Magasin de recettes : {cursor.rowcount} fiche(s) expirée(s) supprimée(s)")
+        return cursor.rowcount
+    finally:
+        db.close()
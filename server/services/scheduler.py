@@ -0,0 +1,391 @@
+"""
+FrigoScan — Planificateur de tâches de fond.
+Tâches asyncio adossées à une table persistante (background_jobs) :
+pré-chargement des recherches de recettes pour les produits ajoutés au frigo,
+préchauffage des catégories, renouvellement de la réserve de recettes aléatoires
+et sauvegarde quotidienne de la base.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from server.database import get_db, rows_to_list, backup_db, get_backup_stats
+from .recipe_service import (
+    search_recipes_online, get_recipes_by_category, get_cache_stats, get_stage_timings,
+    RECIPE_CATEGORIES_FR,
+)
+from .recipe_reservoir import top_up_reservoir, get_reservoir_stats
+from .mealdb_mirror import sync_mealdb_mirror, mirror_size
+from .change_feed import prune_change_log
+from .recipe_store import prune_recipe_store
+
+logger = logging.getLogger("frigoscan.scheduler")
+
+POLL_INTERVAL = 5.0  # secondes entre deux passages de la boucle
+MAX_ATTEMPTS = 3
+KEEP_FINISHED_JOBS = 200
+
+# Tâches périodiques : type -> intervalle minimal entre deux exécutions
+PERIODIC_JOBS = {
+    "warm_categories": timedelta(hours=6),
+    "refresh_random": timedelta(hours=1),
+    "sync_mealdb": timedelta(days=1),
+    "backup_db": timedelta(days=1),
+    "prune_change_log": timedelta(hours=6),
+    "prune_recipe_store": timedelta(hours=6),
+}
+
+
+# ---------------------------------------------------------------------------
+# Configuration (table settings)
+# ---------------------------------------------------------------------------
+
+def _read_settings(db) -> dict:
+    rows = db.execute(
+        "SELECT key, value FROM settings WHERE key IN "
+        "('scheduler_enabled', 'scheduler_concurrency', 'scheduler_quiet_hours', 'nb_persons')"
+    ).fetchall()
+    values = {r["key"]: r["value"] for r in rows}
+    try:
+        concurrency = max(1, min(int(values.get("scheduler_concurrency", "2")), 8))
+    except ValueError:
+        concurrency = 2
+    try:
+        servings = int(values.get("nb_persons", "4"))
+    except ValueError:
+        servings = 4
+    return {
+        "enabled": values.get("scheduler_enabled", "true").lower() == "true",
+        "concurrency": concurrency,
+        "quiet_hours": values.get("scheduler_quiet_hours", ""),
+        "target_servings": servings,
+    }
+
+
+def parse_quiet_hours(value: str) -> Optional[tuple[int, int]]:
+    """Parse une plage 'HH-HH' (ex: '23-7'). Retourne None si vide ou invalide."""
+    value = (value or "").strip()
+    if not value or "-" not in value:
+        return None
+    try:
+        start, end = (int(part) for part in value.split("-", 1))
+    except ValueError:
+        return None
+    if not (0 <= start <= 23 and 0 <= end <= 23) or start == end:
+        return None
+    return start, end
+
+
+def is_quiet_time(quiet_hours: str, now: Optional[datetime] = None) -> bool:
+    """Indique si l'heure courante tombe dans les heures creuses configurées."""
+    bounds = parse_quiet_hours(quiet_hours)
+    if bounds is None:
+        return False
+    hour = (now or datetime.now()).hour
+    start, end = bounds
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end  # plage à cheval sur minuit
+
+
+# ---------------------------------------------------------------------------
+# File de tâches persistante
+# ---------------------------------------------------------------------------
+
+def enqueue_job(job_type: str, payload: dict | None = None, db=None) -> Optional[int]:
+    """
+    Ajoute une tâche en attente. Si une tâche identique est déjà en attente,
+    elle n'est pas dupliquée. Avec `db`, l'insertion rejoint la transaction
+    de l'appelant (pas de commit ici).
+    """
+    payload_json = json.dumps(payload or {}, ensure_ascii=False, sort_keys=True)
+    own_db = db is None
+    if own_db:
+        db = get_db()
+    try:
+        existing = db.execute(
+            "SELECT id FROM background_jobs WHERE job_type = ? AND payload_json = ? AND status = 'pending'",
+            (job_type, payload_json)
+        ).fetchone()
+        if existing:
+            return existing["id"]
+        cursor = db.execute(
+            "INSERT INTO background_jobs (job_type, payload_json) VALUES (?, ?)",
+            (job_type, payload_json)
+        )
+        if own_db:
+            db.commit()
+        return cursor.lastrowid
+    finally:
+        if own_db:
+            db.close()
+
+
+def _claim_next_job(db) -> Optional[dict]:
+    """Passe la plus ancienne tâche en attente à l'état 'running'."""
+    row = db.execute(
+        """UPDATE background_jobs
+           SET status = 'running', started_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+           WHERE id = (SELECT id FROM background_jobs WHERE status = 'pending' ORDER BY id LIMIT 1)
+           RETURNING *"""
+    ).fetchone()
+    db.commit()
+    return dict(row) if row else None
+
+
+def _finish_job(job_id: int, result: dict | None = None, error: str | None = None, retry: bool = False):
+    db = get_db()
+    try:
+        status = "pending" if retry else ("failed" if error else "done")
+        db.execute(
+            """UPDATE background_jobs
+               SET status = ?, result_json = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+               WHERE id = ?""",
+            (status, json.dumps(result or {}, ensure_ascii=False), error, job_id)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _enqueue_due_periodic_jobs(db):
+    """Programme les tâches périodiques dont le dernier passage est trop ancien."""
+    for job_type, interval in PERIODIC_JOBS.items():
+        active = db.execute(
+            "SELECT 1 FROM background_jobs WHERE job_type = ? AND status IN ('pending', 'running')",
+            (job_type,)
+        ).fetchone()
+        if active:
+            continue
+        last = db.execute(
+            "SELECT MAX(finished_at) AS last FROM background_jobs WHERE job_type = ? AND status = 'done'",
+            (job_type,)
+        ).fetchone()["last"]
+        if last:
+            last_dt = datetime.fromisoformat(str(last))
+            if datetime.utcnow() - last_dt < interval:
+                continue
+        enqueue_job(job_type, db=db)
+    db.commit()
+
+
+def _prune_finished_jobs(db):
+    db.execute(
+        """DELETE FROM background_jobs WHERE status IN ('done', 'failed') AND id NOT IN (
+               SELECT id FROM background_jobs WHERE status IN ('done', 'failed')
+               ORDER BY id DESC LIMIT ?)""",
+        (KEEP_FINISHED_JOBS,)
+    )
+    db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Tâches
+# ---------------------------------------------------------------------------
+
+async def _job_prefetch_search(payload: dict, config: dict) -> dict:
+    """Pré-charge les recherches de recettes pour des noms de produits."""
+    names = [n for n in payload.get("names", []) if isinstance(n, str) and n.strip()]
+    servings = payload.get("target_servings") or config["target_servings"]
+    semaphore = asyncio.Semaphore(config["concurrency"])
+
+    async def _one(name: str) -> int:
+        async with semaphore:
+            return len(await search_recipes_online(name, target_servings=servings))
+
+    counts = await asyncio.gather(*(_one(n) for n in names[:20]))
+    return {"names": len(counts), "recipes": sum(counts)}
+
+
+async def _job_warm_categories(payload: dict, config: dict) -> dict:
+    """Préchauffe le cache des catégories de RECIPE_CATEGORIES_FR."""
+    servings = config["target_servings"]
+    max_results = payload.get("max_results", 17)  # = défaut de l'endpoint (12 + 5)
+    semaphore = asyncio.Semaphore(config["concurrency"])
+
+    async def _one(category_id: str) -> int:
+        async with semaphore:
+            return len(await get_recipes_by_category(category_id, max_results=max_results, target_servings=servings))
+
+    counts = await asyncio.gather(*(_one(c["id"]) for c in RECIPE_CATEGORIES_FR))
+    return {"categories": len(counts), "recipes": sum(counts)}
+
+
+async def _job_refresh_random(payload: dict, config: dict) -> dict:
+    """Complète la réserve persistante de recettes aléatoires."""
+    servings = payload.get("target_servings") or config["target_servings"]
+    return await top_up_reservoir(target_servings=servings, concurrency=config["concurrency"])
+
+
+async def _job_sync_mealdb(payload: dict, config: dict) -> dict:
+    """Synchronise le miroir local du catalogue TheMealDB."""
+    return await sync_mealdb_mirror(concurrency=config["concurrency"] * 2)
+
+
+async def _job_backup_db(payload: dict, config: dict) -> dict:
+    """Sauvegarde la base (API backup, par étapes) puis applique la rotation."""
+    await asyncio.to_thread(backup_db)
+    return get_backup_stats()["last"]
+
+
+async def _job_prune_change_log(payload: dict, config: dict) -> dict:
+    """Élague le journal des modifications (flux since= / SSE)."""
+    return {"deleted": await asyncio.to_thread(prune_change_log)}
+
+
+async def _job_prune_recipe_store(payload: dict, config: dict) -> dict:
+    """Supprime les fiches du magasin de recettes expirées."""
+    return {"deleted": await asyncio.to_thread(prune_recipe_store)}
+
+
+JOB_HANDLERS: dict[str, Callable[[dict, dict], Awaitable[dict]]] = {
+    "prefetch_search": _job_prefetch_search,
+    "warm_categories": _job_warm_categories,
+    "refresh_random": _job_refresh_random,
+    "sync_mealdb": _job_sync_mealdb,
+    "backup_db": _job_backup_db,
+    "prune_change_log": _job_prune_change_log,
+    "prune_recipe_store": _job_prune_recipe_store,
+}
+
+
+# ---------------------------------------------------------------------------
+# Boucle du planificateur
+# ---------------------------------------------------------------------------
+
+class Scheduler:
+    """Planificateur en processus : une boucle asyncio qui distribue les tâches."""
+
+    def __init__(self):
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.last_tick: Optional[datetime] = None
+        self.quiet = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop_task is not None and not self._loop_task.done()
+
+    def start(self):
+        if self.is_running:
+            return
+        # Tâches interrompues par un arrêt précédent : on les remet en file
+        db = get_db()
+        try:
+            db.execute("UPDATE background_jobs SET status = 'pending' WHERE status = 'running'")
+            db.commit()
+        finally:
+            db.close()
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop_task = asyncio.create_task(self._run_loop())
+        logger.info("⏱️ Planificateur démarré")
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*([self._loop_task] if self._loop_task else []), *self._running,
+                             return_exceptions=True)
+        self._loop_task = None
+        self._loop = None
+        self._running.clear()
+
+    def wake(self):
+        """Réveille la boucle (ex: nouvelle tâche urgente). Appelable depuis un thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run_loop(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erreur planificateur: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def tick(self):
+        """Un passage : programme les tâches périodiques et lance les tâches en attente."""
+        self.last_tick = datetime.now()
+        db = get_db()
+        try:
+            config = _read_settings(db)
+            self.quiet = is_quiet_time(config["quiet_hours"])
+            if not config["enabled"] or self.quiet:
+                return
+            _enqueue_due_periodic_jobs(db)
+            while len(self._running) < config["concurrency"]:
+                job = _claim_next_job(db)
+                if job is None:
+                    break
+                task = asyncio.create_task(self._run_job(job, config))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            _prune_finished_jobs(db)
+        finally:
+            db.close()
+
+    async def _run_job(self, job: dict, config: dict):
+        handler = JOB_HANDLERS.get(job["job_type"])
+        if handler is None:
+            _finish_job(job["id"], error=f"Type de tâche inconnu: {job['job_type']}")
+            return
+        started = datetime.now()
+        try:
+            payload = json.loads(job.get("payload_json") or "{}")
+            result = await handler(payload, config)
+            result["duration_ms"] = round((datetime.now() - started).total_seconds() * 1000)
+            _finish_job(job["id"], result=result)
+        except asyncio.CancelledError:
+            _finish_job(job["id"], error="Interrompue", retry=True)
+            raise
+        except Exception as e:
+            logger.warning(f"Tâche {job['job_type']}#{job['id']} échouée: {e}")
+            _finish_job(job["id"], error=str(e), retry=job["attempts"] < MAX_ATTEMPTS)
+
+
+scheduler = Scheduler()
+
+
+def get_scheduler_status() -> dict:
+    """État du planificateur, de la file et du cache."""
+    db = get_db()
+    try:
+        config = _read_settings(db)
+        counts = {
+            r["status"]: r["c"]
+            for r in db.execute("SELECT status, COUNT(*) AS c FROM background_jobs GROUP BY status").fetchall()
+        }
+        recent = rows_to_list(db.execute(
+            "SELECT id, job_type, status, attempts, error, result_json, created_at, started_at, finished_at "
+            "FROM background_jobs ORDER BY id DESC LIMIT 20"
+        ).fetchall())
+    finally:
+        db.close()
+    return {
+        "running": scheduler.is_running,
+        "quiet": is_quiet_time(config["quiet_hours"]),
+        "last_tick": scheduler.last_tick.isoformat() if scheduler.last_tick else None,
+        "active_tasks": len(scheduler._running),
+        "config": config,
+        "counts": counts,
+        "cache": get_cache_stats(),
+        "reservoir": get_reservoir_stats(),
+        "mealdb_mirror": mirror_size(),
+        "category_pipeline": get_stage_timings(),
+        "backups": get_backup_stats(),
+        "jobs": recent,
+    }
@@ -1,21 +1,87 @@
 """
 FrigoScan — Service produits de saison.
 Données pour la France, par mois.
+Le fichier est lu une seule fois (relu si sa date de modification change) et
+indexé par mois sur les jetons canoniques des noms (ingredient_tokens) :
+un produit est de saison si ses jetons sont inclus dans ceux d'un produit du
+mois, ou l'inverse ("Poireaux bio" / "Poireau", "Chou" / "Chou-fleur").
 """
 
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import NamedTuple, Optional
+
+from . import ingredient_tokens
 
 SEASONAL_PATH = Path(__file__).parent.parent / "data" / "seasonal_products.json"
 
 
+class MonthIndex(NamedTuple):
+    products: list[dict]
+    entries: list[tuple[frozenset, dict]]     # (jetons du produit, produit)
+    by_token: dict[str, list[int]]            # jeton -> positions dans entries
+    head_tokens: frozenset                    # jeton principal de chaque produit
+
+
+_lock = threading.Lock()
+_state: dict = {"key": None, "data": {}, "months": {}}
+
+
+def _file_key() -> Optional[tuple]:
+    try:
+        stat = SEASONAL_PATH.stat()
+    except OSError:
+        return None
+    return (str(SEASONAL_PATH), stat.st_mtime_ns, stat.st_size)
+
+
+def _build_month(products: list[dict]) -> MonthIndex:
+    entries: list[tuple[frozenset, dict]] = []
+    by_token: dict[str, list[int]] = {}
+    heads = set()
+    for product in products:
+        tokens = ingredient_tokens.canonical_tokens(product.get("name"))
+        if not tokens:
+            continue
+        heads.add(tokens[0])
+        for t in set(tokens):
+            by_token.setdefault(t, []).append(len(entries))
+        entries.append((frozenset(tokens), product))
+    return MonthIndex(products, entries, by_token, frozenset(heads))
+
+
+def _current() -> dict:
+    """Données et index par mois, rechargés si le fichier a changé."""
+    key = _file_key()
+    if key == _state["key"]:
+        return _state
+    with _lock:
+        if key != _state["key"]:
+            data = {}
+            if key is not None:
+                with open(SEASONAL_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            months = {int(m): _build_month(products) for m, products in data.items() if str(m).isdigit()}
+            _state.update(data=data, months=months, key=key)
+    return _state
+
+
+def _month_index(month: Optional[int]) -> MonthIndex:
+    if month is None:
+        month = datetime.now().month
+    return _current()["months"].get(month) or _build_month([])
+
+
+def data_version() -> str:
+    """Identifiant de la version du fichier (chemin, date de modification, taille)."""
+    return repr(_file_key())
+
+
 def load_seasonal_data() -> dict:
-    """Charge les données de saisonnalité depuis le fichier JSON."""
-    if SEASONAL_PATH.exists():
-        with open(SEASONAL_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    """Données de saisonnalité (mises en cache, ne pas modifier)."""
+    return _current()["data"]
 
 
 def get_seasonal_products(month: int = None) -> list[dict]:
@@ -23,24 +89,42 @@ def get_seasonal_products(month: int = None) -> list[dict]:
     Retourne les produits de saison pour le mois donné (1-12).
     Si aucun mois n'est donné, utilise le mois actuel.
     """
-    if month is None:
-        month = datetime.now().month
+    return list(_month_index(month).products)
 
-    data = load_seasonal_data()
-    month_key = str(month)
 
-    products = data.get(month_key, [])
-    return products
+def find_seasonal_product(product_name: str, month: int = None) -> Optional[dict]:
+    """Produit de saison correspondant au nom, ou None."""
+    tokens = frozenset(ingredient_tokens.canonical_tokens(product_name))
+    if not tokens:
+        return None
+    index = _month_index(month)
+    candidates = sorted({i for t in tokens for i in index.by_token.get(t, ())})
+    for i in candidates:
+        product_tokens, product = index.entries[i]
+        if product_tokens <= tokens or tokens <= product_tokens:
+            return product
+    return None
 
 
 def is_seasonal(product_name: str, month: int = None) -> bool:
     """Vérifie si un produit est de saison."""
-    if month is None:
-        month = datetime.now().month
+    return find_seasonal_product(product_name, month) is not None
+
+
+def check_seasonal_batch(product_names: list[str], month: int = None) -> dict[str, dict]:
+    """Classe une liste de noms en un appel : {nom: {is_seasonal, product}}."""
+    results = {}
+    for name in product_names:
+        if name in results:
+            continue
+        product = find_seasonal_product(name, month)
+        results[name] = {"is_seasonal": product is not None, "product": product}
+    return results
 
-    seasonal = get_seasonal_products(month)
-    product_lower = product_name.lower()
-    for p in seasonal:
-        if p.get("name", "").lower() in product_lower or product_lower in p.get("name", "").lower():
-            return True
-    return False
+
+def seasonal_tokens(month: int) -> frozenset:
+    """
+    Table par mois : jeton principal (premier jeton canonique) de chaque
+    produit de saison ("Chou-fleur" -> "chou").
+    """
+    return _month_index(month).head_tokens
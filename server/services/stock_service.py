@@ -0,0 +1,79 @@
+"""
+FrigoScan — Stocks minimum.
+Comparaison ensembliste des minimums avec le contenu actif du frigo :
+une requête groupée (LEFT JOIN) quel que soit le nombre de minimums, et
+un ajout groupé à la liste de courses. Les noms sont comparés sans tenir
+compte de la casse (COLLATE NOCASE, servi par les index dédiés).
+Le stock est sommé par unité puis converti dans l'unité du minimum
+(g / kg, mL / L, ...) ; des unités incompatibles sont additionnées telles quelles.
+"""
+
+from typing import Optional
+
+from .quantity import convert
+
+LOW_STOCK_SQL = """
+SELECT m.id, m.product_name, m.category, m.min_quantity, m.unit,
+       f.unit AS stock_unit, COALESCE(SUM(f.quantity), 0) AS current,
+       EXISTS (SELECT 1 FROM shopping_list s
+               WHERE s.product_name = m.product_name COLLATE NOCASE AND s.is_purchased = 0) AS on_list
+FROM stock_minimums m
+LEFT JOIN fridge_items f
+       ON f.name = m.product_name COLLATE NOCASE AND f.status = 'active'
+{where}
+GROUP BY m.id, f.unit
+ORDER BY m.id
+"""
+
+
+def find_low_stock(db, product_names: Optional[list[str]] = None) -> list[dict]:
+    """Minimums non atteints (tous, ou seulement pour `product_names`)."""
+    params: list = []
+    where = ""
+    if product_names is not None:
+        names = list(dict.fromkeys(product_names))
+        if not names:
+            return []
+        where = f"WHERE m.product_name COLLATE NOCASE IN ({','.join('?' * len(names))})"
+        params = names
+    totals: dict[int, dict] = {}
+    for row in db.execute(LOW_STOCK_SQL.format(where=where), params).fetchall():
+        entry = totals.setdefault(row["id"], {
+            "product_name": row["product_name"], "category": row["category"],
+            "min_quantity": row["min_quantity"], "unit": row["unit"],
+            "current": 0, "on_list": row["on_list"],
+        })
+        if row["stock_unit"] is None:
+            continue
+        try:
+            entry["current"] += convert(row["current"], row["stock_unit"], row["unit"])
+        except ValueError:
+            entry["current"] += row["current"]
+    low = []
+    for entry in totals.values():
+        entry["current"] = round(entry["current"], 3)
+        if entry["current"] < entry["min_quantity"]:
+            low.append(entry)
+    return low
+
+
+def add_low_stock_to_shopping(db, low_stock: list[dict]) -> int:
+    """Ajoute les manques à la liste de courses (hors articles déjà présents), en un seul lot."""
+    missing = [
+        (r["product_name"], r["category"], r["min_quantity"] - r["current"], r["unit"], "stock_alert")
+        for r in low_stock if not r["on_list"]
+    ]
+    db.executemany(
+        "INSERT INTO shopping_list (product_name, category, quantity, unit, source) VALUES (?, ?, ?, ?, ?)",
+        missing
+    )
+    return len(missing)
+
+
+def stock_alert_message(row: dict) -> dict:
+    return {
+        "product_name": row["product_name"],
+        "current": row["current"],
+        "minimum": row["min_quantity"],
+        "message": f"Stock bas : {row['product_name']} ({row['current']}/{row['min_quantity']} {row['unit']})",
+    }
@@ -0,0 +1,299 @@
+"""
+FrigoScan — Accès aux services externes (TheMealDB, Marmiton, Open Food Facts, MyMemory).
+Un disjoncteur par hôte amont : après trop d'erreurs ou d'appels trop lents,
+le disjoncteur s'ouvre et les appels échouent immédiatement (CircuitOpenError)
+au lieu d'attendre le TIMEOUT complet ; les services basculent alors sur leurs
+fallbacks locaux. Après un délai de repos, un appel d'essai (semi-ouvert)
+décide de la refermeture.
+Les délais d'attente sont dérivés des latences observées par point d'accès
+(percentiles glissants), et les GET idempotents peuvent être doublés
+(requête couverte) quand la première réponse tarde au-delà du p95.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger("frigoscan.upstream")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+WINDOW_SIZE = 20           # derniers appels pris en compte
+MIN_CALLS = 5              # pas de décision sur moins d'appels
+FAILURE_RATE_THRESHOLD = 0.5
+OPEN_SECONDS = 30.0        # durée d'ouverture avant l'appel d'essai
+
+# Au-delà de cette durée (secondes), un appel réussi compte comme un échec
+SLOW_CALL_SECONDS = {
+    "themealdb": 5.0,
+    "marmiton": 8.0,
+    "openfoodfacts": 4.0,
+    "mymemory": 2.0,
+}
+
+LATENCY_WINDOW = 200       # dernières latences conservées par point d'accès
+MIN_SAMPLES = 20           # en dessous : délai fixe, pas de requête couverte
+DEADLINE_FACTOR = 3.0      # délai = p99 x facteur, borné par le TIMEOUT du service
+MIN_DEADLINE = 1.0
+HISTOGRAM_BOUNDS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class CircuitOpenError(Exception):
+    """Le disjoncteur de l'hôte amont est ouvert : appel non tenté."""
+
+    def __init__(self, upstream: str):
+        super().__init__(f"Service {upstream} indisponible (disjoncteur ouvert)")
+        self.upstream = upstream
+
+
+def _clock() -> float:
+    return time.monotonic()
+
+
+class CircuitBreaker:
+    """Disjoncteur fermé / ouvert / semi-ouvert sur une fenêtre glissante d'appels."""
+
+    def __init__(self, name: str, slow_call_seconds: float = 5.0):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self._outcomes: deque = deque(maxlen=WINDOW_SIZE)  # True = échec
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Autorise l'appel ; en semi-ouvert, un seul appel d'essai à la fois."""
+        if self.state == OPEN:
+            if _clock() - self.opened_at < OPEN_SECONDS:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record(self, failed: bool, duration: float = 0.0) -> None:
+        failed = failed or duration > self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if failed:
+                self._trip()
+            else:
+                logger.info(f"Disjoncteur {self.name} refermé")
+                self.state = CLOSED
+                self.opened_at = None
+                self._outcomes.clear()
+            return
+        self._outcomes.append(failed)
+        if self.state == CLOSED and len(self._outcomes) >= MIN_CALLS \
+                and self.failure_rate() >= FAILURE_RATE_THRESHOLD:
+            self._trip()
+
+    def release(self) -> None:
+        """Appel d'essai abandonné (annulation) : libère la place."""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def _trip(self) -> None:
+        logger.warning(f"Disjoncteur {self.name} ouvert (taux d'échec {self.failure_rate():.0%})")
+        self.state = OPEN
+        self.opened_at = _clock()
+        self.trips += 1
+        self._outcomes.clear()
+
+    def snapshot(self) -> dict:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, OPEN_SECONDS - (_clock() - self.opened_at)), 1)
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 2),
+            "calls_in_window": len(self._outcomes),
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in_s": retry_in,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+class EndpointLatency:
+    """Latences glissantes d'un point d'accès : percentiles, histogramme, requêtes couvertes."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._samples: deque = deque(maxlen=LATENCY_WINDOW)
+        self._buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if ms <= bound), len(HISTOGRAM_BOUNDS_MS))
+        self._buckets[index] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self._samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def deadline(self, ceiling: float) -> float:
+        """Délai d'attente adapté ; le TIMEOUT du service tant que l'historique est court."""
+        p99 = self.percentile(99)
+        if p99 is None:
+            return ceiling
+        return min(ceiling, max(MIN_DEADLINE, p99 * DEADLINE_FACTOR))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Attente avant la requête couverte (p95), None sans historique suffisant."""
+        return self.percentile(95)
+
+    def snapshot(self) -> dict:
+        def _ms(value: Optional[float]):
+            return round(value * 1000) if value is not None else None
+
+        labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            "samples": len(self._samples),
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+            "p99_ms": _ms(self.percentile(99)),
+            "histogram": dict(zip(labels, self._buckets)),
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+_latencies: dict[str, EndpointLatency] = {}
+
+
+def get_endpoint_latency(upstream: str, url: str, endpoint: Optional[str] = None) -> EndpointLatency:
+    """Statistiques du point d'accès (dernier segment du chemin par défaut)."""
+    key = f"{upstream}:{endpoint or urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]}"
+    latency = _latencies.get(key)
+    if latency is None:
+        latency = EndpointLatency(key)
+        _latencies[key] = latency
+    return latency
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        breaker = CircuitBreaker(upstream, SLOW_CALL_SECONDS.get(upstream, 5.0))
+        _breakers[upstream] = breaker
+    return breaker
+
+
+def is_available(upstream: str) -> bool:
+    """Vrai si un appel serait tenté (sans consommer l'appel d'essai)."""
+    breaker = get_breaker(upstream)
+    if breaker.state == OPEN:
+        return _clock() - breaker.opened_at >= OPEN_SECONDS
+    return not (breaker.state == HALF_OPEN and breaker._probe_in_flight)
+
+
+async def _hedged_get(client: httpx.AsyncClient, latency: EndpointLatency, url: str, kwargs: dict) -> httpx.Response:
+    """Envoie une seconde requête identique si la première dépasse le p95 ; la première réponse gagne."""
+    primary = asyncio.ensure_future(client.get(url, **kwargs))
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=latency.hedge_delay())
+        if not done:
+            latency.hedged += 1
+            pending.add(asyncio.ensure_future(client.get(url, **kwargs)))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners = [t for t in done if t.exception() is None]
+            if winners:
+                if winners[0] is not primary:
+                    latency.hedge_wins += 1
+                return winners[0].result()
+            error = next(iter(done)).exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _client_timeout(client: httpx.AsyncClient) -> float:
+    return client.timeout.read or client.timeout.connect or 15.0
+
+
+async def upstream_get(client: httpx.AsyncClient, upstream: str, url: str, hedge: bool = False,
+                       endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+    """
+    GET protégé par le disjoncteur de `upstream`.
+    Les erreurs réseau, les réponses 5xx / 429 et les appels trop lents
+    comptent comme des échecs. Lève CircuitOpenError si le disjoncteur est ouvert.
+    Le délai d'attente suit les latences observées (le timeout du client ou
+    `timeout=` sert de plafond). Avec `hedge` (GET idempotents uniquement),
+    une requête couverte part si la réponse tarde au-delà du p95.
+    """
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        raise CircuitOpenError(upstream)
+    latency = get_endpoint_latency(upstream, url, endpoint)
+    latency.calls += 1
+    kwargs["timeout"] = latency.deadline(kwargs.pop("timeout", None) or _client_timeout(client))
+    started = _clock()
+    try:
+        if hedge and breaker.state == CLOSED and latency.hedge_delay() is not None:
+            resp = await _hedged_get(client, latency, url, kwargs)
+        else:
+            resp = await client.get(url, **kwargs)
+    except httpx.HTTPError as e:
+        duration = _clock() - started
+        if isinstance(e, httpx.TimeoutException):
+            latency.observe(duration)  # borne basse de la latence réelle
+        breaker.record(True, duration)
+        raise
+    except BaseException:
+        breaker.release()  # annulation : ni succès ni échec
+        raise
+    duration = _clock() - started
+    latency.observe(duration)
+    breaker.record(resp.status_code >= 500 or resp.status_code == 429, duration)
+    return resp
+
+
+def get_breaker_states() -> dict:
+    """État des disjoncteurs connus (pour /api/health)."""
+    for name in SLOW_CALL_SECONDS:
+        get_breaker(name)
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
+
+
+def get_latency_stats() -> dict:
+    """Percentiles, histogrammes et taux de requêtes couvertes par point d'accès."""
+    return {name: latency.snapshot() for name, latency in sorted(_latencies.items())}
+
+
+def reset_breakers() -> None:
+    _breakers.clear()
+    _latencies.clear()
@@ -255,6 +255,115 @@ FrigoScan.handleBarcodeInput = function (e) {
     }
 };
 
+// =====================================================================
+// Liste synchronisée : état local tenu à jour par deltas (since=, SSE)
+// =====================================================================
+// options : url (liste, sans filtres), keep(row) (ligne affichée ?),
+// compare(a, b) (ordre d'affichage), render(items), reload() (liste complète)
+FrigoScan.SyncedList = function (options) {
+    this.options = options;
+    this.rows = new Map();
+    this.version = null;
+    this.syncing = null;
+    this.again = false;
+};
+
+FrigoScan.SyncedList.prototype.reset = function (items, version) {
+    this.rows = new Map(items.map(row => [row.id, row]));
+    this.version = version;
+    this.render();
+};
+
+FrigoScan.SyncedList.prototype.items = function () {
+    return [...this.rows.values()].sort(this.options.compare);
+};
+
+FrigoScan.SyncedList.prototype.render = function () {
+    this.options.render(this.items());
+};
+
+// Upserts / deletes d'une version ; ignorés si déjà connus (modification de cet onglet)
+FrigoScan.SyncedList.prototype.apply = function (delta, version) {
+    if (this.version === null || version <= this.version) return false;
+    (delta.deletes || []).forEach(id => this.rows.delete(id));
+    (delta.upserts || []).forEach(row => {
+        if (this.options.keep(row)) this.rows.set(row.id, row);
+        else this.rows.delete(row.id);
+    });
+    this.version = version;
+    this.render();
+    return true;
+};
+
+// Après une action locale : seulement les changements depuis la version connue
+FrigoScan.SyncedList.prototype.sync = function () {
+    if (this.syncing) {
+        this.again = true;
+        return this.syncing;
+    }
+    this.syncing = (async () => {
+        do {
+            this.again = false;
+            if (this.version === null) {
+                await this.options.reload();
+                break;
+            }
+            const data = await FrigoScan.API.get(`${this.options.url}?since=${this.version}`);
+            if (!data.success) break;
+            if (data.reset) {
+                await this.options.reload();
+                break;
+            }
+            this.apply(data, data.version);
+        } while (this.again);
+        this.syncing = null;
+    })();
+    return this.syncing;
+};
+
+// =====================================================================
+// Flux de modifications (SSE) : autre onglet, autre appareil
+// =====================================================================
+FrigoScan.Changes = {
+    source: null,
+    timer: null,
+    // Entité -> { view, list } enregistrés par les modules (fridge.js, shopping.js)
+    lists: {},
+    // Entités résumées par le tableau de bord
+    dashboard: ['fridge', 'shopping'],
+};
+
+FrigoScan.Changes.register = function (entity, view, list) {
+    FrigoScan.Changes.lists[entity] = { view, list };
+};
+
+FrigoScan.Changes.start = function () {
+    if (!window.EventSource || FrigoScan.Changes.source) return;
+    const source = new EventSource('/api/changes/stream?entities=fridge,shopping');
+    source.addEventListener('change', (e) => {
+        let feed;
+        try { feed = JSON.parse(e.data); } catch (err) { return; }
+        FrigoScan.Changes.handle(feed);
+    });
+    FrigoScan.Changes.source = source;
+};
+
+FrigoScan.Changes.handle = function (feed) {
+    const entities = feed.reset ? Object.keys(FrigoScan.Changes.lists) : Object.keys(feed.changes || {});
+    entities.forEach(entity => {
+        const entry = FrigoScan.Changes.lists[entity];
+        // Vue masquée : rechargée complètement à l'ouverture
+        if (!entry || FrigoScan.currentView !== entry.view) return;
+        if (feed.reset) entry.list.options.reload();
+        else entry.list.apply(feed.changes[entity], feed.version);
+    });
+    if (FrigoScan.currentView === 'dashboard' && entities.some(e => FrigoScan.Changes.dashboard.includes(e))) {
+        // Compteurs seulement : un rechargement regroupé par rafale
+        clearTimeout(FrigoScan.Changes.timer);
+        FrigoScan.Changes.timer = setTimeout(FrigoScan.loadDashboard, 300);
+    }
+};
+
 // =====================================================================
 // Init
 // =====================================================================
@@ -280,4 +389,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Charger le dashboard
     FrigoScan.loadDashboard();
+
+    // Modifications faites ailleurs
+    FrigoScan.Changes.start();
 });
@@ -9,6 +9,40 @@
 
     let currentFilter = 'all';
     let currentSort = 'added_at';
+    const seasonalNames = new Set();
+    const seasonalChecked = new Set();
+
+    // Ordre d'affichage, identique aux tris du serveur (FRIDGE_SORT_KEYS)
+    const SORT_KEYS = {
+        added_at: [item => item.added_at || '', true],
+        dlc: [item => item.dlc || '9999-12-31', false],
+        name: [item => item.name || '', false],
+        category: [item => item.category || '', false],
+    };
+
+    function compareItems(a, b) {
+        const [key, descending] = SORT_KEYS[currentSort] || SORT_KEYS.added_at;
+        const ka = key(a), kb = key(b);
+        const order = ka < kb ? -1 : ka > kb ? 1 : a.id - b.id;
+        return descending ? -order : order;
+    }
+
+    function keepItem(item) {
+        if (item.status !== 'active') return false;
+        if (currentFilter === 'soon') return item.dlc_status === 'soon';
+        if (currentFilter === 'expired') return item.dlc_status === 'expired';
+        return true;
+    }
+
+    // Produits affichés, tenus à jour par les deltas du serveur
+    const items = new FrigoScan.SyncedList({
+        url: '/api/fridge/',
+        keep: keepItem,
+        compare: compareItems,
+        render: renderList,
+        reload: () => loadItems(),
+    });
+    FrigoScan.Changes.register('fridge', 'fridge', items);
 
     Fridge.load = async function () {
         setupListeners();
@@ -35,23 +69,27 @@
     }
 
     async function loadItems() {
-        let url = `/api/fridge/?sort=${currentSort}`;
+        let url = `/api/fridge/?sort=${currentSort}&fields=-nutrition_json,-name_tokens`;
         if (currentFilter === 'soon') url += '&filter_dlc=soon';
         else if (currentFilter === 'expired') url += '&filter_dlc=expired';
 
         const data = await FrigoScan.API.get(url);
         if (!data.success) return;
+        items.reset(data.items, data.version);
+    }
 
+    async function renderList(rows) {
         const list = document.getElementById('fridge-list');
         const empty = document.getElementById('fridge-empty');
 
-        if (data.items.length === 0) {
+        if (rows.length === 0) {
             list.innerHTML = '';
             empty.classList.remove('hidden');
             return;
         }
 
         empty.classList.add('hidden');
+        await loadSeasonal(rows);
 
         // Si tri par catégorie, regrouper avec des en-têtes
         if (currentSort === 'category') {
@@ -63,7 +101,7 @@
                 'charcuterie': '🥓', 'autre': '📦'
             };
             const groups = {};
-            data.items.forEach(item => {
+            rows.forEach(item => {
                 const cat = (item.category || 'autre').toLowerCase();
                 if (!groups[cat]) groups[cat] = [];
                 groups[cat].push(item);
@@ -83,9 +121,9 @@
             list.innerHTML = html;
         } else if (currentSort === 'dlc') {
             // Tri DLC : séparer les groupes (périmé, bientôt, ok)
-            const expired = data.items.filter(i => i.dlc_status === 'expired');
-            const soon = data.items.filter(i => i.dlc_status === 'soon');
-            const ok = data.items.filter(i => i.dlc_status !== 'expired' && i.dlc_status !== 'soon');
+            const expired = rows.filter(i => i.dlc_status === 'expired');
+            const soon = rows.filter(i => i.dlc_status === 'soon');
+            const ok = rows.filter(i => i.dlc_status !== 'expired' && i.dlc_status !== 'soon');
 
             let html = '';
             if (expired.length) {
@@ -114,7 +152,7 @@
             }
             list.innerHTML = html;
         } else {
-            list.innerHTML = data.items.map(item => renderItem(item)).join('');
+            list.innerHTML = rows.map(item => renderItem(item)).join('');
         }
 
         // Attacher les événements
@@ -128,6 +166,18 @@
         });
     }
 
+    // Produits de saison : un seul appel pour les noms pas encore vérifiés
+    async function loadSeasonal(rows) {
+        const names = [...new Set(rows.map(i => i.name))].filter(n => !seasonalChecked.has(n)).slice(0, 500);
+        if (names.length === 0) return;
+        const res = await FrigoScan.API.post('/api/seasonal/check', { names });
+        if (!res.success) return;
+        names.forEach(name => seasonalChecked.add(name));
+        Object.keys(res.results).forEach(name => {
+            if (res.results[name].is_seasonal) seasonalNames.add(name);
+        });
+    }
+
     function renderItem(item) {
         const dlcClass = item.dlc_status === 'soon' ? 'dlc-soon' : item.dlc_status === 'expired' ? 'dlc-expired' : '';
         let dlcBadge = '';
@@ -154,6 +204,7 @@
                         <span>${item.quantity} ${item.unit}</span>
                         <span class="badge">${item.category || 'autre'}</span>
                         ${dlcBadge}
+                        ${seasonalNames.has(item.name) ? '<span class="badge badge-seasonal">🌿 De saison</span>' : ''}
                     </div>
                 </div>
                 <div class="fridge-item-actions">
@@ -180,7 +231,7 @@
                     if (data.stock_alert) {
                         FrigoScan.toast(data.stock_alert.message, 'warning');
                     }
-                    loadItems();
+                    items.sync();
                 }
                 break;
             }
@@ -188,7 +239,7 @@
                 const data = await FrigoScan.API.post(`/api/fridge/${id}/extend-dlc?days=3`);
                 if (data.success) {
                     FrigoScan.toast(data.message, 'success');
-                    loadItems();
+                    items.sync();
                 }
                 break;
             }
@@ -198,7 +249,7 @@
                     const data = await FrigoScan.API.del(`/api/fridge/${id}`);
                     if (data.success) {
                         FrigoScan.toast(data.message, 'success');
-                        loadItems();
+                        items.sync();
                     }
                 }
                 break;
@@ -308,8 +308,8 @@
         });
     }
 
-    Recipes.banRecipe = async function (title, imageUrl) {
-        const data = await FrigoScan.API.post('/api/recipes/ban', { title, image_url: imageUrl || '' });
+    Recipes.banRecipe = async function (title, imageUrl, key) {
+        const data = await FrigoScan.API.post('/api/recipes/ban', { key: key || null, title, image_url: imageUrl || '' });
         if (data.success) {
             FrigoScan.toast(`"${title}" bannie — elle n'apparaîtra plus dans les suggestions.`, 'success');
             bannedTitles.add(title.toLowerCase().trim());
@@ -452,11 +452,27 @@
         grid.querySelectorAll('.recipe-card').forEach(card => {
             card.addEventListener('click', () => {
                 const idx = parseInt(card.dataset.recipeIdx);
-                showRecipeDetail(recipes[idx]);
+                openRecipe(recipes[idx]);
             });
         });
     }
 
+    // Les listes ne renvoient qu'un résumé : fiche complète chargée à l'ouverture
+    async function openRecipe(recipe) {
+        if (!recipe.key || recipe.ingredients_json !== undefined) {
+            showRecipeDetail(recipe);
+            return;
+        }
+        const data = await FrigoScan.API.get(`/api/recipes/by-key/${encodeURIComponent(recipe.key)}`);
+        if (!data.success) return;  // erreur déjà affichée (404 : fiche expirée)
+        // Score et manquants propres à cette suggestion, fiche du magasin pour le reste
+        showRecipeDetail(Object.assign({}, data.recipe, {
+            key: recipe.key,
+            match_score: recipe.match_score,
+            missing_ingredients: recipe.missing_ingredients,
+        }));
+    }
+
     async function showRecipeDetail(recipe) {
         const modal = document.getElementById('recipe-detail-modal');
         const content = document.getElementById('recipe-detail-content');
@@ -492,9 +508,19 @@
             ? `<img src="${recipe.image_url}" alt="${recipe.title}" onerror="this.style.display='none'" style="width:100%;max-height:300px;object-fit:cover;border-radius:var(--radius-sm);margin-bottom:16px;">`
             : '';
 
+        // Nombre en tête, comme côté serveur (_NUMBER) : "1/2", "1 1/2", "1½", "2-3"
+        const NUMBER = '(?:\\d+/\\d+|\\d+(?:[.,]\\d+)?(?:\\s*[½¼¾⅓⅔⅛]|\\s+\\d+/\\d+)?|[½¼¾⅓⅔⅛])';
+        const QUANTITY_PREFIX = new RegExp(`^\\s*${NUMBER}(?:\\s*(?:-|–|à|to)\\s*${NUMBER})?\\s*`, 'i');
+
         // Ajuster les quantités d'ingrédients selon le ratio de portions
-        function adjustMeasure(measure) {
+        // (quantité déjà analysée côté serveur dans ing.qty si disponible)
+        function adjustMeasure(measure, parsed) {
             if (!measure || portionRatio === 1) return measure;
+            const prefix = measure.match(QUANTITY_PREFIX);
+            if (prefix && parsed && typeof parsed.amount === 'number') {
+                // Tout le nombre analysé est remplacé, pas seulement ses premiers chiffres
+                return `${Math.round(parsed.amount * portionRatio * 10) / 10} ${measure.slice(prefix[0].length)}`.trim();
+            }
             // Extraire le nombre du measure (ex: "200 g", "1/2 cup", "2")
             const numMatch = measure.match(/^([\d.,/]+)\s*(.*)/);
             if (numMatch) {
@@ -527,10 +553,13 @@
             }
             const cls = isAvailable ? 'ingredient-pill available' : 'ingredient-pill missing';
             const icon = isAvailable ? '<i class="fas fa-check"></i>' : '<i class="fas fa-cart-plus"></i>';
-            const adjustedMeasure = adjustMeasure(ing.measure);
+            const adjustedMeasure = adjustMeasure(ing.measure, ing.qty);
             const measureText = adjustedMeasure ? `${adjustedMeasure} ` : '';
+            const qtyAttrs = ing.qty
+                ? ` data-qty="${Math.round(ing.qty.amount * portionRatio * 10) / 10}" data-unit="${ing.qty.unit.replace(/"/g, '&quot;')}"`
+                : '';
             const addBtn = !isAvailable
-                ? ` <button class="btn-add-ingredient" data-name="${(ing.name || '').replace(/"/g, '&quot;')}" data-measure="${(adjustedMeasure || '').replace(/"/g, '&quot;')}" title="Ajouter à la liste de courses">+</button>`
+                ? ` <button class="btn-add-ingredient" data-name="${(ing.name || '').replace(/"/g, '&quot;')}" data-measure="${(adjustedMeasure || '').replace(/"/g, '&quot;')}"${qtyAttrs} title="Ajouter à la liste de courses">+</button>`
                 : '';
             return `<span class="${cls}">${icon} ${measureText}${ing.name}${addBtn}</span>`;
         }).join('');
@@ -591,7 +620,9 @@
                 e.stopPropagation();
                 const name = btn.dataset.name;
                 const measure = btn.dataset.measure || '';
-                const { qty, unit } = parseMeasure(measure);
+                const { qty, unit } = btn.dataset.qty
+                    ? { qty: parseFloat(btn.dataset.qty), unit: btn.dataset.unit }
+                    : parseMeasure(measure);
                 const res = await FrigoScan.API.post('/api/shopping/', { product_name: name, quantity: qty, unit: unit });
                 if (res.success) {
                     FrigoScan.toast(`"${name}" ajouté à la liste de courses (${qty} ${unit})`, 'success');
@@ -612,7 +643,9 @@
                 for (const pill of missingPills) {
                     const name = pill.dataset.name;
                     const measure = pill.dataset.measure || '';
-                    const { qty, unit } = parseMeasure(measure);
+                    const { qty, unit } = pill.dataset.qty
+                        ? { qty: parseFloat(pill.dataset.qty), unit: pill.dataset.unit }
+                        : parseMeasure(measure);
                     const res = await FrigoScan.API.post('/api/shopping/', { product_name: name, quantity: qty, unit: unit });
                     if (res.success) {
                         added++;
@@ -633,7 +666,7 @@
             banBtn.addEventListener('click', async () => {
                 const ok = await FrigoScan.confirm('Bannir cette recette', `Bannir « ${recipe.title} » ? Elle n'apparaîtra plus dans les suggestions ni le menu de la semaine.`);
                 if (!ok) return;
-                await Recipes.banRecipe(recipe.title, recipe.image_url || '');
+                await Recipes.banRecipe(recipe.title, recipe.image_url || '', recipe.key);
                 Recipes.closeDetail();
             });
         }
@@ -650,18 +683,21 @@
             FrigoScan.toast('Cette recette est déjà dans "Mes recettes" !', 'warning');
             return;
         }
-        const data = await FrigoScan.API.post('/api/recipes/', {
-            title: recipe.title,
-            ingredients_json: recipe.ingredients_json || '[]',
-            instructions: recipe.instructions || '',
-            prep_time: recipe.prep_time || 0,
-            cook_time: recipe.cook_time || 0,
-            servings: recipe.servings || 4,
-            source_url: recipe.source_url || '',
-            image_url: recipe.image_url || '',
-            tags_json: recipe.tags_json || '[]',
-            diet_tags_json: recipe.diet_tags_json || '[]',
-        });
+        // Recette d'une liste : sauvegardée par sa clé, le serveur a déjà la fiche
+        const data = recipe.key
+            ? await FrigoScan.API.post(`/api/recipes/by-key/${encodeURIComponent(recipe.key)}/save`, {})
+            : await FrigoScan.API.post('/api/recipes/', {
+                title: recipe.title,
+                ingredients_json: recipe.ingredients_json || '[]',
+                instructions: recipe.instructions || '',
+                prep_time: recipe.prep_time || 0,
+                cook_time: recipe.cook_time || 0,
+                servings: recipe.servings || 4,
+                source_url: recipe.source_url || '',
+                image_url: recipe.image_url || '',
+                tags_json: recipe.tags_json || '[]',
+                diet_tags_json: recipe.diet_tags_json || '[]',
+            });
         if (data.success) {
             FrigoScan.toast('Recette sauvegardée dans "Mes recettes" !', 'success');
             btn.disabled = true;
@@ -6,7 +6,26 @@
     const Shopping = {};
     FrigoScan.Shopping = Shopping;
 
-    let currentItems = []; // Suivi des articles actuels
+    // Ordre du serveur (show_purchased=true) : achetés en dernier, puis catégorie, nom
+    function compareItems(a, b) {
+        const ka = [a.is_purchased ? 1 : 0, a.category || '', a.product_name || ''];
+        const kb = [b.is_purchased ? 1 : 0, b.category || '', b.product_name || ''];
+        for (let i = 0; i < ka.length; i++) {
+            if (ka[i] < kb[i]) return -1;
+            if (ka[i] > kb[i]) return 1;
+        }
+        return a.id - b.id;
+    }
+
+    // Articles actuels, tenus à jour par les deltas du serveur
+    const currentItems = new FrigoScan.SyncedList({
+        url: '/api/shopping/',
+        keep: () => true,
+        compare: compareItems,
+        render: renderList,
+        reload: () => loadList(),
+    });
+    FrigoScan.Changes.register('shopping', 'shopping', currentItems);
 
     Shopping.load = async function () {
         setupListeners();
@@ -30,8 +49,8 @@
 
     async function loadList() {
         const data = await FrigoScan.API.get('/api/shopping/?show_purchased=true');
-        currentItems = data.items || [];
-        renderList(currentItems);
+        if (!data.success) return;
+        currentItems.reset(data.items, data.version);
     }
 
     function renderList(items) {
@@ -87,13 +106,13 @@
         if (data.success) {
             FrigoScan.toast(data.message, 'success');
             input.value = '';
-            loadList();
+            currentItems.sync();
         }
     }
 
     Shopping.toggle = async function (id) {
         const data = await FrigoScan.API.put(`/api/shopping/${id}/toggle`);
-        if (data.success) loadList();
+        if (data.success) currentItems.sync();
     };
 
     // Gestion des changements de checkbox
@@ -106,6 +125,7 @@
                 checkbox.checked = !checkbox.checked;
             } else {
                 updateAddAllFridgeButton();
+                currentItems.sync();
             }
         }
     };
@@ -160,7 +180,7 @@
         const items = [];
         checkboxes.forEach(checkbox => {
             const id = parseInt(checkbox.dataset.id);
-            const item = currentItems.find(i => i.id === id);
+            const item = currentItems.rows.get(id);
             if (item) items.push(item);
         });
 
@@ -190,7 +210,7 @@
 
         if (successCount > 0) {
             FrigoScan.toast(`${successCount} article(s) ajouté(s) au frigo !`, 'success');
-            loadList();
+            currentItems.sync();
         } else {
             FrigoScan.toast('Erreur lors de l\'ajout au frigo.', 'error');
         }
@@ -200,7 +220,7 @@
         const data = await FrigoScan.API.del(`/api/shopping/${id}`);
         if (data.success) {
             FrigoScan.toast(data.message, 'success');
-            loadList();
+            currentItems.sync();
         }
     };
 
@@ -220,7 +240,7 @@
                 // Marquer comme acheté
                 await FrigoScan.API.put(`/api/shopping/${shoppingId}/toggle`);
                 FrigoScan.toast(`"${product}" ajouté au frigo et marqué comme acheté !`, 'success');
-                loadList();
+                currentItems.sync();
             } else {
                 FrigoScan.toast('Erreur lors de l\'ajout au frigo.', 'error');
             }
@@ -237,7 +257,7 @@
             } else {
                 FrigoScan.toast('Tous les stocks sont OK.', 'success');
             }
-            loadList();
+            currentItems.sync();
         }
     }
 
@@ -245,7 +265,7 @@
         const data = await FrigoScan.API.del('/api/shopping/clear/purchased');
         if (data.success) {
             FrigoScan.toast(data.message, 'success');
-            loadList();
+            currentItems.sync();
         }
     }
 
@@ -255,7 +275,7 @@
         const data = await FrigoScan.API.del('/api/shopping/clear/all');
         if (data.success) {
             FrigoScan.toast(data.message, 'success');
-            loadList();
+            currentItems.sync();
         }
     }
 
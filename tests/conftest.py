@@ -0,0 +1,38 @@
+"""
+Fixtures partagées : base SQLite temporaire isolée par test, client HTTP.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server import database
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Redirige get_db() vers une base vierge dans un répertoire temporaire."""
+    monkeypatch.setattr(database, "DB_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "frigoscan.db")
+    database.init_db()
+    return tmp_path / "frigoscan.db"
+
+
+@pytest.fixture
+def client(tmp_db):
+    """Client HTTP de l'application sur la base temporaire."""
+    from fastapi.testclient import TestClient
+    from server.main import app
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    """Disjoncteurs des services externes remis à zéro entre les tests."""
+    from server.services import upstream
+    upstream.reset_breakers()
+    yield
+    upstream.reset_breakers()
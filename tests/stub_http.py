@@ -0,0 +1,84 @@
+"""
+Serveur HTTP local pour simuler les API externes (TheMealDB, MyMemory...).
+Chaque route associe un chemin à une fonction (query: dict) -> (status, payload).
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubServer:
+    """Serveur de test lancé dans un thread ; journalise les requêtes reçues."""
+
+    def __init__(self, routes: dict, delay=None):
+        self.routes = routes
+        self.delay = delay  # callable(path) -> secondes, pour simuler la gigue
+        self.requests: list[tuple[str, dict]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                with stub._lock:
+                    stub.requests.append((parsed.path, query))
+                if stub.delay:
+                    time.sleep(stub.delay(parsed.path))
+                route = stub.routes.get(parsed.path)
+                status, payload = route(query) if route else (404, {"error": "not found"})
+                body = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client parti (requête couverte annulée)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def count(self, path: str) -> int:
+        with self._lock:
+            return sum(1 for p, _ in self.requests if p == path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def jittery(base: float = 0.01, spread: float = 0.02, tail_ratio: float = 0.1,
+            tail_delay: float = 0.5, seed: int = 42):
+    """
+    Délai simulé : base + gigue uniforme, et une fraction `tail_ratio` de
+    requêtes très lentes (queue de latence). Déterministe via `seed`.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def delay(path: str) -> float:
+        with lock:
+            if rng.random() < tail_ratio:
+                return tail_delay
+            return base + rng.random() * spread
+
+    return delay
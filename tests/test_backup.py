@@ -0,0 +1,103 @@
+"""
+Tests des sauvegardes (API backup de SQLite, rotation, téléchargement compressé).
+"""
+
+import asyncio
+import gzip
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import database
+from server.main import app
+from server.services import scheduler
+
+
+@pytest.fixture
+def filled_db(tmp_db):
+    db = database.get_db()
+    try:
+        db.executemany(
+            "INSERT INTO fridge_items (name, quantity) VALUES (?, ?)",
+            [(f"Produit {i} " + "x" * 200, i) for i in range(3000)]
+        )
+        db.commit()
+    finally:
+        db.close()
+    return tmp_db
+
+
+def _count(path) -> int:
+    conn = sqlite3.connect(str(path))
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        return conn.execute("SELECT COUNT(*) FROM fridge_items").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestBackupApi:
+    def test_backup_includes_wal_pages(self, filled_db, tmp_path):
+        writer = database.get_db()
+        try:
+            writer.execute("INSERT INTO fridge_items (name) VALUES ('Dans le WAL')")
+            writer.commit()
+            # Connexion ouverte : pas de checkpoint, la ligne n'est que dans le journal WAL
+            assert (tmp_path / "frigoscan.db-wal").stat().st_size > 0
+            stats = database.backup_to(tmp_path / "copy.db")
+        finally:
+            writer.close()
+        assert _count(tmp_path / "copy.db") == 3001
+        assert stats["pages"] > 0 and stats["size_bytes"] > 0
+
+    def test_backup_is_stepped(self, filled_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, "BACKUP_PAGES_PER_STEP", 16)
+        monkeypatch.setattr(database, "BACKUP_STEP_SLEEP", 0)
+        stats = database.backup_to(tmp_path / "copy.db")
+        assert stats["steps"] >= stats["pages"] // 16
+
+    def test_rotation_keeps_most_recent(self, filled_db, tmp_path):
+        db = database.get_db()
+        try:
+            db.execute("UPDATE settings SET value = '3' WHERE key = 'backup_keep'")
+            db.commit()
+        finally:
+            db.close()
+        paths = [database.backup_db() for _ in range(5)]
+        remaining = sorted(p.name for p in tmp_path.glob("frigoscan_backup_*.db"))
+        assert remaining == sorted(p.rsplit("/", 1)[-1] for p in paths[-3:])
+        stats = database.get_backup_stats()
+        assert stats["count"] == 3 and stats["keep"] == 3
+        assert stats["last"]["path"] == paths[-1]
+
+    def test_scheduled_job_reports_timing(self, filled_db):
+        assert "backup_db" in scheduler.PERIODIC_JOBS
+        result = asyncio.run(scheduler._job_backup_db({}, {}))
+        assert result["duration_ms"] >= 0 and result["pages"] > 0
+
+
+class TestBackupDownload:
+    def test_plain_download(self, filled_db, tmp_path):
+        resp = TestClient(app).get("/api/export/database/backup")
+        assert resp.status_code == 200
+        (tmp_path / "dl.db").write_bytes(resp.content)
+        assert _count(tmp_path / "dl.db") == 3000
+        assert not list(tmp_path.glob("frigoscan_download_*"))
+
+    def test_gzip_download(self, filled_db, tmp_path):
+        resp = TestClient(app).get("/api/export/database/backup?compression=gzip")
+        assert resp.headers["content-type"] == "application/gzip"
+        assert ".db.gz" in resp.headers["content-disposition"]
+        (tmp_path / "dl.db").write_bytes(gzip.decompress(resp.content))
+        assert _count(tmp_path / "dl.db") == 3000
+
+    def test_zstd_requires_optional_module(self, filled_db):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            resp = TestClient(app).get("/api/export/database/backup?compression=zstd")
+            assert resp.status_code == 400
+        else:
+            resp = TestClient(app).get("/api/export/database/backup?compression=zstd")
+            assert resp.headers["content-type"] == "application/zstd"
@@ -0,0 +1,68 @@
+"""
+Tests du pipeline concurrent des catégories TheMealDB (serveur simulé).
+"""
+
+import time
+
+import pytest
+
+from server.services import recipe_service
+from stub_http import StubServer
+
+LOOKUP_DELAY = 0.2
+
+
+def _meal(meal_id: str) -> dict:
+    return {
+        "idMeal": meal_id, "strMeal": f"Dish {meal_id}", "strCategory": "Beef",
+        "strInstructions": "Cook the beef slowly for two hours.",
+        "strIngredient1": "Beef", "strMeasure1": "500g",
+    }
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    routes = {
+        "/filter.php": lambda q: (200, {"meals": [{"idMeal": str(i)} for i in range(1, 21)]}),
+        "/lookup.php": lambda q: (200, {"meals": [_meal(q["i"])]}),
+        "/get": lambda q: (200, {"responseStatus": 200, "responseData": {"translatedText": "Cuire."}}),
+    }
+    delay = lambda path: LOOKUP_DELAY if path == "/lookup.php" else 0
+    with StubServer(routes, delay=delay) as server:
+        monkeypatch.setattr(recipe_service, "MEALDB_FILTER", f"{server.url}/filter.php")
+        monkeypatch.setattr(recipe_service, "MEALDB_LOOKUP", f"{server.url}/lookup.php")
+        monkeypatch.setattr(recipe_service, "TRANSLATION_API", f"{server.url}/get")
+        monkeypatch.setattr(recipe_service, "_stage_timings", {})
+        yield server
+
+
+class TestCategoryPipeline:
+    """Lookups et traductions concurrents, annulation anticipée."""
+
+    @pytest.mark.asyncio
+    async def test_lookups_run_concurrently(self, stub, monkeypatch):
+        monkeypatch.setattr(recipe_service, "CATEGORY_CONCURRENCY", 6)
+        started = time.perf_counter()
+        recipes = await recipe_service._category_pipeline("Beef", max_results=6, target_servings=4)
+        elapsed = time.perf_counter() - started
+
+        assert len(recipes) == 6
+        # 6 lookups en série prendraient au moins 6 x 0.2 s
+        assert elapsed < 6 * LOOKUP_DELAY
+        assert all(r["instructions"] == "Cuire." for r in recipes)
+
+    @pytest.mark.asyncio
+    async def test_stops_once_enough_recipes(self, stub, monkeypatch):
+        monkeypatch.setattr(recipe_service, "CATEGORY_CONCURRENCY", 2)
+        recipes = await recipe_service._category_pipeline("Beef", max_results=2, target_servings=4)
+        assert len(recipes) == 2
+        # max_results + 5 lookups prévus, mais le reste est annulé après les 2 premiers
+        assert stub.count("/lookup.php") < 2 + 5
+
+    @pytest.mark.asyncio
+    async def test_stage_timings_are_recorded(self, stub):
+        await recipe_service._category_pipeline("Beef", max_results=3, target_servings=4)
+        timings = recipe_service.get_stage_timings()
+        for stage in ("filter", "lookup", "normalize", "translate", "category_total"):
+            assert timings[stage]["count"] >= 1
+        assert timings["lookup"]["max_ms"] >= LOOKUP_DELAY * 1000 * 0.9
@@ -0,0 +1,119 @@
+"""
+Flux de modifications : journal alimenté par triggers, deltas since=,
+reset quand l'historique ne couvre plus la version, flux SSE.
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from server.database import get_db
+from server.main import app
+from server.services import change_feed
+
+
+def _add_fridge(client, name):
+    return client.post("/api/fridge/", json={"name": name, "quantity": 1, "unit": "unité"}).json()["item"]
+
+
+def test_list_returns_version_and_since_returns_delta(tmp_db):
+    client = TestClient(app)
+    start = client.get("/api/fridge/").json()["version"]
+
+    kept = _add_fridge(client, "Beurre")
+    removed = _add_fridge(client, "Lait")
+    client.put(f"/api/fridge/{kept['id']}", json={"quantity": 3})
+    client.delete(f"/api/fridge/{removed['id']}")
+
+    delta = client.get("/api/fridge/", params={"since": start}).json()
+    assert delta["success"] is True and delta["reset"] is False
+    assert delta["version"] > start
+    assert [row["id"] for row in delta["upserts"]] == [kept["id"]]
+    assert delta["upserts"][0]["quantity"] == 3
+    assert "name_tokens" not in delta["upserts"][0]
+    assert "dlc_status" in delta["upserts"][0]  # état courant lu dans la vue
+    assert delta["deletes"] == [removed["id"]]
+
+    # À jour : delta vide
+    empty = client.get("/api/fridge/", params={"since": delta["version"]}).json()
+    assert empty["upserts"] == [] and empty["deletes"] == []
+    assert empty["version"] == delta["version"]
+
+
+def test_changes_endpoint_filters_entities(tmp_db):
+    client = TestClient(app)
+    start = client.get("/api/changes/", params={"since": 0}).json()["version"]
+
+    _add_fridge(client, "Beurre")
+    client.post("/api/shopping/", json={"product_name": "Pain", "quantity": 1, "unit": "unité"})
+    client.put("/api/settings/", json={"key": "theme", "value": "dark"})
+
+    feed = client.get("/api/changes/", params={"since": start}).json()
+    assert set(feed["changes"]) == {"fridge", "shopping", "settings"}
+    assert feed["changes"]["settings"]["upserts"] == [{"key": "theme", "value": "dark"}]
+
+    only = client.get("/api/changes/", params={"since": start, "entities": "shopping"}).json()
+    assert set(only["changes"]) == {"shopping"}
+    assert only["changes"]["shopping"]["upserts"][0]["product_name"] == "Pain"
+
+    assert client.get("/api/changes/", params={"since": start, "entities": "nope"}).status_code == 400
+
+    settings = client.get("/api/settings/", params={"since": start}).json()
+    assert settings["settings"] == {"theme": "dark"}
+
+
+def test_reset_when_history_does_not_cover_since(tmp_db):
+    client = TestClient(app)
+    for i in range(5):
+        _add_fridge(client, f"Produit {i}")
+    version = client.get("/api/fridge/").json()["version"]
+
+    assert client.get("/api/fridge/", params={"since": version + 10}).json()["reset"] is True
+
+    assert change_feed.prune_change_log(keep=2) > 0
+    assert client.get("/api/fridge/", params={"since": 0}).json()["reset"] is True
+    recent = client.get("/api/fridge/", params={"since": version - 2}).json()
+    assert recent["reset"] is False
+
+
+def test_reset_when_too_many_changes(tmp_db, monkeypatch):
+    client = TestClient(app)
+    start = client.get("/api/fridge/").json()["version"]
+    for i in range(4):
+        _add_fridge(client, f"Produit {i}")
+    monkeypatch.setattr(change_feed, "MAX_CHANGES", 3)
+    delta = client.get("/api/fridge/", params={"since": start}).json()
+    assert delta["reset"] is True and delta["upserts"] == []
+
+
+def test_change_events_stream(tmp_db, monkeypatch):
+    monkeypatch.setattr(change_feed, "STREAM_POLL_INTERVAL", 0.01)
+    db = get_db()
+    try:
+        start = change_feed.current_version(db)
+    finally:
+        db.close()
+
+    async def scenario():
+        polls = 0
+
+        async def is_disconnected():
+            nonlocal polls
+            polls += 1
+            if polls == 3:
+                db = get_db()
+                try:
+                    db.execute("INSERT INTO shopping_list (product_name, quantity, unit) VALUES ('Oeufs', 6, 'unité')")
+                    db.commit()
+                finally:
+                    db.close()
+            return polls > 10
+
+        return [event async for event in change_feed.change_events(None, ["shopping"], is_disconnected)]
+
+    events = asyncio.run(scenario())
+    assert events[0].startswith(f"id: {start}\nevent: ready")
+    changes = [e for e in events if "event: change" in e]
+    assert len(changes) == 1
+    assert f"id: {start + 1}\n" in changes[0]
+    assert '"product_name":"Oeufs"' in changes[0]
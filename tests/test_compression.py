@@ -0,0 +1,178 @@
+"""
+Compression des réponses (gzip / brotli, seuil, flux), sérialisation JSON
+par défaut, projection fields= ; benchmark octets / temps de sérialisation.
+"""
+
+import gzip
+import json
+import time
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from server import responses
+from server.compression import CompressionMiddleware, negotiate
+from server.database import get_db
+from server.main import app
+
+
+def _raw_get(client, url, encoding):
+    """GET sans décompression automatique (corps tel que transmis)."""
+    with client.stream("GET", url, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def _small_app(**options):
+    inner = FastAPI()
+
+    @inner.get("/text")
+    def text(size: int = 2000):
+        return PlainTextResponse("frigo " * (size // 6))
+
+    @inner.get("/stream")
+    def stream():
+        return StreamingResponse((f"ligne {i}\n" * 50 for i in range(20)), media_type="text/csv")
+
+    @inner.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: 1\n\n" * 300]), media_type="text/event-stream")
+
+    inner.add_middleware(CompressionMiddleware, **options)
+    return TestClient(inner)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=1.0, gzip;q=0.5", "br"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("identity", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, ("br", "gzip")) == expected
+
+
+def test_gzip_above_threshold_only():
+    client = _small_app(encodings=("gzip",), minimum_size=1000)
+    response, body = _raw_get(client, "/text?size=5000", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body).startswith(b"frigo frigo")
+
+    response, body = _raw_get(client, "/text?size=300", "gzip")
+    assert "content-encoding" not in response.headers and body.startswith(b"frigo")
+
+    response, body = _raw_get(client, "/text?size=5000", "identity")
+    assert "content-encoding" not in response.headers
+
+
+def test_streaming_compressed_and_sse_untouched():
+    client = _small_app(encodings=("gzip",), minimum_size=100)
+    response, body = _raw_get(client, "/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert zlib.decompress(body, 16 + zlib.MAX_WBITS).decode().count("\n") == 1000
+
+    response, body = _raw_get(client, "/events", "gzip")
+    assert "content-encoding" not in response.headers and body.startswith(b"data: 1")
+
+
+def test_brotli():
+    brotli = pytest.importorskip("brotli")
+    client = _small_app(encodings=("br", "gzip"), minimum_size=100)
+    response, body = _raw_get(client, "/text", "br, gzip")
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(body).startswith(b"frigo")
+
+
+def test_compressed_etag_becomes_weak_and_still_matches(tmp_db):
+    db = get_db()
+    try:
+        db.executemany("INSERT INTO shopping_list (product_name, quantity, unit) VALUES (?, 1, 'unité')",
+                       [(f"Article {i}",) for i in range(100)])
+        db.commit()
+    finally:
+        db.close()
+    client = TestClient(app)
+    response, _ = _raw_get(client, "/api/shopping/", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    again = client.get("/api/shopping/", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+    assert again.status_code == 304
+
+
+def test_default_response_is_compact_utf8(tmp_db):
+    client = TestClient(app)
+    client.put("/api/settings/", json={"key": "user_name", "value": "Élodie"})
+    raw = client.get("/api/settings/", headers={"Accept-Encoding": "identity"}).content
+    assert "Élodie".encode("utf-8") in raw
+    assert b'": ' not in raw and b'", "' not in raw
+
+
+def test_dumps_fallback_without_orjson(monkeypatch):
+    content = {"a": [1, 2.5, None], "é": "à", 3: True}
+    expected = json.loads(responses.dumps(content))
+    monkeypatch.setattr(responses, "orjson", None)
+    assert json.loads(responses.dumps(content)) == expected == {"a": [1, 2.5, None], "é": "à", "3": True}
+    assert responses.dumps({"n": 2 ** 70}) == b'{"n":1180591620717411303424}'
+
+
+def test_fields_projection_on_tables(tmp_db):
+    client = TestClient(app)
+    client.post("/api/fridge/", json={"name": "Beurre", "quantity": 1, "unit": "unité",
+                                      "nutrition_json": json.dumps({"energy": 700})})
+    items = client.get("/api/fridge/", params={"fields": "name,dlc_status"}).json()["items"]
+    assert items == [{"id": items[0]["id"], "name": "Beurre", "dlc_status": "none"}]
+
+    items = client.get("/api/fridge/", params={"fields": "-nutrition_json,-name_tokens"}).json()["items"]
+    assert "nutrition_json" not in items[0] and "quantity" in items[0]
+
+    assert client.get("/api/fridge/", params={"fields": "name,-dlc"}).status_code == 400
+    assert client.get("/api/fridge/", params={"fields": "nom"}).status_code == 400
+
+    client.post("/api/shopping/", json={"product_name": "Pain", "quantity": 1, "unit": "unité"})
+    rows = client.get("/api/shopping/", params={"fields": "product_name"}).json()["items"]
+    assert set(rows[0]) == {"id", "product_name"}
+
+
+def test_fields_projection_on_recipes(tmp_db):
+    client = TestClient(app)
+    client.post("/api/recipes/", json={"title": "Soupe", "instructions": "Mijoter." * 200,
+                                       "ingredients_json": json.dumps([{"name": "Poireau"}])})
+    recipes = client.get("/api/recipes/", params={"fields": "-instructions,-ingredient_tokens_json"}).json()["recipes"]
+    assert recipes[0]["title"] == "Soupe" and "instructions" not in recipes[0]
+    paged = client.get("/api/recipes/", params={"fields": "title", "limit": 10}).json()["recipes"]
+    assert set(paged[0]) == {"id", "title"}
+
+
+def test_benchmark_compression_and_serialization():
+    """Benchmark : 200 recettes complètes (~charge d'un /suggest large)."""
+    payload = {"success": True, "recipes": [
+        {
+            "title": f"Recette {i}",
+            "instructions": "Éplucher, couper et faire revenir les légumes à feu doux. " * 20,
+            "ingredients_json": json.dumps([{"name": f"Ingrédient {j}", "measure": "200 g"} for j in range(12)]),
+            "match_score": 42.5, "missing_ingredients": ["sel", "poivre"],
+        }
+        for i in range(200)
+    ]}
+    rounds = 20
+    started = time.perf_counter()
+    for _ in range(rounds):
+        std = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    std_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fast = responses.dumps(payload)
+    fast_time = time.perf_counter() - started
+    assert json.loads(fast) == json.loads(std) == payload
+
+    compressed = gzip.compress(fast, 6)
+    print(f"\n{len(fast)} octets JSON -> {len(compressed)} octets gzip ; sérialisation x{rounds} : "
+          f"json {std_time * 1000:.0f} ms, {'orjson' if responses.orjson else 'json'} {fast_time * 1000:.0f} ms")
+    assert len(compressed) < len(fast) / 5
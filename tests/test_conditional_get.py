@@ -0,0 +1,119 @@
+"""
+GET conditionnels : ETag calculé depuis les versions des tables (sans
+exécuter la liste), 304 sur If-None-Match, Cache-Control, et benchmark
+octets / temps d'une revalidation contre un rechargement complet.
+"""
+
+import time
+
+from fastapi.testclient import TestClient
+
+from server import conditional, database
+from server.database import get_db
+from server.main import app
+
+
+def _etag(client, url, **params):
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def test_304_when_unchanged_and_200_after_write(tmp_db):
+    client = TestClient(app)
+    first = client.get("/api/fridge/")
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and first.headers["cache-control"] == "no-cache"
+
+    cached = client.get("/api/fridge/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    client.post("/api/fridge/", json={"name": "Beurre", "quantity": 1, "unit": "unité"})
+    fresh = client.get("/api/fridge/", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.json()["count"] == 1
+    assert fresh.headers["etag"] != etag
+
+
+def test_etag_per_table_and_query(tmp_db):
+    client = TestClient(app)
+    fridge = _etag(client, "/api/fridge/")
+    shopping = _etag(client, "/api/shopping/")
+    banned = _etag(client, "/api/recipes/banned")
+
+    client.post("/api/shopping/", json={"product_name": "Pain", "quantity": 1, "unit": "unité"})
+    assert _etag(client, "/api/fridge/") == fridge
+    assert _etag(client, "/api/shopping/") != shopping
+
+    client.post("/api/recipes/ban", json={"title": "Soupe"})
+    assert _etag(client, "/api/recipes/banned") != banned
+
+    assert _etag(client, "/api/fridge/", filter_dlc="soon") != _etag(client, "/api/fridge/")
+
+
+def test_route_not_run_on_304(tmp_db, monkeypatch):
+    client = TestClient(app)
+    etag = _etag(client, "/api/settings/")
+    calls = []
+    real_get_db = database.get_db
+
+    def counting_get_db(*args, **kwargs):
+        calls.append(1)
+        return real_get_db(*args, **kwargs)
+
+    monkeypatch.setattr("server.routers.settings.get_db", counting_get_db)
+    assert client.get("/api/settings/", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == []
+
+
+def test_fridge_etag_changes_with_day_and_database(tmp_db, monkeypatch):
+    client = TestClient(app)
+    etag = _etag(client, "/api/fridge/")
+    monkeypatch.setitem(conditional.CONDITIONAL_ROUTES, "/api/fridge/",
+                        conditional.CONDITIONAL_ROUTES["/api/fridge/"]._replace(extra=lambda: "2099-01-01"))
+    assert _etag(client, "/api/fridge/") != etag
+
+    shopping = _etag(client, "/api/shopping/")
+    database.reset_db()  # base recréée : les versions repartent de zéro, pas l'époque
+    assert _etag(client, "/api/shopping/") != shopping
+
+
+def test_static_routes_cache_control(tmp_db):
+    client = TestClient(app)
+    categories = client.get("/api/recipes/categories")
+    assert categories.headers["cache-control"] == "public, max-age=86400"
+    again = client.get("/api/recipes/categories", headers={"If-None-Match": categories.headers["etag"]})
+    assert again.status_code == 304
+    assert client.get("/api/seasonal/").headers["cache-control"] == "public, max-age=3600"
+    assert "etag" not in client.get("/api/fridge/stats/summary").headers
+
+
+def test_benchmark_revalidation(tmp_db):
+    """Benchmark : 2 000 produits, rechargement complet contre revalidation 304."""
+    db = get_db()
+    try:
+        db.executemany(
+            "INSERT INTO fridge_items (name, quantity, unit, dlc, name_tokens) VALUES (?, 1, 'unité', '2030-01-01', '[]')",
+            [(f"Produit {i}",) for i in range(2000)],
+        )
+        db.commit()
+    finally:
+        db.close()
+    client = TestClient(app)
+    url = "/api/fridge/?limit=500"
+    etag = client.get(url).headers["etag"]
+    rounds = 20
+
+    started = time.perf_counter()
+    full_bytes = sum(len(client.get(url).content) for _ in range(rounds))
+    full = time.perf_counter() - started
+
+    started = time.perf_counter()
+    responses = [client.get(url, headers={"If-None-Match": etag}) for _ in range(rounds)]
+    revalidated = time.perf_counter() - started
+    assert all(r.status_code == 304 for r in responses)
+    cached_bytes = sum(len(r.content) for r in responses)
+
+    print(f"\n{rounds} GET {url} : complet {full_bytes} octets / {full * 1000:.0f} ms, "
+          f"304 {cached_bytes} octets / {revalidated * 1000:.0f} ms")
+    assert cached_bytes == 0 and full_bytes > 0
@@ -0,0 +1,85 @@
+"""
+Tests des exports CSV en flux (plage de dates, choix de colonnes) et XLSX.
+"""
+
+import csv
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from server import database
+from server.main import app
+
+
+@pytest.fixture
+def client(tmp_db):
+    db = database.get_db()
+    try:
+        db.executemany(
+            "INSERT INTO fridge_items (name, quantity, added_at) VALUES (?, ?, ?)",
+            [(f"Produit é{i}", i, f"2026-03-{1 + i % 28:02d} 10:00:00") for i in range(1500)]
+        )
+        db.executemany(
+            "INSERT INTO consumption_history (product_name, quantity, consumed_at) VALUES (?, 1, ?)",
+            [(f"Conso {i}", f"2026-0{1 + i % 3}-15 12:00:00") for i in range(900)]
+        )
+        db.commit()
+    finally:
+        db.close()
+    return TestClient(app)
+
+
+def _rows(resp) -> list[list[str]]:
+    assert resp.content.startswith(b"\xef\xbb\xbf")
+    return list(csv.reader(io.StringIO(resp.content.decode("utf-8-sig"))))
+
+
+class TestCsvExport:
+    def test_fridge_csv_all_rows(self, client):
+        resp = client.get("/api/export/fridge/csv")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        rows = _rows(resp)
+        assert rows[0][0] == "id" and "name" in rows[0]
+        assert len(rows) == 1501 and rows[6][rows[0].index("name")] == "Produit é5"
+
+    def test_column_selection(self, client):
+        rows = _rows(client.get("/api/export/fridge/csv?columns=name,quantity"))
+        assert rows[0] == ["name", "quantity"]
+        assert rows[1] == ["Produit é0", "0.0"]
+
+    def test_unknown_column_rejected(self, client):
+        resp = client.get("/api/export/fridge/csv?columns=name,password")
+        assert resp.status_code == 400
+        assert "password" in resp.json()["detail"]
+
+    def test_date_range_is_inclusive(self, client):
+        rows = _rows(client.get("/api/export/fridge/csv?date_from=2026-03-01&date_to=2026-03-02&columns=id"))
+        assert len(rows) - 1 == sum(1 for i in range(1500) if i % 28 in (0, 1))
+
+    def test_stats_date_range(self, client):
+        rows = _rows(client.get("/api/export/stats/csv?date_from=2026-02-01&columns=product_name,consumed_at"))
+        assert rows[0] == ["product_name", "consumed_at"]
+        assert len(rows) - 1 == 600
+        assert all(r[1] >= "2026-02" for r in rows[1:])
+
+    def test_invalid_date(self, client):
+        assert client.get("/api/export/stats/csv?date_to=15/02/2026").status_code == 400
+
+
+class TestXlsxExport:
+    def test_stats_xlsx(self, client):
+        resp = client.get("/api/export/stats/xlsx?date_to=2026-01-31&columns=product_name,quantity")
+        assert resp.status_code == 200
+        assert ".xlsx" in resp.headers["content-disposition"]
+        sheet = load_workbook(io.BytesIO(resp.content), read_only=True).active
+        rows = list(sheet.values)
+        assert rows[0] == ("product_name", "quantity")
+        assert len(rows) - 1 == 300
+
+    def test_fridge_xlsx(self, client):
+        resp = client.get("/api/export/fridge/xlsx?columns=name")
+        sheet = load_workbook(io.BytesIO(resp.content), read_only=True).active
+        assert sum(1 for _ in sheet.values) == 1501
@@ -0,0 +1,78 @@
+"""
+Tests de l'export complet en flux (JSON, NDJSON, gzip).
+"""
+
+import gzip
+import json
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import database
+from server.main import app
+from server.routers import export_import
+
+
+@pytest.fixture
+def client(tmp_db):
+    db = database.get_db()
+    try:
+        db.executemany(
+            "INSERT INTO fridge_items (name, quantity) VALUES (?, ?)",
+            [(f"Produit é{i}", i) for i in range(1200)]
+        )
+        db.executemany(
+            "INSERT INTO consumption_history (product_name, quantity) VALUES (?, 1)",
+            [(f"Conso {i}",) for i in range(700)]
+        )
+        db.commit()
+    finally:
+        db.close()
+    return TestClient(app)
+
+
+class TestStreamingExport:
+    def test_json_export_structure(self, client):
+        resp = client.get("/api/export/all/json")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert set(data) == {"export_date", *(k for k, _ in export_import.EXPORT_TABLES)}
+        assert len(data["fridge"]) == 1200 and data["fridge"][5]["name"] == "Produit é5"
+        assert len(data["consumption_history"]) == 700
+        assert data["recipes"] == []
+        assert any(s["key"] == "theme" for s in data["settings"])
+
+    def test_ndjson_export(self, client):
+        resp = client.get("/api/export/all/json?format=ndjson")
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        assert lines[0]["format"] == "frigoscan-ndjson"
+        tables = [l["table"] for l in lines[1:]]
+        assert tables.count("fridge") == 1200 and tables.count("consumption_history") == 700
+
+    def test_gzip_export(self, client):
+        resp = client.get("/api/export/all/json?gzip=true")
+        assert resp.headers["content-type"] == "application/gzip"
+        assert ".json.gz" in resp.headers["content-disposition"]
+        data = json.loads(gzip.decompress(resp.content))
+        assert len(data["fridge"]) == 1200
+
+    def test_memory_stays_bounded(self, client):
+        db = database.get_db()
+        try:
+            db.executemany(
+                "INSERT INTO consumption_history (product_name, category, quantity) VALUES (?, 'autre', 1)",
+                [(f"Produit historique numéro {i} " + "x" * 40,) for i in range(30000)]
+            )
+            db.commit()
+        finally:
+            db.close()
+        tracemalloc.start()
+        total = 0
+        for chunk in export_import._export_all_chunks():
+            total += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert total > 3_000_000
+        assert peak < total / 5
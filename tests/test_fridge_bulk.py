@@ -0,0 +1,98 @@
+"""
+Tests des opérations groupées sur le frigo (ajout, consommation, mise à jour, suppression).
+"""
+
+from server import database
+
+
+def _add(client, *items):
+    body = client.post("/api/fridge/batch", json=[{"name": n, "quantity": q} for n, q in items]).json()
+    return [a["id"] for a in body["added"]]
+
+
+class TestBatchInsert:
+    def test_returns_full_rows(self, client):
+        body = client.post("/api/fridge/batch", json=[
+            {"name": "Lait", "quantity": 2, "unit": "L", "dlc": "2030-01-01"},
+            {"name": "Pommes", "quantity": 6},
+        ]).json()
+        assert body["count"] == 2
+        lait, pommes = body["added"]
+        assert lait["name"] == "Lait" and lait["unit"] == "L" and lait["status"] == "active"
+        assert lait["dlc"] == "2030-01-01" and lait["added_at"]
+        assert pommes["id"] == lait["id"] + 1
+
+    def test_large_batch_is_chunked(self, client, monkeypatch):
+        from server.routers import fridge
+        monkeypatch.setattr(fridge, "BATCH_INSERT_CHUNK", 7)
+        ids = _add(client, *[(f"Produit {i}", 1) for i in range(30)])
+        assert len(ids) == 30 and len(set(ids)) == 30
+
+
+class TestBulkConsume:
+    def test_full_and_partial_consumption(self, client):
+        lait, oeufs, riz = _add(client, ("Lait", 2), ("Oeufs", 12), ("Riz", 1))
+        body = client.post("/api/fridge/bulk/consume", json={
+            "items": [{"id": lait}, {"id": oeufs, "quantity": 4}, {"id": riz, "quantity": 5}, {"id": 999}],
+            "user_name": "Alice",
+        }).json()
+        by_id = {c["id"]: c for c in body["consumed"]}
+        assert body["count"] == 3 and body["not_found"] == [999]
+        assert by_id[lait]["status"] == "consumed" and by_id[lait]["consumed_quantity"] == 2
+        assert by_id[oeufs]["status"] == "active" and by_id[oeufs]["quantity"] == 8
+        assert by_id[oeufs]["consumed_quantity"] == 4
+        assert by_id[riz]["status"] == "consumed" and by_id[riz]["consumed_quantity"] == 1
+
+        db = database.get_db()
+        try:
+            history = db.execute("SELECT product_name, quantity, user_name FROM consumption_history ORDER BY id").fetchall()
+            daily = db.execute("SELECT SUM(count) AS c, SUM(qty) AS q FROM consumption_daily").fetchone()
+        finally:
+            db.close()
+        assert sorted((h["product_name"], h["quantity"]) for h in history) == [("Lait", 2), ("Oeufs", 4), ("Riz", 1)]
+        assert all(h["user_name"] == "Alice" for h in history)
+        assert daily["c"] == 3 and daily["q"] == 7
+
+    def test_already_consumed_items_are_skipped(self, client):
+        (lait,) = _add(client, ("Lait", 1))
+        client.post("/api/fridge/bulk/consume", json={"items": [{"id": lait}]})
+        body = client.post("/api/fridge/bulk/consume", json={"items": [{"id": lait}]}).json()
+        assert body["count"] == 0 and body["not_found"] == [lait]
+
+    def test_stock_alerts_computed_once(self, client):
+        db = database.get_db()
+        try:
+            db.execute("INSERT INTO stock_minimums (product_name, min_quantity, unit) VALUES ('Lait', 2, 'L')")
+            db.commit()
+        finally:
+            db.close()
+        ids = _add(client, ("Lait", 1), ("lait", 1), ("Pain", 1))
+        body = client.post("/api/fridge/bulk/consume", json={"items": [{"id": i} for i in ids]}).json()
+        assert len(body["stock_alerts"]) == 1
+        assert body["stock_alerts"][0]["current"] == 0
+
+
+class TestBulkUpdateDelete:
+    def test_update_different_fields(self, client):
+        a, b = _add(client, ("Lait", 1), ("Beurre", 1))
+        body = client.post("/api/fridge/bulk/update", json={"items": [
+            {"id": a, "quantity": 3},
+            {"id": b, "dlc": "2030-05-01", "category": "produits_laitiers"},
+            {"id": 404, "quantity": 1},
+        ]}).json()
+        by_id = {r["id"]: r for r in body["items"]}
+        assert by_id[a]["quantity"] == 3
+        assert by_id[b]["dlc"] == "2030-05-01" and by_id[b]["category"] == "produits_laitiers"
+        assert body["not_found"] == [404]
+
+    def test_update_validates_entries(self, client):
+        (a,) = _add(client, ("Lait", 1))
+        resp = client.post("/api/fridge/bulk/update", json={"items": [{"id": a, "dlc": "demain"}]})
+        assert resp.status_code == 422
+
+    def test_delete(self, client):
+        ids = _add(client, ("Lait", 1), ("Beurre", 1), ("Pain", 1))
+        body = client.post("/api/fridge/bulk/delete", json={"ids": ids[:2] + [12345]}).json()
+        assert sorted(body["deleted"]) == ids[:2] and body["not_found"] == [12345]
+        remaining = client.get("/api/fridge/").json()["items"]
+        assert [r["id"] for r in remaining] == [ids[2]]
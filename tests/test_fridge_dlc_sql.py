@@ -0,0 +1,118 @@
+"""
+Tests du statut DLC calculé en SQL et des plans de requête du frigo.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import database
+from server.main import app
+from server.pagination import keyset_sql, encode_cursor
+from server.routers.fridge import _fridge_filters, FRIDGE_SORT_KEYS
+
+
+def _plan(db, sql: str, params: list) -> str:
+    return " | ".join(r[3] for r in db.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+
+@pytest.fixture
+def seeded(tmp_db):
+    rng = random.Random(3)
+    today = date.today()
+    rows = []
+    for i in range(2000):
+        offset = rng.randint(-10, 20)
+        dlc = rng.choice([None, "", (today + timedelta(days=offset)).isoformat()])
+        rows.append((f"Produit {i}", rng.choice(["fruits", "legumes", "viandes", None]), dlc,
+                     rng.choice(["active", "consumed", "consumed", "consumed"])))
+    db = database.get_db()
+    try:
+        db.executemany("INSERT INTO fridge_items (name, category, dlc, status) VALUES (?, ?, ?, ?)", rows)
+        db.commit()
+    finally:
+        db.close()
+    database.init_db()  # ANALYZE avec les données
+    return tmp_db
+
+
+class TestDlcStatusInSql:
+    """Même classification que l'ancien calcul Python."""
+
+    @pytest.mark.parametrize("offset,status", [(-2, "expired"), (0, "soon"), (3, "soon"), (4, "ok")])
+    def test_status_and_days_left(self, tmp_db, offset, status):
+        dlc = (date.today() + timedelta(days=offset)).isoformat()
+        client = TestClient(app)
+        client.post("/api/fridge/", json={"name": "Lait", "dlc": dlc})
+        item = client.get("/api/fridge/").json()["items"][0]
+        assert item["dlc_status"] == status
+        assert item["dlc_days_left"] == offset
+        assert item["dlc"] == dlc
+
+    def test_without_dlc(self, tmp_db):
+        client = TestClient(app)
+        client.post("/api/fridge/", json={"name": "Sel"})
+        assert client.get("/api/fridge/").json()["items"][0]["dlc_status"] == "none"
+
+    def test_summary_matches_per_item_status(self, seeded):
+        client = TestClient(app)
+        summary = client.get("/api/fridge/stats/summary").json()
+        items = client.get("/api/fridge/?limit=500").json()
+        all_items = items["items"]
+        cursor = items["next_cursor"]
+        while cursor:
+            page = client.get(f"/api/fridge/?limit=500&cursor={cursor}").json()
+            all_items += page["items"]
+            cursor = page["next_cursor"]
+        assert summary["total"] == len(all_items)
+        assert summary["expired"] == sum(i["dlc_status"] == "expired" for i in all_items)
+        assert summary["expiring_soon"] == sum(i["dlc_status"] == "soon" for i in all_items)
+        assert sum(c["c"] for c in summary["categories"]) == summary["total"]
+
+
+class TestQueryPlans:
+    """Les listes et le résumé sont servis par les index, sans parcours de table."""
+
+    @pytest.mark.parametrize("sort,index", [
+        ("added_at", "idx_fridge_active_added"),
+        ("dlc", "idx_fridge_active_dlc_sort"),
+        ("name", "idx_fridge_active_name"),
+        ("category", "idx_fridge_active_category"),
+    ])
+    def test_sorted_pages_use_partial_indexes(self, seeded, sort, index):
+        keys, descending = FRIDGE_SORT_KEYS[sort]
+        where, params = _fridge_filters("active")
+        db = database.get_db()
+        try:
+            first = _plan(db, *keyset_sql("fridge_items_dlc", where, params, keys, descending, 50)[:2])
+            cursor = encode_cursor(["2030-01-01", 10])
+            deep = _plan(db, *keyset_sql("fridge_items_dlc", where, params, keys, descending, 50, cursor)[:2])
+        finally:
+            db.close()
+        assert index in first and "TEMP B-TREE" not in first
+        assert f"SEARCH fridge_items USING INDEX {index}" in deep and "TEMP B-TREE" not in deep
+
+    @pytest.mark.parametrize("filter_dlc", ["soon", "expired"])
+    def test_dlc_filters_use_index(self, seeded, filter_dlc):
+        where, params = _fridge_filters("active", filter_dlc=filter_dlc)
+        db = database.get_db()
+        try:
+            plan = _plan(db, *keyset_sql("fridge_items_dlc", where, params, *FRIDGE_SORT_KEYS["dlc"], 50)[:2])
+        finally:
+            db.close()
+        assert "USING INDEX idx_fridge_" in plan
+        assert "SCAN fridge_items |" not in plan + " |"
+
+    def test_summary_uses_covering_index(self, seeded):
+        db = database.get_db()
+        try:
+            plan = _plan(db, """SELECT category, COUNT(*) as c,
+                      SUM(dlc IS NOT NULL AND dlc <= ? AND dlc >= ?) as expiring,
+                      SUM(dlc > '' AND dlc < ?) as expired
+               FROM fridge_items WHERE status = 'active'
+               GROUP BY category ORDER BY c DESC""", ["a", "b", "c"])
+        finally:
+            db.close()
+        assert "COVERING INDEX idx_fridge_status_category" in plan
@@ -0,0 +1,113 @@
+"""
+Tests de l'import en flux (JSON / NDJSON, lots, reprise, progression).
+"""
+
+import io
+import json
+
+import pytest
+
+from server import database
+from server.services import import_service
+
+
+def _export(n: int = 1200) -> dict:
+    return {
+        "export_date": "2026-10-01T10:00:00",
+        "fridge": [{"name": f"Produit é{i}", "quantity": i} for i in range(n)],
+        "consumption_history": [{"product_name": "ignoré"}],
+        "settings": [{"key": "theme", "value": "dark"}],
+    }
+
+
+def _ndjson(data: dict) -> bytes:
+    lines = [{"format": "frigoscan-ndjson", "export_date": data["export_date"]}]
+    for key, rows in data.items():
+        if isinstance(rows, list):
+            lines += [{"table": key, "row": row} for row in rows]
+    return "\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode("utf-8")
+
+
+def _count(table: str) -> int:
+    db = database.get_db()
+    try:
+        return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        db.close()
+
+
+class TestStreamingParser:
+    def test_json_rows_across_small_reads(self, monkeypatch):
+        monkeypatch.setattr(import_service, "READ_SIZE", 7)
+        raw = json.dumps(_export(50), ensure_ascii=False, indent=1).encode("utf-8")
+        _, rows = import_service.iter_import_rows(io.BytesIO(raw))
+        rows = list(rows)
+        assert [k for k, _ in rows].count("fridge") == 50
+        assert rows[3] == ("fridge", {"name": "Produit é3", "quantity": 3})
+
+    def test_ndjson_detected(self):
+        _, rows = import_service.iter_import_rows(io.BytesIO(_ndjson(_export(10))))
+        assert [k for k, _ in rows] == ["fridge"] * 10 + ["consumption_history", "settings"]
+
+    @pytest.mark.parametrize("raw", [b'{"fridge": [{"name": "a"}', b'{"inconnu": []}', b'{"fridge": 3}'])
+    def test_invalid_input(self, raw):
+        _, rows = import_service.iter_import_rows(io.BytesIO(raw))
+        with pytest.raises(import_service.ImportFormatError):
+            list(rows)
+
+
+class TestImportEndpoints:
+    def test_atomic_import(self, client):
+        before = _count("fridge_items")
+        raw = json.dumps(_export()).encode("utf-8")
+        resp = client.post("/api/export/import/json", files={"file": ("export.json", raw)})
+        assert resp.status_code == 200
+        assert resp.json()["imported"] == {"fridge": 1200, "settings": 1}
+        assert _count("fridge_items") == before + 1200
+
+    def test_atomic_import_rolls_back(self, client):
+        before = _count("fridge_items")
+        data = _export()
+        data["fridge"][900]["name"] = None  # NOT NULL
+        resp = client.post("/api/export/import/json", files={"file": ("export.json", json.dumps(data))})
+        assert resp.status_code == 500
+        assert _count("fridge_items") == before
+
+    def test_unknown_key_is_400(self, client):
+        resp = client.post("/api/export/import/json", files={"file": ("x.json", b'{"oops": []}')})
+        assert resp.status_code == 400
+
+    def test_background_job_with_progress(self, client):
+        resp = client.post("/api/export/import/stream", files={"file": ("export.ndjson", _ndjson(_export()))})
+        assert resp.status_code == 202
+        job = client.get(resp.json()["status_url"]).json()
+        assert job["status"] == "done" and job["percent"] == 100.0
+        assert job["imported"] == {"fridge": 1200, "settings": 1}
+        assert "file_path" not in job
+        assert not list(import_service.import_dir().iterdir())
+
+    def test_failed_job_resumes_after_last_chunk(self, client):
+        before = _count("fridge_items")
+        data = _export()
+        data["fridge"][1100]["name"] = None
+        job_id = client.post("/api/export/import/stream",
+                             files={"file": ("export.json", json.dumps(data))}).json()["job_id"]
+        job = client.get(f"/api/export/import/jobs/{job_id}").json()
+        assert job["status"] == "failed" and "#1000-1199" in job["error"]
+        assert job["committed_rows"] == 1000
+        assert _count("fridge_items") == before + 1000
+
+        # Correction du fichier puis reprise : les 1000 premières lignes ne sont pas ré-insérées
+        data["fridge"][1100]["name"] = "corrigé"
+        path = database.DB_DIR / "imports" / f"import_{job_id}.upload"
+        path.write_text(json.dumps(data))
+        resp = client.post(f"/api/export/import/jobs/{job_id}/resume")
+        assert resp.json()["resume_from"] == 1000
+        job = client.get(f"/api/export/import/jobs/{job_id}").json()
+        assert job["status"] == "done"
+        assert job["imported"] == {"fridge": 1200, "settings": 1}
+        assert _count("fridge_items") == before + 1200
+        assert client.post(f"/api/export/import/jobs/{job_id}/resume").status_code == 409
+
+    def test_unknown_job(self, client):
+        assert client.get("/api/export/import/jobs/999").status_code == 404
@@ -0,0 +1,91 @@
+"""
+Jetons canoniques d'ingrédients : canonicalisation, stockage à l'écriture,
+remplissage des lignes existantes et reconstruction au changement de règles.
+"""
+
+import json
+
+import pytest
+
+from server import database
+from server.services import ingredient_tokens
+from server.services.ingredient_tokens import canonical_tokens
+from server.services.recipe_service import compute_match_score
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Tomates cerises fraîches", ("tomate", "cerise")),
+    ("chicken breast", ("poulet",)),
+    ("Huile d'olive", ("huile", "olive")),
+    ("Œufs", ("oeuf",)),
+    ("eggs", ("oeuf",)),
+    ("Poireaux", ("poireau",)),
+    ("Carottes râpées", ("carotte",)),
+    ("Thé", ("the",)),
+    ("Thé vert", ("the",)),
+    ("Vert", ("vert",)),
+    ("", ()),
+])
+def test_canonical_tokens(name, expected):
+    assert canonical_tokens(name) == expected
+
+
+def test_match_uses_tokens_and_synonyms():
+    ingredients = json.dumps([{"name": "Chicken"}, {"name": "Tomatoes"}, {"name": "salt"}, {"name": "Riz"}])
+    fridge = [{"name": "Blanc de poulet"}, {"name": "Tomate"}]
+    assert compute_match_score(ingredients, fridge) == (75.0, ["Riz"])
+
+    # Jetons stockés utilisés tels quels ; ignorés s'ils ne correspondent pas à la recette
+    stored = json.dumps([["riz"], ["riz"], ["riz"], ["riz"]])
+    assert compute_match_score(ingredients, [{"name": "riz"}], stored) == (100.0, [])
+    assert compute_match_score(ingredients, [{"name": "riz"}], "[[\"riz\"]]")[0] == 50.0
+
+    tea = json.dumps([{"name": "Thé vert"}, {"name": "Farine"}])
+    assert compute_match_score(tea, [{"name": "Thé vert"}]) == (50.0, ["Farine"])
+
+
+def _query(sql, params=()):
+    db = database.get_db()
+    try:
+        return [dict(r) for r in db.execute(sql, params).fetchall()]
+    finally:
+        db.close()
+
+
+def test_tokens_written_with_rows(client):
+    item = client.post("/api/fridge/", json={"name": "Tomates fraîches", "quantity": 2}).json()["item"]
+    assert json.loads(item["name_tokens"]) == ["tomate"]
+    client.put(f"/api/fridge/{item['id']}", json={"name": "Courgettes"})
+    client.post("/api/fridge/bulk/update", json={"items": [{"id": item["id"], "quantity": 1}]})
+    assert _query("SELECT name_tokens FROM fridge_items")[0]["name_tokens"] == '["courgette"]'
+
+    client.post("/api/recipes/", json={"title": "Omelette",
+                                       "ingredients_json": json.dumps([{"name": "Oeufs", "measure": "3"}])})
+    assert _query("SELECT ingredient_tokens_json FROM recipes")[0]["ingredient_tokens_json"] == '[["oeuf"]]'
+
+
+def test_backfill_and_rebuild(tmp_db):
+    db = database.get_db()
+    try:
+        db.execute("INSERT INTO fridge_items (name) VALUES ('Pommes de terre')")
+        db.execute("INSERT INTO recipes (title, ingredients_json) VALUES ('Purée', ?)",
+                   (json.dumps([{"name": "potatoes"}]),))
+        db.execute("""INSERT INTO mealdb_mirror (id_meal, title_en, meal_json, recipe_json)
+                      VALUES ('1', 'Soup', '{}', ?)""",
+                   (json.dumps({"ingredients_json": json.dumps([{"name": "Leeks"}])}),))
+        db.commit()
+
+        assert ingredient_tokens.ensure_ingredient_tokens(db) == {"fridge_items": 1, "recipes": 1}
+        assert db.execute("SELECT name_tokens FROM fridge_items").fetchone()[0] == '["pomme", "terre"]'
+
+        # Règles modifiées : tout est recalculé, y compris les recettes du miroir
+        db.execute("UPDATE settings SET value = '0' WHERE key = ?", (ingredient_tokens.VERSION_SETTING,))
+        db.execute("UPDATE fridge_items SET name_tokens = '[]'")
+        db.commit()
+        stats = ingredient_tokens.ensure_ingredient_tokens(db)
+        assert stats["fridge_items"] == 1 and stats["mealdb_mirror"] == 1
+        assert db.execute("SELECT name_tokens FROM fridge_items").fetchone()[0] == '["pomme", "terre"]'
+        mirrored = json.loads(db.execute("SELECT recipe_json FROM mealdb_mirror").fetchone()[0])
+        assert json.loads(mirrored["ingredient_tokens_json"]) == [["poireau"]]
+    finally:
+        db.close()
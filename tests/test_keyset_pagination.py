@@ -0,0 +1,105 @@
+"""
+Tests de la pagination par curseur (frigo, historique, courses, recettes).
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import database
+from server.main import app
+
+
+@pytest.fixture
+def client(tmp_db):
+    db = database.get_db()
+    try:
+        db.executemany(
+            "INSERT INTO fridge_items (name, category, dlc, added_at, status) VALUES (?, ?, ?, ?, 'active')",
+            [
+                (f"Produit {i:02d}", ["fruits", "legumes", None][i % 3],
+                 None if i % 4 == 0 else f"2030-01-{(i % 7) + 1:02d}",
+                 f"2025-03-{(i % 5) + 1:02d} 10:00:00")
+                for i in range(23)
+            ]
+        )
+        db.executemany(
+            "INSERT INTO consumption_history (product_name, consumed_at) VALUES (?, datetime('now', ?))",
+            [(f"Conso {i}", f"-{i % 4} hours") for i in range(17)]
+        )
+        db.executemany(
+            "INSERT INTO shopping_list (product_name, category, is_purchased) VALUES (?, ?, ?)",
+            [(f"Article {i}", ["épicerie", None][i % 2], i % 3 == 0) for i in range(11)]
+        )
+        db.commit()
+    finally:
+        db.close()
+    return TestClient(app)
+
+
+def _walk(client, url: str, key: str) -> list[dict]:
+    """Parcourt toutes les pages en suivant next_cursor."""
+    first = client.get(url).json()
+    items = list(first[key])
+    cursor = first["next_cursor"]
+    sep = "&" if "?" in url else "?"
+    while cursor:
+        page = client.get(f"{url}{sep}cursor={cursor}").json()
+        items.extend(page[key])
+        cursor = page["next_cursor"]
+    return items
+
+
+class TestKeysetPagination:
+    """Parcours par curseur = liste complète, sans doublon ni trou."""
+
+    @pytest.mark.parametrize("sort", ["added_at", "dlc", "name", "category"])
+    def test_fridge_cursor_walk_matches_full_list(self, client, sort):
+        full = client.get(f"/api/fridge/?sort={sort}&limit=500").json()["items"]
+        walked = _walk(client, f"/api/fridge/?sort={sort}&limit=4", "items")
+        assert [i["id"] for i in walked] == [i["id"] for i in full]
+        assert len(walked) == 23
+
+    def test_page_mode_still_works_and_hands_over_cursor(self, client):
+        page2 = client.get("/api/fridge/?limit=5&page=2").json()
+        assert page2["total"] == 23 and page2["pages"] == 5
+        page3 = client.get("/api/fridge/?limit=5&page=3").json()
+        via_cursor = client.get(f"/api/fridge/?limit=5&cursor={page2['next_cursor']}").json()
+        assert [i["id"] for i in via_cursor["items"]] == [i["id"] for i in page3["items"]]
+        assert via_cursor["total"] == 23
+
+    def test_prev_cursor_returns_previous_page(self, client):
+        page1 = client.get("/api/fridge/?sort=name&limit=5").json()
+        assert page1["prev_cursor"] is None
+        page2 = client.get(f"/api/fridge/?sort=name&limit=5&cursor={page1['next_cursor']}").json()
+        back = client.get(f"/api/fridge/?sort=name&limit=5&cursor={page2['prev_cursor']}").json()
+        assert [i["id"] for i in back["items"]] == [i["id"] for i in page1["items"]]
+        assert back["next_cursor"] is not None
+
+    def test_invalid_cursor_is_rejected(self, client):
+        assert client.get("/api/fridge/?cursor=pas-un-curseur").status_code == 400
+
+    def test_consumption_cursor_walk(self, client):
+        walked = _walk(client, "/api/stats/consumption?limit=5", "data")
+        assert len({r["id"] for r in walked}) == 17
+        keys = [(r["consumed_at"], r["id"]) for r in walked]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_shopping_unpaginated_by_default(self, client):
+        body = client.get("/api/shopping/?show_purchased=true").json()
+        assert body["count"] == 11 and "next_cursor" not in body
+
+    def test_shopping_cursor_walk(self, client):
+        full = client.get("/api/shopping/?show_purchased=true").json()["items"]
+        walked = _walk(client, "/api/shopping/?show_purchased=true&limit=3", "items")
+        assert sorted(i["id"] for i in walked) == sorted(i["id"] for i in full)
+        assert [i["is_purchased"] for i in walked] == sorted(i["is_purchased"] for i in walked)
+
+    def test_recipes_cursor_walk(self, client):
+        db = database.get_db()
+        try:
+            db.executemany("INSERT INTO recipes (title) VALUES (?)", [(f"Recette {i}",) for i in range(7)])
+            db.commit()
+        finally:
+            db.close()
+        walked = _walk(client, "/api/recipes/?limit=3&with_total=true", "recipes")
+        assert [r["id"] for r in walked] == list(range(7, 0, -1))
@@ -0,0 +1,128 @@
+"""
+Tests du miroir local TheMealDB (synchronisation incrémentale sur serveur simulé).
+"""
+
+import json
+
+import pytest
+
+from server.services import recipe_service, mealdb_mirror
+from stub_http import StubServer
+
+
+def _meal(meal_id: str, title: str, category: str, ingredients: list[tuple[str, str]]) -> dict:
+    meal = {
+        "idMeal": meal_id, "strMeal": title, "strCategory": category, "strArea": "French",
+        "strInstructions": "Cook everything together.", "strMealThumb": f"https://img/{meal_id}.jpg",
+        "strTags": None, "strSource": "",
+    }
+    for i, (name, measure) in enumerate(ingredients, start=1):
+        meal[f"strIngredient{i}"] = name
+        meal[f"strMeasure{i}"] = measure
+    return meal
+
+
+CATALOGUE = {
+    "1": _meal("1", "Chicken Curry", "Chicken", [("Chicken", "500g"), ("Onion", "1")]),
+    "2": _meal("2", "Lemon Chicken", "Chicken", [("Chicken", "4"), ("Lemon", "1")]),
+    "3": _meal("3", "Tomato Soup", "Vegetarian", [("Tomatoes", "6"), ("Water", "1 litre")]),
+}
+
+
+def _routes(catalogue: dict) -> dict:
+    def categories(q):
+        cats = sorted({m["strCategory"] for m in catalogue.values()})
+        return 200, {"meals": [{"strCategory": c} for c in cats]}
+
+    def filter_(q):
+        meals = [{"idMeal": m["idMeal"], "strMeal": m["strMeal"]}
+                 for m in catalogue.values() if m["strCategory"] == q.get("c")]
+        return 200, {"meals": meals or None}
+
+    def lookup(q):
+        meal = catalogue.get(q.get("i"))
+        return 200, {"meals": [meal] if meal else None}
+
+    def translate(q):
+        return 200, {"responseStatus": 200, "responseData": {"translatedText": f"FR {q.get('q')}"}}
+
+    return {
+        "/list.php": categories,
+        "/filter.php": filter_,
+        "/lookup.php": lookup,
+        "/get": translate,
+    }
+
+
+@pytest.fixture
+def stub(tmp_db, monkeypatch):
+    catalogue = dict(CATALOGUE)
+    with StubServer(_routes(catalogue)) as server:
+        monkeypatch.setattr(recipe_service, "MEALDB_CATEGORIES", f"{server.url}/list.php?c=list")
+        monkeypatch.setattr(recipe_service, "MEALDB_FILTER", f"{server.url}/filter.php")
+        monkeypatch.setattr(recipe_service, "MEALDB_LOOKUP", f"{server.url}/lookup.php")
+        monkeypatch.setattr(recipe_service, "MEALDB_SEARCH", f"{server.url}/search.php")
+        monkeypatch.setattr(recipe_service, "TRANSLATION_API", f"{server.url}/get")
+        monkeypatch.setattr(recipe_service, "_online_cache", {})
+        server.catalogue = catalogue
+        yield server
+
+
+class TestMirrorSync:
+    """Tests de la synchronisation."""
+
+    @pytest.mark.asyncio
+    async def test_full_then_incremental_sync(self, stub):
+        first = await mealdb_mirror.sync_mealdb_mirror(concurrency=2)
+        assert first["catalogue"] == 3
+        assert first["fetched"] == 3
+        assert stub.count("/lookup.php") == 3
+        assert mealdb_mirror.mirror_size() == 3
+
+        # Rien de neuf : aucun lookup supplémentaire
+        second = await mealdb_mirror.sync_mealdb_mirror(concurrency=2)
+        assert second["fetched"] == 0
+        assert stub.count("/lookup.php") == 3
+
+        # Une recette ajoutée, une retirée
+        stub.catalogue["4"] = _meal("4", "Beef Stew", "Beef", [("Beef", "1kg")])
+        del stub.catalogue["2"]
+        third = await mealdb_mirror.sync_mealdb_mirror(concurrency=2)
+        assert third["fetched"] == 1
+        assert third["removed"] == 1
+        assert stub.count("/lookup.php") == 4
+        assert mealdb_mirror.mirror_size() == 3
+
+    @pytest.mark.asyncio
+    async def test_stored_recipes_are_translated_and_tagged(self, stub):
+        await mealdb_mirror.sync_mealdb_mirror(translate=True)
+        recipes = mealdb_mirror.mirror_by_category("Vegetarian")
+        assert len(recipes) == 1
+        recipe = recipes[0]
+        assert recipe["title"] == "soupe à la tomate"  # dictionnaire RECIPE_TITLES_FR
+        assert recipe["instructions"].startswith("FR ")
+        assert "végétarien" in json.loads(recipe["diet_tags_json"])
+        assert "tomates" in recipe["ingredients_json"]
+
+
+class TestMirrorQueries:
+    """Les recherches sont servies par le miroir, sans appel réseau."""
+
+    @pytest.mark.asyncio
+    async def test_search_uses_mirror(self, stub):
+        await mealdb_mirror.sync_mealdb_mirror(translate=False)
+        recipes = await recipe_service.search_recipes_online("poulet")
+        titles = sorted(r["title"] for r in recipes)
+        assert titles == ["Chicken Curry", "Lemon Chicken"]
+        assert stub.count("/search.php") == 0
+
+    @pytest.mark.asyncio
+    async def test_category_uses_mirror_and_scales_servings(self, stub):
+        await mealdb_mirror.sync_mealdb_mirror(translate=False)
+        lookups = stub.count("/lookup.php")
+        recipes = await recipe_service.get_recipes_by_category("Chicken", max_results=5, target_servings=8)
+        assert len(recipes) == 2
+        assert all(r["servings"] == 8 for r in recipes)
+        assert stub.count("/lookup.php") == lookups
+        curry = next(r for r in recipes if r["title"] == "Chicken Curry")
+        assert "1000" in curry["ingredients_json"]
@@ -0,0 +1,79 @@
+"""
+Normalisation / traduction TheMealDB : sorties de référence (golden) sur un
+corpus de recettes, et micro-benchmark du traducteur compilé.
+Régénérer la référence : python tests/test_mealdb_translation.py
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.services import recipe_service
+
+FIXTURES = Path(__file__).parent / "fixtures"
+CORPUS = FIXTURES / "mealdb_meals.json"
+GOLDEN = FIXTURES / "mealdb_golden.json"
+SERVINGS = (4, 6, 2, 3)
+RATIOS = (1.0, 1.5, 0.5, 0.75)
+
+
+def _corpus() -> list[dict]:
+    return json.loads(CORPUS.read_text(encoding="utf-8"))["meals"]
+
+
+def _outputs() -> dict:
+    meals = _corpus()
+    names = sorted({(m.get(f"strIngredient{i}") or "").strip() for m in meals for i in range(1, 21)} - {""})
+    measures = sorted({(m.get(f"strMeasure{i}") or "").strip() for m in meals for i in range(1, 21)})
+    normalized = {}
+    for meal in meals:
+        for servings in SERVINGS:
+            recipe = recipe_service._normalize_mealdb(meal, target_servings=servings)
+            normalized[f"{meal['idMeal']}/{servings}"] = {
+                "ingredients": json.loads(recipe["ingredients_json"]),
+                "tags": json.loads(recipe["tags_json"]),
+                "diet_tags": json.loads(recipe["diet_tags_json"]),
+            }
+    return {
+        "ingredient_names": {n: recipe_service._translate_ingredient_name(n) for n in names},
+        "measures": {m: recipe_service._translate_measure(m) for m in measures},
+        "adapted_measures": {
+            f"{m}|{r}": recipe_service._adapt_and_translate_measure(m, r) for m in measures for r in RATIOS
+        },
+        "normalized": normalized,
+    }
+
+
+def test_golden_outputs():
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    outputs = _outputs()
+    for section in golden:
+        mismatches = {k: (v, outputs[section].get(k)) for k, v in golden[section].items()
+                      if outputs[section].get(k) != v}
+        assert not mismatches, f"{section}: {list(mismatches.items())[:5]}"
+
+
+def test_benchmark_normalize_corpus():
+    """Micro-benchmark : corpus complet normalisé 4 fois (cache froid puis chaud)."""
+    meals = _corpus()
+    recipe_service.clear_translation_caches()
+    started = time.perf_counter()
+    for meal in meals:
+        recipe_service._normalize_mealdb(meal, target_servings=6)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(3):
+        for meal in meals:
+            recipe_service._normalize_mealdb(meal, target_servings=6)
+    warm = (time.perf_counter() - started) / 3
+
+    print(f"\nnormalisation de {len(meals)} recettes : froid {cold * 1000:.1f} ms, chaud {warm * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    GOLDEN.write_text(json.dumps(_outputs(), ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    print(f"Référence écrite : {GOLDEN}")
@@ -0,0 +1,98 @@
+"""
+Tests de l'analyseur de quantités et de son usage (ingrédients, stocks, courses).
+"""
+
+import json
+
+import pytest
+
+from server import database
+from server.services import recipe_service
+from server.services.quantity import parse_quantity, parse_amount, convert, compatible, annotate_ingredients
+from server.services.stock_service import find_low_stock
+
+
+class TestParser:
+    @pytest.mark.parametrize("measure, expected", [
+        ("2 c. à soupe", (2, "c. à soupe", 30, "ml", "volume")),
+        ("1 1/2 tasses", (1.5, "tasse", 360, "ml", "volume")),
+        ("1/2 cup", (0.5, "tasse", 120, "ml", "volume")),
+        ("3/4 c. à café", (0.75, "c. à café", 3.75, "ml", "volume")),
+        ("250g", (250, "g", 250, "g", "mass")),
+        ("2,5 kg", (2.5, "kg", 2500, "g", "mass")),
+        ("3 gousses", (3, "gousse", 3, "gousse", "count")),
+        ("1½ cups", (1.5, "tasse", 360, "ml", "volume")),
+        ("2-3 cloves", (3, "gousse", 3, "gousse", "count")),
+        ("pincée", (1, "pincée", 0.3, "ml", "volume")),
+        ("2 large", (2, "unité", 2, "unité", "count")),
+        ("4 oz", (4, "once", 113.4, "g", "mass")),
+    ])
+    def test_parse(self, measure, expected):
+        q = parse_quantity(measure)
+        assert (q.amount, q.unit, round(q.value, 3), q.canonical_unit, q.dimension) == expected
+
+    @pytest.mark.parametrize("measure", ["", "selon le goût", "à servir", "Juice of 1"])
+    def test_unparsed(self, measure):
+        assert parse_quantity(measure) is None
+
+    def test_amounts(self):
+        assert parse_amount("1 1/2") == 1.5
+        assert parse_amount("2,5") == 2.5
+        assert parse_amount("1/0") is None and parse_amount("abc") is None
+
+    def test_conversions(self):
+        assert convert(1.5, "kg", "g") == 1500
+        assert convert(2, "c. à soupe", "mL") == 30
+        assert convert(3, "botte de", "Botte de") == 3
+        assert compatible("", "unité") and not compatible("g", "L")
+        with pytest.raises(ValueError):
+            convert(1, "g", "gousse")
+
+
+class TestIngest:
+    def test_mealdb_ingredients_carry_parsed_quantity(self):
+        meal = {"strMeal": "Test", "strIngredient1": "Butter", "strMeasure1": "2 tbsp",
+                "strIngredient2": "Salt", "strMeasure2": "to taste"}
+        ingredients = json.loads(recipe_service._normalize_mealdb(meal, target_servings=6)["ingredients_json"])
+        assert ingredients[0]["measure"] == "3 c. à soupe"
+        assert ingredients[0]["qty"] == {"amount": 3.0, "unit": "c. à soupe", "value": 45.0,
+                                         "canonical_unit": "ml", "dimension": "volume"}
+        assert "qty" not in ingredients[1]
+
+    def test_annotate_replaces_stale_quantity(self):
+        ingredients = annotate_ingredients([{"name": "sel", "measure": "", "qty": {"amount": 1}}])
+        assert "qty" not in ingredients[0]
+
+    def test_imported_and_local_recipes_carry_parsed_quantity(self, client):
+        export = {"recipes": [{"title": "Crêpes",
+                               "ingredients_json": json.dumps([{"name": "Lait", "measure": "1/2 L"}])}]}
+        client.post("/api/export/import/json", files={"file": ("export.json", json.dumps(export))})
+        stored = json.loads(client.get("/api/recipes/").json()["recipes"][0]["ingredients_json"])
+        assert stored[0]["qty"]["value"] == 500
+
+        local = recipe_service.load_local_recipes()[0]
+        assert any("qty" in ing for ing in json.loads(local["ingredients_json"]))
+
+
+class TestUnitAware:
+    def test_stock_converts_units(self, client):
+        db = database.get_db()
+        try:
+            db.execute("INSERT INTO stock_minimums (product_name, min_quantity, unit) VALUES ('Riz', 1, 'kg')")
+            db.executemany("INSERT INTO fridge_items (name, quantity, unit) VALUES (?, ?, ?)",
+                           [("riz", 500, "g"), ("Riz", 0.3, "kg")])
+            db.commit()
+            low = find_low_stock(db)
+            assert low[0]["current"] == 0.8
+            db.execute("INSERT INTO fridge_items (name, quantity, unit) VALUES ('riz', 250, 'g')")
+            db.commit()
+            assert find_low_stock(db) == []
+        finally:
+            db.close()
+
+    def test_shopping_merges_compatible_units(self, client):
+        client.post("/api/shopping/", json={"product_name": "Farine", "quantity": 500, "unit": "g"})
+        client.post("/api/shopping/", json={"product_name": "farine", "quantity": 1, "unit": "kg"})
+        client.post("/api/shopping/", json={"product_name": "Farine", "quantity": 2, "unit": "sachet"})
+        items = {i["unit"]: i["quantity"] for i in client.get("/api/shopping/").json()["items"]}
+        assert items == {"g": 1500, "sachet": 2}
@@ -0,0 +1,98 @@
+"""
+Tests de la réserve persistante de recettes aléatoires.
+"""
+
+import json
+
+import pytest
+
+from server.database import get_db
+from server.services import recipe_reservoir as reservoir
+
+
+def _recipe(title: str, ingredients: list[str]) -> dict:
+    return {
+        "title": title,
+        "ingredients_json": json.dumps([{"name": i, "measure": ""} for i in ingredients]),
+        "instructions": "Mélanger et servir.",
+        "servings": 4,
+    }
+
+
+def _seed(recipes: list[dict], servings: int = 4):
+    db = get_db()
+    try:
+        db.executemany(
+            "INSERT INTO recipe_reservoir (title_key, target_servings, recipe_json) VALUES (?, ?, ?)",
+            [(r["title"].lower(), servings, json.dumps(r)) for r in recipes]
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class TestTakeRandom:
+    """Tests du tirage dans la réserve."""
+
+    def test_empty_reservoir_returns_nothing(self, tmp_db):
+        assert reservoir.take_random_recipes(5) == []
+
+    def test_take_consumes_served_recipes(self, tmp_db):
+        _seed([_recipe(f"Salade {i}", ["tomate"]) for i in range(20)])
+        picked = reservoir.take_random_recipes(5)
+        assert len(picked) == 5
+        assert reservoir.reservoir_size() == 15
+        assert all("_reservoir_id" not in r for r in picked)
+
+    def test_take_without_consume_keeps_rows(self, tmp_db):
+        _seed([_recipe(f"Soupe {i}", ["carotte"]) for i in range(10)])
+        reservoir.take_random_recipes(4, consume=False)
+        assert reservoir.reservoir_size() == 10
+
+    def test_diet_and_banned_filters(self, tmp_db):
+        _seed([_recipe("Poulet rôti", ["poulet"]), _recipe("Gratin", ["courgette"]),
+               _recipe("Tarte", ["pomme"])])
+        picked = reservoir.take_random_recipes(3, diets=["végétarien"], banned_titles={"tarte"})
+        assert [r["title"] for r in picked] == ["Gratin"]
+        # La recette incompatible est retirée, la bannie reste disponible
+        assert reservoir.reservoir_size() == 1
+
+    def test_servings_are_separated(self, tmp_db):
+        _seed([_recipe("Curry", ["riz"])], servings=2)
+        assert reservoir.take_random_recipes(1, target_servings=4) == []
+        assert len(reservoir.take_random_recipes(1, target_servings=2)) == 1
+
+
+class TestTopUp:
+    """Tests du complément en tâche de fond."""
+
+    @pytest.mark.asyncio
+    async def test_top_up_stops_at_high_water(self, tmp_db, monkeypatch):
+        counter = {"n": 0}
+
+        async def fake_random(count, target_servings=4):
+            batch = []
+            for _ in range(count):
+                counter["n"] += 1
+                batch.append(_recipe(f"Recette {counter['n']}", ["oignon"]))
+            return batch
+
+        async def fake_translate(recipe):
+            recipe["title"] = recipe["title"] + " (fr)"
+            return recipe
+
+        monkeypatch.setattr(reservoir, "get_random_recipes", fake_random)
+        monkeypatch.setattr(reservoir, "_translate_recipe_async", fake_translate)
+        monkeypatch.setattr(reservoir, "HIGH_WATER", 20)
+        monkeypatch.setattr(reservoir, "BATCH_SIZE", 8)
+
+        result = await reservoir.top_up_reservoir()
+        assert result["size"] == 20
+        assert result["added"] == 20
+
+        again = await reservoir.top_up_reservoir()
+        assert again["added"] == 0
+        assert again["batches"] == 0
+
+        picked = reservoir.take_random_recipes(1)
+        assert picked[0]["title"].endswith("(fr)")
@@ -0,0 +1,129 @@
+"""
+Magasin de recettes : clés de contenu stables, listes résumées, fiche par
+clé (durée de vie, repli sur les recettes sauvegardées), sauvegarde et
+bannissement par clé.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server.database import get_db
+from server.main import app
+from server.routers import recipes as recipes_router
+from server.services import recipe_store
+
+
+RANDOM_URL = "/api/recipes/suggest/random?max_results=3"
+
+
+def _recipe(title, instructions="Couper, cuire, servir. " * 40):
+    return {
+        "title": title,
+        "ingredients_json": json.dumps([{"name": "Tomate", "measure": "3"}, {"name": "Oignon", "measure": "1"}]),
+        "instructions": instructions,
+        "prep_time": 10, "cook_time": 20, "servings": 4,
+        "source_url": "", "image_url": f"https://img.example/{title}.jpg",
+        "tags_json": "[]", "diet_tags_json": "[]",
+    }
+
+
+@pytest.fixture
+def random_recipes(monkeypatch):
+    catalogue = [_recipe("Ratatouille"), _recipe("Soupe à l'oignon"), _recipe("Tarte tomate")]
+    monkeypatch.setattr(recipes_router, "take_random_recipes", lambda count, *a, **k: [dict(r) for r in catalogue])
+    monkeypatch.setattr(recipes_router, "request_top_up", lambda *a, **k: None)
+    monkeypatch.setattr(recipes_router.rnd, "shuffle", lambda items: None)
+    return catalogue
+
+
+def test_recipe_key_is_content_addressed():
+    recipe = _recipe("Ratatouille")
+    key = recipe_store.recipe_key(recipe)
+    assert len(key) == recipe_store.KEY_LENGTH
+    assert recipe_store.recipe_key(dict(recipe, match_score=80, missing_ingredients=["sel"])) == key
+    assert recipe_store.recipe_key(dict(reversed(list(recipe.items())))) == key
+    assert recipe_store.recipe_key(dict(recipe, instructions="Autre")) != key
+    assert recipe_store.recipe_key(dict(recipe, servings=2)) != key
+
+
+def test_list_returns_summaries_and_details_by_key(tmp_db, random_recipes):
+    client = TestClient(app)
+    full = client.get(RANDOM_URL + "&summary=false").json()["recipes"]
+    summaries = client.get(RANDOM_URL).json()["recipes"]
+
+    assert [s["title"] for s in summaries] == [r["title"] for r in random_recipes]
+    assert all("instructions" not in s and "ingredients_json" not in s for s in summaries)
+    assert [s["key"] for s in summaries] == [r["key"] for r in full]
+    assert len(json.dumps(summaries)) * 5 < len(json.dumps(full))
+
+    detail = client.get(f"/api/recipes/by-key/{summaries[0]['key']}").json()["recipe"]
+    assert detail["instructions"] == random_recipes[0]["instructions"]
+    assert detail["key"] == summaries[0]["key"]
+    assert client.get("/api/recipes/by-key/inconnue").status_code == 404
+
+    fields = client.get(RANDOM_URL + "&fields=key,title").json()["recipes"]
+    assert set(fields[0]) == {"key", "title"}
+
+
+def test_store_ttl_and_prune(tmp_db, random_recipes):
+    client = TestClient(app)
+    key = client.get(RANDOM_URL).json()["recipes"][0]["key"]
+    db = get_db()
+    try:
+        db.execute("UPDATE recipe_store SET stored_at = stored_at - ?", (recipe_store.RECIPE_STORE_TTL + 60,))
+        db.commit()
+    finally:
+        db.close()
+    assert client.get(f"/api/recipes/by-key/{key}").status_code == 404
+    assert recipe_store.prune_recipe_store() == len(random_recipes)
+
+    # Réapparition dans une liste : fiche de nouveau disponible, même clé
+    assert client.get(RANDOM_URL).json()["recipes"][0]["key"] == key
+    assert client.get(f"/api/recipes/by-key/{key}").status_code == 200
+
+
+def test_save_and_ban_by_key(tmp_db, random_recipes):
+    client = TestClient(app)
+    first, second = client.get(RANDOM_URL).json()["recipes"][:2]
+
+    saved = client.post(f"/api/recipes/by-key/{first['key']}/save").json()
+    assert saved["success"] is True
+    again = client.post(f"/api/recipes/by-key/{first['key']}/save").json()
+    assert again["id"] == saved["id"] and "déjà" in again["message"]
+    row = client.get("/api/recipes/").json()["recipes"][0]
+    assert row["title"] == "Ratatouille" and row["recipe_key"] == first["key"]
+    assert json.loads(row["ingredients_json"])[0]["name"] == "Tomate"
+
+    # Fiche expirée du magasin : repli sur la recette sauvegardée
+    recipe_store.prune_recipe_store(ttl=-1)
+    assert client.get(f"/api/recipes/by-key/{first['key']}").json()["recipe"]["id"] == saved["id"]
+
+    client.get(RANDOM_URL)
+    assert client.post("/api/recipes/ban", json={"key": second["key"]}).json()["success"] is True
+    banned = client.get("/api/recipes/banned").json()["recipes"]
+    assert banned[0]["title"] == "Soupe à l'oignon" and banned[0]["recipe_key"] == second["key"]
+    assert client.post("/api/recipes/ban", json={"key": "inconnue"}).status_code == 404
+
+
+def test_manual_recipe_gets_key(tmp_db):
+    client = TestClient(app)
+    new_id = client.post("/api/recipes/", json=_recipe("Gratin")).json()["id"]
+    row = client.get("/api/recipes/").json()["recipes"][0]
+    assert row["id"] == new_id and row["recipe_key"] == recipe_store.recipe_key(row)
+    assert client.get(f"/api/recipes/by-key/{row['recipe_key']}").json()["recipe"]["title"] == "Gratin"
+
+
+def test_imported_and_demo_recipes_get_key(tmp_db, monkeypatch):
+    client = TestClient(app)
+    export = {"recipes": [_recipe("Crumble")]}
+    client.post("/api/export/import/json", files={"file": ("export.json", json.dumps(export))})
+    client.post("/api/settings/generate-demo")
+    rows = client.get("/api/recipes/").json()["recipes"]
+    assert len(rows) > 1 and all(row["recipe_key"] == recipe_store.recipe_key(row) for row in rows)
+
+    # Lecture par clé : plus de rattrapage des clés manquantes dans un GET
+    monkeypatch.setattr(recipe_store, "ensure_recipe_keys", lambda db: pytest.fail("rattrapage dans un GET"))
+    crumble = next(row for row in rows if row["title"] == "Crumble")
+    assert client.get(f"/api/recipes/by-key/{crumble['recipe_key']}").json()["recipe"]["id"] == crumble["id"]
@@ -0,0 +1,104 @@
+"""
+Tests du planificateur de tâches de fond (file persistante, heures creuses).
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from server.database import get_db
+from server.services import scheduler as sched
+
+
+class TestQuietHours:
+    """Tests des heures creuses."""
+
+    def test_parse_quiet_hours(self):
+        assert sched.parse_quiet_hours("23-7") == (23, 7)
+        assert sched.parse_quiet_hours("") is None
+        assert sched.parse_quiet_hours("25-3") is None
+        assert sched.parse_quiet_hours("abc") is None
+
+    def test_quiet_window_across_midnight(self):
+        assert sched.is_quiet_time("23-7", datetime(2025, 1, 1, 2, 0))
+        assert sched.is_quiet_time("23-7", datetime(2025, 1, 1, 23, 30))
+        assert not sched.is_quiet_time("23-7", datetime(2025, 1, 1, 12, 0))
+
+    def test_quiet_window_same_day(self):
+        assert sched.is_quiet_time("13-15", datetime(2025, 1, 1, 14, 0))
+        assert not sched.is_quiet_time("13-15", datetime(2025, 1, 1, 15, 0))
+
+
+class TestJobQueue:
+    """Tests de la file persistante."""
+
+    def test_enqueue_deduplicates_pending(self, tmp_db):
+        first = sched.enqueue_job("prefetch_search", {"names": ["Tomate"]})
+        second = sched.enqueue_job("prefetch_search", {"names": ["Tomate"]})
+        assert first == second
+
+    @pytest.mark.asyncio
+    async def test_tick_runs_pending_job(self, tmp_db, monkeypatch):
+        calls = []
+
+        async def fake_prefetch(payload, config):
+            calls.append(payload["names"])
+            return {"names": len(payload["names"])}
+
+        monkeypatch.setitem(sched.JOB_HANDLERS, "prefetch_search", fake_prefetch)
+        monkeypatch.setattr(sched, "PERIODIC_JOBS", {})
+        job_id = sched.enqueue_job("prefetch_search", {"names": ["Tomate"]})
+
+        runner = sched.Scheduler()
+        await runner.tick()
+        for task in list(runner._running):
+            await task
+
+        db = get_db()
+        try:
+            row = db.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            db.close()
+        assert calls == [["Tomate"]]
+        assert row["status"] == "done"
+        assert json.loads(row["result_json"])["names"] == 1
+
+    @pytest.mark.asyncio
+    async def test_quiet_hours_pause_jobs(self, tmp_db, monkeypatch):
+        monkeypatch.setattr(sched, "is_quiet_time", lambda value, now=None: True)
+        job_id = sched.enqueue_job("refresh_random")
+
+        runner = sched.Scheduler()
+        await runner.tick()
+
+        db = get_db()
+        try:
+            status = db.execute("SELECT status FROM background_jobs WHERE id = ?", (job_id,)).fetchone()["status"]
+        finally:
+            db.close()
+        assert runner.quiet
+        assert status == "pending"
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_retried_then_failed(self, tmp_db, monkeypatch):
+        async def boom(payload, config):
+            raise RuntimeError("API indisponible")
+
+        monkeypatch.setitem(sched.JOB_HANDLERS, "refresh_random", boom)
+        monkeypatch.setattr(sched, "PERIODIC_JOBS", {})
+        job_id = sched.enqueue_job("refresh_random")
+
+        runner = sched.Scheduler()
+        for _ in range(sched.MAX_ATTEMPTS):
+            await runner.tick()
+            for task in list(runner._running):
+                await task
+
+        db = get_db()
+        try:
+            row = db.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            db.close()
+        assert row["attempts"] == sched.MAX_ATTEMPTS
+        assert row["status"] == "failed"
@@ -0,0 +1,64 @@
+"""
+Produits de saison : index par mois (jetons canoniques), rechargement sur
+modification du fichier, et vérification par lot.
+"""
+
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server.main import app
+from server.services import seasonal_service
+
+
+@pytest.fixture
+def seasonal_file(tmp_path, monkeypatch):
+    path = tmp_path / "seasonal_products.json"
+    path.write_text(json.dumps({
+        "1": [{"name": "Poireau"}, {"name": "Chou-fleur"}, {"name": "Pomme"}],
+        "7": [{"name": "Tomate"}, {"name": "Courgette"}],
+    }), encoding="utf-8")
+    monkeypatch.setattr(seasonal_service, "SEASONAL_PATH", path)
+    return path
+
+
+@pytest.mark.parametrize("name, month, expected", [
+    ("Poireaux bio", 1, True),
+    ("chou", 1, True),
+    ("Pommes de terre", 1, True),
+    ("Tomates cerises", 1, False),
+    ("Tomates cerises", 7, True),
+    ("tomatoes", 7, True),
+    ("", 7, False),
+])
+def test_is_seasonal(seasonal_file, name, month, expected):
+    assert seasonal_service.is_seasonal(name, month) is expected
+
+
+def test_file_loaded_once_and_reloaded_on_change(seasonal_file, monkeypatch):
+    assert len(seasonal_service.get_seasonal_products(7)) == 2
+    calls = []
+    real_load = json.load
+    monkeypatch.setattr(seasonal_service.json, "load", lambda f: calls.append(1) or real_load(f))
+    for _ in range(5):
+        seasonal_service.is_seasonal("Courgette", 7)
+    assert calls == []
+
+    seasonal_file.write_text(json.dumps({"7": [{"name": "Melon"}]}), encoding="utf-8")
+    stat = seasonal_file.stat()
+    os.utime(seasonal_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert seasonal_service.is_seasonal("Melon", 7) and not seasonal_service.is_seasonal("Courgette", 7)
+    assert calls == [1]
+
+
+def test_batch_endpoint(seasonal_file):
+    client = TestClient(app)
+    resp = client.post("/api/seasonal/check", json={"names": ["Tomates", "Riz", "Tomates"], "month": 7})
+    body = resp.json()
+    assert body["seasonal_count"] == 1
+    assert body["results"]["Tomates"] == {"is_seasonal": True, "product": {"name": "Tomate"}}
+    assert body["results"]["Riz"]["is_seasonal"] is False
+    assert client.post("/api/seasonal/check", json={"names": [], "month": 7}).status_code == 422
+    assert client.post("/api/seasonal/check", json={"names": ["x"], "month": 13}).status_code == 422
@@ -0,0 +1,96 @@
+"""
+Tests des agrégats journaliers de consommation (consumption_daily).
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from server import database
+
+
+def _seed_history(n: int = 300, seed: int = 7):
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for _ in range(n):
+        day = today - timedelta(days=rng.randint(0, 90))
+        rows.append((
+            rng.choice(["Lait", "Yaourt", "Pomme", "Pâtes", "Jambon"]),
+            rng.choice(["produits_laitiers", "fruits", "feculents", None]),
+            rng.choice([1, 2, 0.5]),
+            f"{day.isoformat()} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+            rng.choice(["Famille", "Alice", "Bob"]),
+        ))
+    db = database.get_db()
+    try:
+        db.executemany(
+            "INSERT INTO consumption_history (product_name, category, quantity, consumed_at, user_name) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class TestConsumptionRollup:
+    """Le résumé calculé sur les agrégats égale le calcul sur l'historique brut."""
+
+    def test_backfill_on_init(self, tmp_db):
+        _seed_history()
+        database.init_db()  # migration : agrégats absents -> recalcul
+        db = database.get_db()
+        try:
+            total = db.execute("SELECT SUM(count) AS c FROM consumption_daily").fetchone()["c"]
+            assert total == 300
+        finally:
+            db.close()
+
+    def test_summary_matches_raw_history(self, client):
+        _seed_history()
+        database.init_db()
+        body = client.get("/api/stats/summary?days=30").json()
+
+        since = (date.today() - timedelta(days=30)).isoformat()
+        db = database.get_db()
+        try:
+            expected_total = db.execute(
+                "SELECT COUNT(*) AS c FROM consumption_history WHERE consumed_at >= ?", (since,)
+            ).fetchone()["c"]
+            expected_cat = {
+                r["category"]: (r["count"], r["total_qty"]) for r in db.execute(
+                    "SELECT category, COUNT(*) as count, SUM(quantity) as total_qty FROM consumption_history "
+                    "WHERE consumed_at >= ? GROUP BY category", (since,)
+                ).fetchall()
+            }
+            expected_days = {
+                r["w"]: r["count"] for r in db.execute(
+                    "SELECT CAST(strftime('%w', consumed_at) AS INTEGER) AS w, COUNT(*) AS count "
+                    "FROM consumption_history WHERE consumed_at >= ? GROUP BY w", (since,)
+                ).fetchall()
+            }
+            expected_months = {
+                r["month"]: r["count"] for r in db.execute(
+                    "SELECT strftime('%Y-%m', consumed_at) as month, COUNT(*) as count "
+                    "FROM consumption_history GROUP BY month"
+                ).fetchall()
+            }
+        finally:
+            db.close()
+
+        assert body["total_consumed"] == expected_total
+        assert {c["category"]: (c["count"], pytest.approx(c["total_qty"])) for c in body["by_category"]} == expected_cat
+        from server.routers.stats import DAY_NAMES
+        assert {DAY_NAMES.index(d["day_name"]): d["count"] for d in body["by_day_of_week"]} == expected_days
+        assert {m["month"]: m["count"] for m in body["by_month"]} == expected_months
+
+    def test_consume_updates_rollup(self, client):
+        item = client.post("/api/fridge/", json={"name": "Beurre", "category": "produits_laitiers", "quantity": 2}).json()
+        item_id = item["item"]["id"]
+        client.post(f"/api/fridge/{item_id}/consume?user_name=Alice")
+
+        body = client.get("/api/stats/summary").json()
+        assert body["total_consumed"] == 1
+        assert body["top_products"] == [{"product_name": "Beurre", "count": 1}]
+        assert body["by_category"][0]["total_qty"] == 2
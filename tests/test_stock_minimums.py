@@ -0,0 +1,87 @@
+"""
+Tests de la vérification ensembliste des stocks minimum.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import database
+from server.main import app
+from server.services.stock_service import find_low_stock, LOW_STOCK_SQL
+
+
+@pytest.fixture
+def db(tmp_db):
+    conn = database.get_db()
+    conn.executemany(
+        "INSERT INTO stock_minimums (product_name, category, min_quantity, unit) VALUES (?, ?, ?, ?)",
+        [("Lait", "produits_laitiers", 2, "L"), ("oeufs", "autre", 6, "unité"),
+         ("Beurre", "produits_laitiers", 1, "unité"), ("Riz", "feculents", 1, "kg")]
+    )
+    conn.executemany(
+        "INSERT INTO fridge_items (name, quantity, status) VALUES (?, ?, ?)",
+        [("lait", 1, "active"), ("LAIT", 0.5, "active"), ("Lait", 5, "consumed"),
+         ("Oeufs", 12, "active"), ("beurre", 0.5, "active")]
+    )
+    conn.execute("INSERT INTO shopping_list (product_name, is_purchased) VALUES ('BEURRE', 0)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+class TestLowStock:
+    """Comparaison insensible à la casse, en requêtes groupées."""
+
+    def test_find_low_stock(self, db):
+        low = {r["product_name"]: r for r in find_low_stock(db)}
+        assert set(low) == {"Lait", "Beurre", "Riz"}
+        assert low["Lait"]["current"] == 1.5
+        assert low["Riz"]["current"] == 0
+        assert low["Beurre"]["on_list"] and not low["Lait"]["on_list"]
+
+    def test_check_stocks_endpoint_adds_missing_once(self, db):
+        client = TestClient(app)
+        body = client.post("/api/shopping/check-stocks").json()
+        assert body["count"] == 3
+        items = client.get("/api/shopping/").json()["items"]
+        names = sorted(i["product_name"] for i in items)
+        assert names == ["BEURRE", "Lait", "Riz"]
+        assert next(i for i in items if i["product_name"] == "Lait")["quantity"] == 0.5
+
+        client.post("/api/shopping/check-stocks")
+        assert client.get("/api/shopping/").json()["count"] == 3
+
+    def test_constant_round_trips(self, db):
+        db.executemany(
+            "INSERT INTO stock_minimums (product_name, min_quantity) VALUES (?, 1)",
+            [(f"Produit {i}",) for i in range(3000)]
+        )
+        db.commit()
+        statements = []
+        db.set_trace_callback(statements.append)
+        low = find_low_stock(db)
+        db.set_trace_callback(None)
+        assert len(low) == 3003
+        assert len(statements) == 1
+
+    def test_consume_reports_stock_alert(self, db):
+        client = TestClient(app)
+        item_id = db.execute("SELECT id FROM fridge_items WHERE name = 'Oeufs'").fetchone()["id"]
+        alert = client.post(f"/api/fridge/{item_id}/consume").json()["stock_alert"]
+        assert alert["current"] == 0 and alert["minimum"] == 6
+
+    def test_add_shopping_item_merges_case_insensitively(self, db):
+        client = TestClient(app)
+        client.post("/api/shopping/", json={"product_name": "beurre", "quantity": 2})
+        items = client.get("/api/shopping/").json()["items"]
+        assert len(items) == 1 and items[0]["quantity"] == 3
+
+    def test_query_plans_use_nocase_indexes(self, db):
+        database.init_db()  # ANALYZE
+        plan = " | ".join(r[3] for r in db.execute("EXPLAIN QUERY PLAN " + LOW_STOCK_SQL.format(where="")))
+        assert "idx_fridge_active_name_nocase" in plan
+        assert "idx_shopping_pending_name" in plan
+        plan = " | ".join(r[3] for r in db.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM shopping_list WHERE product_name = ? COLLATE NOCASE AND is_purchased = 0",
+            ("x",)))
+        assert "idx_shopping_pending_name" in plan
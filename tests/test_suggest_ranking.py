@@ -0,0 +1,121 @@
+"""
+Classement des suggestions : le tas borné avec élagage rend exactement le
+même top-k que le tri complet, et micro-benchmark sur un gros corpus synthétique.
+"""
+
+import json
+import random
+import time
+
+import pytest
+
+from server.services import ingredient_tokens
+from server.services.recipe_service import compute_match_score, rank_recipes, preference_weights
+
+POOL = [
+    "Tomates", "Oignon", "Ail", "Poulet", "Bœuf haché", "Riz", "Pâtes", "Carottes", "Courgette",
+    "Poivron rouge", "Champignons", "Crème fraîche", "Beurre", "Lait", "Œufs", "Farine", "Sucre",
+    "Citron", "Persil", "Basilic", "Parmesan", "Mozzarella", "Épinards", "Pommes de terre",
+    "Lardons", "Saumon", "Thon", "Crevettes", "Haricots verts", "Lentilles", "Pois chiches",
+    "Chou", "Poireaux", "Aubergine", "Concombre", "Avocat", "Gingembre", "Coriandre", "Cumin",
+    "sel", "poivre", "huile d'olive", "chicken", "tomatoes", "rice", "butter", "eggs",
+]
+FRIDGE = [{"name": n} for n in ("Tomates cerises", "Oignons", "Poulet", "Riz basmati", "Œufs", "Beurre",
+                                "Lait", "Courgettes", "Citron", "Parmesan", "Carotte", "Crème fraîche")]
+
+
+def _corpus(size: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(size):
+        ingredients = [{"name": n, "measure": ""} for n in rng.sample(POOL, rng.randint(3, 12))]
+        recipe = {"title": f"Recette {i}", "ingredients_json": json.dumps(ingredients)}
+        recipes.append(ingredient_tokens.with_ingredient_tokens(recipe))
+    return recipes
+
+
+def _full_sort(recipes: list[dict], k: int, min_score: float) -> list[tuple]:
+    """Référence : tout scorer, trier, couper (ancien comportement de /suggest)."""
+    fridge_index = ingredient_tokens.fridge_tokens(FRIDGE)
+    scored = []
+    for recipe in recipes:
+        score, missing = compute_match_score(recipe["ingredients_json"], FRIDGE,
+                                             recipe.get("ingredient_tokens_json"), fridge_index)
+        if score >= min_score:
+            scored.append((recipe["title"], score, missing))
+    scored.sort(key=lambda r: r[1], reverse=True)
+    return scored[:k]
+
+
+@pytest.mark.parametrize("k, min_score", [(10, 20.0), (1, 0.0), (25, 50.0), (500, 0.0), (10, 101.0)])
+def test_same_top_k_as_full_sort(k, min_score):
+    recipes = _corpus(600)
+    expected = _full_sort(recipes, k, min_score)
+    ranked = rank_recipes([dict(r) for r in recipes], FRIDGE, k, min_score)
+    assert [(r["title"], r["match_score"], r["missing_ingredients"]) for r in ranked] == expected
+
+
+def test_recipes_without_ingredients_and_stale_tokens():
+    recipes = [{"title": "Vide", "ingredients_json": "[]"},
+               {"title": "Omelette", "ingredients_json": json.dumps([{"name": "Œufs"}]),
+                "ingredient_tokens_json": "[]"}]
+    ranked = rank_recipes(recipes, FRIDGE, 5)
+    assert [(r["title"], r["match_score"]) for r in ranked] == [("Omelette", 100.0), ("Vide", 0.0)]
+    assert rank_recipes(recipes, FRIDGE, 0) == []
+
+
+def test_preference_weights():
+    fridge = [{"name": "Yaourt nature", "dlc_days_left": 0}, {"name": "Courgettes", "dlc_days_left": 3},
+              {"name": "Lait", "dlc_days_left": 20}, {"name": "Jambon", "dlc_days_left": -2}, {"name": "Riz"}]
+    assert preference_weights(fridge, True, False) == {"yaourt": 15.0, "nature": 15.0, "courgette": 10.0}
+    seasonal = preference_weights(fridge, True, True, month=1)
+    assert seasonal["poireau"] == 5.0 and seasonal["courgette"] == 10.0
+    assert preference_weights(fridge, False, False) == {}
+
+
+def test_weighted_ranking_prefers_urgent_and_seasonal():
+    recipes = [{"title": t, "ingredients_json": json.dumps([{"name": n}, {"name": "Farine"}])}
+               for t, n in (("Riz", "Riz"), ("Yaourt", "Yaourt"), ("Poireaux", "Poireaux"))]
+    fridge = [{"name": "Riz", "dlc_days_left": None}, {"name": "Yaourt", "dlc_days_left": 1},
+              {"name": "Poireau", "dlc_days_left": 30}]
+    plain = rank_recipes([dict(r) for r in recipes], fridge, 3)
+    assert [r["title"] for r in plain] == ["Riz", "Yaourt", "Poireaux"]
+
+    weights = preference_weights(fridge, True, True, month=1)
+    ranked = rank_recipes([dict(r) for r in recipes], fridge, 3, weights=weights)
+    assert [(r["title"], r["match_score"], r["weighted_score"]) for r in ranked] == [
+        ("Yaourt", 50.0, 65.0), ("Poireaux", 50.0, 55.0), ("Riz", 50.0, 50.0)]
+
+
+@pytest.mark.parametrize("k", [1, 10, 40])
+def test_weighted_top_k_matches_unpruned_ranking(k):
+    recipes = _corpus(800, seed=11)
+    fridge = [dict(item, dlc_days_left=i % 9) for i, item in enumerate(FRIDGE)]
+    weights = preference_weights(fridge, True, True, month=6)
+    expected = rank_recipes([dict(r) for r in recipes], fridge, len(recipes), 20.0, weights)[:k]
+    ranked = rank_recipes([dict(r) for r in recipes], fridge, k, 20.0, weights)
+    assert [(r["title"], r["weighted_score"]) for r in ranked] == \
+        [(r["title"], r["weighted_score"]) for r in expected]
+
+
+def test_benchmark_rank_large_corpus():
+    """Micro-benchmark : 20 000 recettes, top 10 (tas + élagage) contre tri complet."""
+    recipes = _corpus(20000)
+
+    started = time.perf_counter()
+    expected = _full_sort(recipes, 10, 20.0)
+    full = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ranked = rank_recipes(recipes, FRIDGE, 10, 20.0)
+    heap = time.perf_counter() - started
+
+    fridge = [dict(item, dlc_days_left=i % 9) for i, item in enumerate(FRIDGE)]
+    started = time.perf_counter()
+    weighted = rank_recipes(recipes, fridge, 10, 20.0, preference_weights(fridge, True, True, month=6))
+    weighted_time = time.perf_counter() - started
+
+    print(f"\nclassement de {len(recipes)} recettes : tri complet {full * 1000:.0f} ms, "
+          f"tas borné {heap * 1000:.0f} ms, pondéré {weighted_time * 1000:.0f} ms")
+    assert [r["title"] for r in ranked] == [e[0] for e in expected]
+    assert len(weighted) == 10
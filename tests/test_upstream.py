@@ -0,0 +1,110 @@
+"""
+Tests des disjoncteurs par service externe (serveur simulé).
+"""
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from server.services import upstream, recipe_service
+from stub_http import StubServer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(upstream, "_clock", fake)
+    return fake
+
+
+@pytest.fixture
+def flaky():
+    state = {"status": 500}
+    with StubServer({"/api": lambda q: (state["status"], {"ok": state["status"] == 200})}) as server:
+        server.state = state
+        yield server
+
+
+async def _call(server, name="themealdb"):
+    async with httpx.AsyncClient(timeout=2) as client:
+        return await upstream.upstream_get(client, name, f"{server.url}/api")
+
+
+class TestCircuitBreaker:
+    """Ouverture, échec immédiat, essai semi-ouvert, refermeture."""
+
+    @pytest.mark.asyncio
+    async def test_opens_after_error_rate_and_fails_fast(self, flaky, clock):
+        for _ in range(upstream.MIN_CALLS):
+            await _call(flaky)
+        assert upstream.get_breaker("themealdb").state == upstream.OPEN
+
+        with pytest.raises(upstream.CircuitOpenError):
+            await _call(flaky)
+        assert flaky.count("/api") == upstream.MIN_CALLS
+        # Les autres services ne sont pas affectés
+        assert upstream.get_breaker("marmiton").state == upstream.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_on_success(self, flaky, clock):
+        for _ in range(upstream.MIN_CALLS):
+            await _call(flaky)
+        clock.now += upstream.OPEN_SECONDS + 1
+        flaky.state["status"] = 200
+        resp = await _call(flaky)
+        assert resp.status_code == 200
+        assert upstream.get_breaker("themealdb").state == upstream.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_reopens_on_failure(self, flaky, clock):
+        for _ in range(upstream.MIN_CALLS):
+            await _call(flaky)
+        clock.now += upstream.OPEN_SECONDS + 1
+        await _call(flaky)
+        breaker = upstream.get_breaker("themealdb")
+        assert breaker.state == upstream.OPEN
+        assert breaker.trips == 2
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = upstream.CircuitBreaker("lent", slow_call_seconds=1.0)
+        for _ in range(upstream.MIN_CALLS):
+            breaker.record(False, duration=2.5)
+        assert breaker.state == upstream.OPEN
+
+    def test_client_errors_do_not_trip(self):
+        breaker = upstream.get_breaker("openfoodfacts")
+        for _ in range(upstream.MIN_CALLS * 2):
+            breaker.record(False, duration=0.1)  # 404 : produit inconnu
+        assert breaker.state == upstream.CLOSED
+
+
+class TestFallbacks:
+    """Disjoncteur ouvert : bascule immédiate sur les fallbacks locaux."""
+
+    @pytest.mark.asyncio
+    async def test_search_falls_back_without_network(self, tmp_db, flaky, monkeypatch):
+        monkeypatch.setattr(recipe_service, "MEALDB_SEARCH", f"{flaky.url}/api")
+        monkeypatch.setattr(recipe_service, "_online_cache", {})
+        upstream.get_breaker("themealdb")._trip()
+        upstream.get_breaker("marmiton")._trip()
+
+        recipes = await recipe_service.search_recipes_online("poulet")
+        assert recipes  # recettes Marmiton locales (marmiton_fallback.json)
+        assert flaky.count("/api") == 0
+
+    def test_health_reports_breakers(self, tmp_db):
+        from server.main import app
+
+        upstream.get_breaker("openfoodfacts")._trip()
+        body = TestClient(app).get("/api/health").json()
+        assert body["status"] == "degraded"
+        assert body["upstreams"]["openfoodfacts"]["state"] == "open"
+        assert body["upstreams"]["themealdb"]["state"] == "closed"
@@ -0,0 +1,107 @@
+"""
+Tests des délais adaptatifs et des requêtes couvertes (serveur simulé avec gigue).
+"""
+
+import time
+
+import httpx
+import pytest
+
+from server.services import upstream
+from stub_http import StubServer, jittery
+
+
+def _ok(q):
+    return 200, {"meals": [{"idMeal": q.get("i", "1")}]}
+
+
+async def _get(client, server, hedge=True):
+    return await upstream.upstream_get(client, "themealdb", f"{server.url}/lookup.php",
+                                       hedge=hedge, params={"i": "1"})
+
+
+class TestAdaptiveDeadline:
+    """Délai dérivé du p99 observé, plafonné par le TIMEOUT du service."""
+
+    def test_uses_ceiling_without_history(self):
+        latency = upstream.EndpointLatency("test:lookup")
+        for _ in range(upstream.MIN_SAMPLES - 1):
+            latency.observe(0.05)
+        assert latency.deadline(15.0) == 15.0
+        assert latency.hedge_delay() is None
+
+    def test_tracks_observed_percentiles(self):
+        latency = upstream.EndpointLatency("test:lookup")
+        for i in range(100):
+            latency.observe(0.5 if i % 50 == 0 else 0.1)
+        assert latency.percentile(50) == pytest.approx(0.1)
+        assert latency.deadline(15.0) == pytest.approx(0.5 * upstream.DEADLINE_FACTOR)
+        assert latency.deadline(1.2) == 1.2
+        snap = latency.snapshot()
+        assert snap["histogram"]["<=100ms"] == 98
+        assert snap["histogram"]["<=500ms"] == 2
+
+    def test_endpoint_keys(self):
+        a = upstream.get_endpoint_latency("themealdb", "https://x/api/json/v1/1/lookup.php")
+        b = upstream.get_endpoint_latency("themealdb", "https://y/other/lookup.php")
+        c = upstream.get_endpoint_latency("openfoodfacts", "https://x/product/123.json", endpoint="product")
+        assert a is b
+        assert c.name == "openfoodfacts:product"
+
+
+class TestHedging:
+    """Requête couverte envoyée après le p95, la plus rapide l'emporte."""
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_over_stalled_request(self):
+        hits = {"n": 0}
+
+        def delay(path):
+            hits["n"] += 1
+            return 1.5 if hits["n"] == 1 else 0.01
+
+        with StubServer({"/lookup.php": _ok}, delay=delay) as server:
+            latency = upstream.get_endpoint_latency("themealdb", f"{server.url}/lookup.php")
+            for _ in range(upstream.MIN_SAMPLES):
+                latency.observe(0.05)
+
+            async with httpx.AsyncClient(timeout=5) as client:
+                started = time.perf_counter()
+                resp = await _get(client, server)
+                elapsed = time.perf_counter() - started
+
+            assert resp.status_code == 200
+            assert elapsed < 1.0
+            assert latency.hedged == 1
+            assert latency.hedge_wins == 1
+            assert server.count("/lookup.php") == 2
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_flag(self):
+        with StubServer({"/lookup.php": _ok}, delay=lambda p: 0.2) as server:
+            latency = upstream.get_endpoint_latency("themealdb", f"{server.url}/lookup.php")
+            for _ in range(upstream.MIN_SAMPLES):
+                latency.observe(0.01)
+            async with httpx.AsyncClient(timeout=5) as client:
+                await _get(client, server, hedge=False)
+            assert latency.hedged == 0
+            assert server.count("/lookup.php") == 1
+
+    @pytest.mark.asyncio
+    async def test_jittery_upstream_cuts_tail_latency(self):
+        tail = 0.6  # queue < 5 % des requêtes : au-delà, le p95 tombe dans la queue
+        with StubServer({"/lookup.php": _ok}, delay=jittery(tail_ratio=0.04, tail_delay=tail)) as server:
+            durations = []
+            async with httpx.AsyncClient(timeout=5) as client:
+                for _ in range(80):
+                    started = time.perf_counter()
+                    await _get(client, server)
+                    durations.append(time.perf_counter() - started)
+
+            stats = upstream.get_latency_stats()["themealdb:lookup.php"]
+            assert stats["samples"] == 80
+            assert sum(stats["histogram"].values()) == 80
+            # Une fois l'historique constitué, les lenteurs de queue sont couvertes
+            warmed = durations[upstream.MIN_SAMPLES + 5:]
+            assert max(warmed) < tail
+            assert 0 < stats["hedge_rate"] < 0.2